@@ -0,0 +1,183 @@
+# benchmarks/check_continuing_eol.py
+
+"""
+Regression checks of the continuing steel EOL of the combined model against a run with zeroed
+inputs, and of the future exports read by the historic/future combination.
+
+Usage (from the repository root):
+    python -m benchmarks.check_continuing_eol
+    python -m benchmarks.check_continuing_eol -c config/steel_baseline_pd.yml -i data/baseline_pd_steel/input --base-year 2023
+
+The combined model takes the EOL and scrap of the cohorts built before the base year from the
+cohort axis of the steel baseline (_continuing_steel_flows). Before, it ran the baseline a second
+time with the demand and trade parameters zeroed from the base year on. This check runs both and
+compares, per flow and year, the totals of the future supplements (time >= base year) and of
+the continuing flows over all years. It also exports the flows of the steel and plastics models
+as the future runs of the combined model do (to a temporary folder) and checks that one file is
+written per exported flow. The exit code is 1 if any total differs by more than the tolerances or
+any export file is missing, so the check can gate CI.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from eumfa_combined import (
+    COUPLED_RUN_OVERRIDES,
+    PLASTICS_EXPORT_FLOWS,
+    STEEL_EXPORT_FLOWS,
+    _continuing_steel_flows,
+    _export_future_plastics_flows,
+    _export_future_steel_flows,
+    _extract_historic_steel_future_supplements,
+    _steel_flow_export_stem,
+    std_steel_cols,
+)
+from src.common.config_service import resolve_config
+from src.common.reduced_rank import expand_parameters
+
+
+# Inputs of the steel baseline which are zeroed from the base year on in the reference run
+ZEROED_PARAMETERS = ["DomesticProduction", "ImportNewProducts", "ImportNewGoods", "ExportNewProducts", "ExportNewGoods"]
+
+
+def _model_config(config: str, input_path: str):
+    return resolve_config(
+        config,
+        overrides={
+            **COUPLED_RUN_OVERRIDES,
+            "input_data_path": input_path,
+            # nothing is exported
+            "output_path": os.path.join(os.path.dirname(os.path.normpath(input_path)), "output"),
+        },
+        derive_data_paths=False,
+    )
+
+
+def _steel_model(config: str, input_path: str):
+    from src.steel.steel_model import SteelModel
+
+    return SteelModel(cfg=_model_config(config, input_path))
+
+
+def _plastics_model(config: str, input_path: str):
+    from src.plastics.plastics_model import PlasticsModel
+
+    return PlasticsModel(cfg=_model_config(config, input_path))
+
+
+def zero_future_inputs(model, base_year: int):
+    """Zero the demand and trade parameters of the steel model from base_year on."""
+    names = [name for name in ZEROED_PARAMETERS if name in model.mfa.parameters]
+    expand_parameters(model.mfa, names)
+    for name in names:
+        parameter = model.mfa.parameters[name]
+        axis = parameter.dims.letters.index("t")
+        index = [slice(None)] * parameter.dims.ndim
+        index[axis] = np.asarray(parameter.dims["t"].items) >= base_year
+        parameter.values[tuple(index)] = 0.0
+
+
+def _totals_by_year(flows: dict) -> pd.DataFrame:
+    totals = {}
+    for name, df in flows.items():
+        totals[name] = df.groupby("time")["value"].sum() if not df.empty else pd.Series(dtype=float)
+    return pd.DataFrame(totals).fillna(0.0)
+
+
+def compare_totals(reference: pd.DataFrame, result: pd.DataFrame, rtol: float, atol: float) -> pd.DataFrame:
+    """
+    Totals by flow and year of reference and result with their relative difference, flagged
+    if the absolute difference exceeds atol + rtol * |reference| (as np.isclose).
+    """
+    reference, result = reference.align(result, fill_value=0.0)
+    df = pd.DataFrame({"reference": reference.stack(), "result": result.stack()})
+    df.index.names = ["time", "flow"]
+    df["difference"] = (df["result"] - df["reference"]).abs() / df["reference"].abs().clip(lower=1e-12)
+    close = np.isclose(df["result"], df["reference"], rtol=rtol, atol=atol)
+    df["status"] = np.where(close, "ok", "MISMATCH")
+    return df.reset_index()
+
+
+def check(config: str, input_path: str, base_year: int, rtol: float = 1e-9, atol: float = 1e-6) -> pd.DataFrame:
+    """
+    Totals by flow and year of the supplements (time >= base_year) and of the continuing EOL
+    and scrap (all years), of the zeroed-input run (reference) and of the cohort split (result).
+    """
+    zeroed = _steel_model(config, input_path)
+    zero_future_inputs(zeroed, base_year)
+    zeroed.mfa.compute()
+    split = _steel_model(config, input_path)
+    split.mfa.compute()
+    continuing_flows = _continuing_steel_flows(split, base_year)
+
+    reference = {name: std_steel_cols(zeroed.mfa.flows[name].to_df().reset_index()) for name in continuing_flows}
+    result = {name: std_steel_cols(flow.to_df().reset_index()) for name, flow in continuing_flows.items()}
+    supplements = _extract_historic_steel_future_supplements(continuing_flows, base_year)
+    reference_supplements = {name: df[df["time"] >= base_year] for name, df in reference.items()}
+
+    df = pd.concat([
+        compare_totals(_totals_by_year(reference_supplements), _totals_by_year(supplements), rtol, atol).assign(check="supplement"),
+        compare_totals(_totals_by_year(reference), _totals_by_year(result), rtol, atol).assign(check="continuing"),
+    ], ignore_index=True)
+    return df[["check", "flow", "time", "reference", "result", "difference", "status"]]
+
+
+def check_future_exports(steel_config: str, steel_input: str, plastics_config: str, plastics_input: str) -> pd.DataFrame:
+    """Exported flows of the steel and plastics models and whether the future export wrote their files."""
+    rows = []
+    for name, build, config, input_path, export, flow_names in [
+        ("steel", _steel_model, steel_config, steel_input, _export_future_steel_flows, STEEL_EXPORT_FLOWS),
+        ("plastics", _plastics_model, plastics_config, plastics_input, _export_future_plastics_flows, PLASTICS_EXPORT_FLOWS),
+    ]:
+        model = build(config, input_path)
+        model.mfa.compute()
+        with tempfile.TemporaryDirectory(prefix=f"eumfa_future_{name}_") as output_dir:
+            export(model, output_dir=output_dir)
+            written = set(os.listdir(output_dir))
+        for flow_name in flow_names:
+            if flow_name not in model.mfa.flows:
+                continue
+            file_name = f"{_steel_flow_export_stem(flow_name)}_combined_future.csv"
+            rows.append({"model": name, "flow": flow_name, "file": file_name, "written": file_name in written})
+    return pd.DataFrame(rows, columns=["model", "flow", "file", "written"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the continuing steel EOL against a run with zeroed inputs.")
+    parser.add_argument("-c", "--config", default="config/steel_baseline_pd.yml", help="Steel baseline config.")
+    parser.add_argument("-i", "--input", default="data/baseline_pd_steel/input", help="Input data path of the baseline.")
+    parser.add_argument("--plastics-config", default="config/plastics_CE-PET_fd.yml", help="Plastics config of the export check.")
+    parser.add_argument("--plastics-input", default="data/CE-PET_fd_plastics/input", help="Input data path of the plastics config.")
+    parser.add_argument("--base-year", type=int, default=2023, help="Base year of the coupling (default 2023).")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="Relative tolerance of the totals (default 1e-9).")
+    parser.add_argument("--atol", type=float, default=1e-6, help="Absolute tolerance of the totals (default 1e-6).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    df = check(args.config, args.input, args.base_year, rtol=args.rtol, atol=args.atol)
+    summary = df.groupby(["check", "flow"]).agg(
+        reference=("reference", "sum"), result=("result", "sum"), max_difference=("difference", "max")
+    )
+    print(summary.to_string(float_format=lambda x: f"{x:.6g}"))
+    mismatches = df[df["status"] == "MISMATCH"]
+    if not mismatches.empty:
+        print(mismatches.to_string(index=False))
+
+    exports = check_future_exports(args.config, args.input, args.plastics_config, args.plastics_input)
+    print(exports.groupby("model")["written"].agg(flows="size", written="sum").to_string())
+    missing = exports[~exports["written"]]
+    if not missing.empty:
+        print(missing.to_string(index=False))
+    if not mismatches.empty or not missing.empty:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/compare_results.py
+
+"""
+Compare two benchmark result files written by run_benchmarks.
+
+Usage (from the repository root):
+    python -m benchmarks.compare_results benchmarks/results/<old>.json benchmarks/results/<new>.json --threshold 0.1
+
+Totals (generate/init/compute/export/total and peak memory) and per-stage wall
+times of the best run of each case and size are compared. The exit code is 1
+if any total regressed by more than the threshold, so the comparison can gate CI.
+"""
+
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+
+# Stages faster than this are too noisy to flag as regressions
+MIN_DURATION_S = 0.05
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _best_by_case(results: dict) -> dict:
+    return {(r["case"], r["size_name"]): r["best"] for r in results["results"] if "best" in r}
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1, stages: bool = False) -> pd.DataFrame:
+    """
+    Relative change of each metric between the old and new results, for the cases and sizes present in both.
+    Metrics slower (or larger) by more than threshold are flagged as regressions, faster ones as improvements.
+    """
+    old_best, new_best = _best_by_case(old), _best_by_case(new)
+    rows = []
+    for key in [k for k in old_best if k in new_best]:
+        metrics = [m for m in old_best[key] if m != "stages" and m in new_best[key]]
+        pairs = [(m, old_best[key][m], new_best[key][m]) for m in metrics]
+        if stages:
+            pairs += [
+                (f"stage: {s}", v, new_best[key]["stages"][s])
+                for s, v in old_best[key]["stages"].items() if s in new_best[key]["stages"]
+            ]
+        for metric, old_value, new_value in pairs:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            is_time = not metric.endswith("_mb")
+            noisy = is_time and max(old_value, new_value) < MIN_DURATION_S
+            status = ""
+            if not noisy and change > threshold:
+                status = "REGRESSION"
+            elif not noisy and change < -threshold:
+                status = "improvement"
+            rows.append({
+                "case": key[0], "size": key[1], "metric": metric,
+                "old": old_value, "new": new_value, "change": change, "status": status,
+            })
+    return pd.DataFrame(rows, columns=["case", "size", "metric", "old", "new", "change", "status"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old", help="Baseline result file.")
+    parser.add_argument("new", help="Result file to compare against the baseline.")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="Relative change flagged as regression (default 0.1).")
+    parser.add_argument("--stages", action="store_true", help="Also compare the wall time of each profiled stage.")
+    args = parser.parse_args()
+
+    old, new = load_results(args.old), load_results(args.new)
+    print(f"old: {old['environment']['commit']} ({old['environment']['date']})")
+    print(f"new: {new['environment']['commit']} ({new['environment']['date']})")
+    df = compare(old, new, threshold=args.threshold, stages=args.stages)
+    if df.empty:
+        print("No common cases to compare.")
+        return
+    print(df.to_string(
+        index=False,
+        formatters={"change": lambda x: f"{x:+.1%}", "old": lambda x: f"{x:.3f}", "new": lambda x: f"{x:.3f}"},
+    ))
+    totals = df[~df["metric"].str.startswith("stage: ")]
+    if (totals["status"] == "REGRESSION").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
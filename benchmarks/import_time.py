@@ -0,0 +1,68 @@
+# benchmarks/import_time.py
+
+"""
+Import time of the CLI entry point, guarding against eager imports of the plotting stack.
+
+This module provides:
+- measure_import, the cumulative import time of each module imported by `import <module>`,
+  measured with python -X importtime in a fresh interpreter
+- DEFERRED_MODULES, which must not be imported before a model exports or visualizes
+
+Usage (from the repository root):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time -m run_eumfa --max-seconds 3
+
+Exits with 1 if the entry point imports one of DEFERRED_MODULES or takes longer than --max-seconds.
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Dict
+
+
+# Only needed for export and visualization; imported where used
+DEFERRED_MODULES = ["matplotlib", "plotly", "dash", "flask", "flodym.export"]
+
+
+def measure_import(module: str) -> Dict[str, float]:
+    """Cumulative import time in seconds of every module imported by `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative_us) / 1e6
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of a CLI entry point.")
+    parser.add_argument("-m", "--module", default="run_eumfa", help="Module to import (default: run_eumfa).")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Fail if the import takes longer.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list.")
+    args = parser.parse_args()
+
+    times = measure_import(args.module)
+    total = times[args.module]
+    for name, seconds in sorted(times.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{seconds:8.3f} s  {name}")
+    print(f"import {args.module}: {total:.3f} s")
+
+    failed = False
+    deferred = [name for name in DEFERRED_MODULES if name in times]
+    if deferred:
+        print(f"FAIL: {args.module} imports {', '.join(deferred)}, which must be deferred to export/visualization.")
+        failed = True
+    if args.max_seconds is not None and total > args.max_seconds:
+        print(f"FAIL: import of {args.module} takes {total:.3f} s > {args.max_seconds} s.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Benchmark the EU MFA models on synthetic data and save machine-readable baselines.
+
+This module provides:
+- run_case, timing data generation, model initialization, compute and export
+  of one case at one size, with the per-stage records of the profiler
+- run_benchmarks, running cases and sizes in fresh processes (so that peak
+  memory is measured per case) and writing the results to JSON
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks -c plastics_pd steel_pd -s small medium
+    python -m benchmarks.run_benchmarks -c plastics_pd -s medium --regions 20 --repeat 3
+    python -m benchmarks.compare_results benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import List
+
+import flodym
+import numpy as np
+import pandas as pd
+
+from src.common.async_export import EXPORT_QUEUE
+from src.common.profiling import PROFILER
+from benchmarks.synthetic_data import CASES, SIZES, BenchmarkSize, resolve_size, write_synthetic_inputs
+
+
+RESULTS_PATH = os.path.join("benchmarks", "results")
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return f"{commit}-dirty" if dirty.strip() else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment_info() -> dict:
+    return {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "flodym": getattr(flodym, "__version__", "unknown"),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ===================================================================
+# Single case
+# ===================================================================
+
+def _stage_totals(records: dict) -> dict:
+    """Wall times of generation, init, compute and export from the stage records of one run."""
+    totals = {stage: records[stage]["wall_s"] for stage in ["generate", "init", "run"] if stage in records}
+    # Model.run computes the MFA system and exports it; compute is the .compute stage directly below it
+    totals["compute"] = sum(
+        r["wall_s"] for path, r in records.items()
+        if path.startswith("run > ") and r["depth"] == 2 and path.endswith(".compute")
+    )
+    totals["export"] = totals.get("run", 0.0) - totals["compute"]
+    totals["total"] = totals.get("init", 0.0) + totals.get("run", 0.0)
+    return {f"{k}_s": v for k, v in totals.items()}
+
+
+def run_case(case_name: str, size: BenchmarkSize, seed: int = 0, track_memory: bool = False) -> dict:
+    """Generate synthetic inputs for the case, then initialize, compute and export the model once."""
+    from run_eumfa import init_mfa
+
+    logging.basicConfig(format="%(asctime)s %(levelname)-8s %(message)s", level=logging.WARNING)
+    case = CASES[case_name]
+    with tempfile.TemporaryDirectory(prefix=f"eumfa_benchmark_{case_name}_") as root:
+        PROFILER.reset()
+        PROFILER.enable(track_memory=track_memory)
+        try:
+            with PROFILER.stage("generate"):
+                model_config, summary = write_synthetic_inputs(case, size, root, seed=seed)
+            with PROFILER.stage("init"):
+                model = init_mfa(cfg=model_config)
+            with PROFILER.stage("run"):
+                model.run()
+                # the export files are written in the background: wait for them (and raise
+                # failed writes) before the stage ends and the temporary directory is removed
+                EXPORT_QUEUE.wait()
+        finally:
+            PROFILER.disable()
+    return {
+        "totals": _stage_totals(PROFILER.records),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in PROFILER.records.values()),
+        "data": summary,
+        "stages": list(PROFILER.records.values()),
+    }
+
+
+def _best_of(runs: List[dict]) -> dict:
+    """Fastest time of each total and stage over the repeated runs of a case."""
+    best = {k: min(run["totals"][k] for run in runs) for k in runs[0]["totals"]}
+    best["peak_rss_mb"] = min(run["peak_rss_mb"] for run in runs)
+    stages = {}
+    for run in runs:
+        for record in run["stages"]:
+            stages[record["stage"]] = min(stages.get(record["stage"], np.inf), record["wall_s"])
+    best["stages"] = stages
+    return best
+
+
+# ===================================================================
+# Benchmark suite
+# ===================================================================
+
+def run_benchmarks(
+    case_names: List[str],
+    sizes: dict,
+    repeat: int = 1,
+    seed: int = 0,
+    track_memory: bool = False,
+    output_file: str = None,
+) -> dict:
+    """
+    Run each case at each size in a fresh process and write the results to output_file
+    (default: benchmarks/results/<commit>.json).
+    """
+    results = {"environment": environment_info(), "results": []}
+    for case_name in case_names:
+        for size_name, size in sizes.items():
+            runs, error = [], None
+            for i in range(repeat):
+                start = time.perf_counter()
+                try:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                        runs.append(executor.submit(run_case, case_name, size, seed, track_memory).result())
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    logging.error(f"benchmark - {case_name} ({size_name}) failed: {error}")
+                    break
+                logging.info(f"benchmark - {case_name} ({size_name}) run {i + 1}/{repeat}: {time.perf_counter() - start:.1f} s")
+            result = {"case": case_name, "size_name": size_name, "size": size.to_dict(), "runs": runs}
+            if runs:
+                result["data"] = runs[0]["data"]
+                result["best"] = _best_of(runs)
+            if error is not None:
+                result["error"] = error
+            results["results"].append(result)
+
+    output_file = output_file or os.path.join(RESULTS_PATH, f"{results['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=2)
+    logging.info(f"benchmark - results written to {output_file}")
+    return results
+
+
+def summary_table(results: dict) -> str:
+    rows = []
+    for result in results["results"]:
+        row = {"case": result["case"], "size": result["size_name"]}
+        if "best" in result:
+            row.update({k: v for k, v in result["best"].items() if k != "stages"})
+        else:
+            row["error"] = result.get("error")
+        rows.append(row)
+    return pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EU MFA models on synthetic data.")
+    parser.add_argument("-c", "--cases", nargs="+", default=list(CASES), choices=list(CASES), help="Cases to benchmark.")
+    parser.add_argument("-s", "--sizes", nargs="+", default=["small"], choices=list(SIZES), help="Predefined dataset sizes.")
+    for field in ["regions", "sectors", "polymers", "products", "years"]:
+        parser.add_argument(f"--{field}", type=int, default=None, help=f"Override the number of {field} of all sizes.")
+    parser.add_argument("--time-step", type=float, default=None, help="Override the time step in years (float time axes only).")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs per case and size; the fastest is kept as best.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic parameter values.")
+    parser.add_argument("--track-memory", action="store_true", help="Record tracemalloc peaks per stage (slow).")
+    parser.add_argument("-o", "--output", default=None, help="Output JSON file (default: benchmarks/results/<commit>.json).")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(levelname)-8s %(message)s", level=logging.INFO, datefmt="%Y-%m-%d %H:%M:%S")
+    sizes = {
+        name: resolve_size(
+            name, regions=args.regions, sectors=args.sectors, polymers=args.polymers,
+            products=args.products, years=args.years, time_step=args.time_step,
+        )
+        for name in args.sizes
+    }
+    results = run_benchmarks(args.cases, sizes, repeat=args.repeat, seed=args.seed, track_memory=args.track_memory, output_file=args.output)
+    print(summary_table(results))
+    if any("error" in result for result in results["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# benchmarks/synthetic_data.py
+
+"""
+Synthetic input data for benchmarking the EU MFA models at configurable sizes.
+
+This module provides:
+- BenchmarkSize, the number of regions, sectors, polymers, products and years
+  (and the time step) of a synthetic dataset, with predefined SIZES
+- BenchmarkCase and CASES, the benchmarked model configurations (plastics
+  standard/prodcom/circular, steel, vehicles, buildings, cement)
+- write_synthetic_inputs, writing the dimension and parameter CSVs of a case
+
+The shipped input data of each case serves as template: dimensions that are not
+scaled keep their items (some items are referenced in the model code), and each
+parameter keeps the columns it varies over and the value range of its template.
+Parameters with an empty template stay empty, so sparse inputs stay sparse.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.common.common_cfg import GeneralCfg
+from src.common.config_service import load_config_file
+from src.buildings.buildings_definition import get_definition as get_buildings_definition
+from src.vehicles.vehicles_definition import get_definition as get_vehicles_definition
+from src.plastics.plastics_definition import get_definition as get_plastics_definition
+from src.plastics.plastics_definition_circular import get_definition_circular as get_plastics_definition_circular
+from src.steel.steel_definition import get_definition as get_steel_definition
+from src.cement_topdown.cement_topdown_definition import get_definition as get_cement_topdown_definition
+
+
+# ===================================================================
+# Sizes and cases
+# ===================================================================
+
+@dataclass
+class BenchmarkSize:
+    """
+    Size of a synthetic dataset. None keeps the item count of the template data.
+    years is the length of the time axis in years, time_step its resolution in years.
+    The time axis ends in end_year; configs slicing stocks at 2020..2050 need at least 31 years.
+    """
+
+    regions: Optional[int] = None
+    sectors: Optional[int] = None
+    polymers: Optional[int] = None
+    products: Optional[int] = None
+    years: Optional[int] = None
+    time_step: Optional[float] = None
+    end_year: int = 2050
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+SIZES = {
+    "tiny": BenchmarkSize(regions=1, sectors=2, polymers=1, products=6, years=31),  # smoke test, seconds per case
+    "small": BenchmarkSize(regions=2, sectors=3, polymers=4, products=12, years=31),
+    "medium": BenchmarkSize(regions=10, sectors=8, polymers=14, products=60, years=91),  # about the size of the EU plastics data
+    "large": BenchmarkSize(regions=28, sectors=8, polymers=14, products=180, years=91),  # EU27+1 resolved by member state
+}
+
+
+@dataclass
+class BenchmarkCase:
+    """A model configuration to benchmark: shipped config file and shipped input data used as template."""
+
+    name: str
+    config_file: str
+    template_path: str
+    time_step: float = 1
+
+
+CASES = {
+    "plastics_pd": BenchmarkCase("plastics_pd", "config/plastics_baseline_pd.yml", "data/baseline_pd_plastics/input"),
+    "plastics_prodcom": BenchmarkCase("plastics_prodcom", "config/plastics_prodcom.yml", "data/prodcom_plastics/input"),
+    "plastics_circular": BenchmarkCase(
+        "plastics_circular", "config/plastics_CE-PET_fd.yml", "data/CE-PET_fd_plastics/input", time_step=0.25
+    ),
+    "steel_pd": BenchmarkCase("steel_pd", "config/steel_baseline_pd.yml", "data/baseline_pd_steel/input"),
+    "vehicles": BenchmarkCase("vehicles", "config/vehicles.yml", "data/baseline_vehicles/input"),
+    "buildings": BenchmarkCase("buildings", "config/buildings.yml", "data/baseline_buildings/input"),
+    "cement_topdown": BenchmarkCase("cement_topdown", "config/cement_topdown.yml", "data/baseline_cement_topdown/input"),
+}
+
+
+# Dimension files read by each model (mirrors the dimension_map in the init_mfa of the models)
+def get_dimension_files(cfg: GeneralCfg) -> Dict[str, str]:
+    if cfg.model_class == "plastics":
+        dimension_files = {
+            "time": "time_in_years",
+            "age-cohort": "age_cohorts",
+            "element": "elements",
+            "region": "regions",
+            "other_region": "regions",
+            "polymer": "polymers",
+            "sector": f"end_use_sectors_{cfg.customization.end_use_sectors}",
+            "waste_category": "waste_categories",
+            "secondary_raw_material": "secondary_raw_materials",
+            "reuse_cycle": "reuse_cycles",
+            "mechanical_recycling_cycle": "mechanical_recycling_cycles",
+            "product": f"products_{cfg.customization.end_use_sectors}",
+        }
+    elif cfg.model_class == "steel":
+        dimension_files = {
+            "time": "time_in_years",
+            "age-cohort": "age_cohorts",
+            "element": "elements",
+            "region": "regions",
+            "other_region": "regions",
+            "intermediate": "intermediates",
+            "product": "products",
+            "sector": "end_use_sectors",
+            "waste_category": "waste_categories",
+        }
+    elif cfg.model_class == "vehicles":
+        dimension_files = {
+            "Time": "time_in_years",
+            "Region": "regions",
+            "Vehicle type": "vehicle_types",
+            "Vehicle size": "vehicle_size",
+            "Steel product": "steel_products",
+            "Plastics product": "plastics_products",
+            "Glass product": "glass_products",
+        }
+    elif cfg.model_class == "buildings":
+        dimension_files = {
+            "Time": "time_in_years",
+            "Region": "regions",
+            "Building type": "building_types",
+            "Age cohort": "building_cohorts",
+            "Steel product": "steel_products",
+            "Concrete product": "concrete_products",
+            "Insulation product": "insulation_products",
+            "Glass product": "glass_products",
+        }
+    elif cfg.model_class.startswith("cement"):
+        dimension_files = {
+            "Time": "time_in_years",
+            "Region simple": "regions_simple",
+            "Concrete product simple": "concrete_products_simple",
+            "Cement product": "cement_products",
+            "Clinker product": "clinker_products",
+            "End use sector": "end_use_sectors",
+            "Concrete waste": "concrete_waste",
+        }
+    else:
+        raise ValueError(f"No synthetic data available for model class {cfg.model_class}")
+    return dimension_files
+
+
+# Dimensions scaled by each field of BenchmarkSize, identified by dimension name
+SCALED_DIMENSIONS = {
+    "years": ["time", "age-cohort", "Time"],
+    "regions": ["region", "other_region", "Region", "Region simple"],
+    "sectors": ["sector", "End use sector", "Vehicle type", "Building type"],
+    "polymers": ["polymer"],
+    "products": ["product"],
+}
+SCALED_DIMENSION_PREFIXES = {"years": None, "regions": "R", "sectors": "S", "polymers": "P", "products": "D"}
+
+
+def get_definition(cfg: GeneralCfg):
+    if cfg.model_class == "plastics":
+        if cfg.customization.circular:
+            return get_plastics_definition_circular(cfg)
+        return get_plastics_definition(cfg)
+    definitions = {
+        "steel": get_steel_definition,
+        "vehicles": get_vehicles_definition,
+        "buildings": get_buildings_definition,
+        "cement_topdown": get_cement_topdown_definition,
+    }
+    return definitions[cfg.model_class](cfg)
+
+
+# ===================================================================
+# Dimensions
+# ===================================================================
+
+def _read_items(path: str) -> list:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return []
+    return pd.read_csv(path, header=None).iloc[:, 0].tolist()
+
+
+def _scaled_items(field: str, n: int, size: BenchmarkSize, time_step: float, dtype) -> list:
+    if field == "years":
+        start_year = size.end_year - n + 1
+        steps = int(round(n / time_step))
+        items = [start_year + i * time_step for i in range(steps)]
+        if dtype is int:
+            if time_step != int(time_step):
+                raise ValueError(f"A time step of {time_step} years requires a float time dimension")
+            return [int(i) for i in items]
+        return [float(i) for i in items]
+    prefix = SCALED_DIMENSION_PREFIXES[field]
+    return [f"{prefix}{i:02d}" for i in range(1, n + 1)]
+
+
+def make_dimension_items(cfg: GeneralCfg, case: BenchmarkCase, size: BenchmarkSize) -> Dict[str, list]:
+    """Items of each dimension of the model definition: scaled by size, or copied from the template."""
+    definition = get_definition(cfg)
+    dimension_files = get_dimension_files(cfg)
+    time_step = size.time_step or case.time_step
+    items = {}
+    for dim in definition.dimensions:
+        field = next((f for f, names in SCALED_DIMENSIONS.items() if dim.name in names), None)
+        template_items = _read_items(os.path.join(case.template_path, "dimensions", f"{dimension_files[dim.name]}.csv"))
+        if field is not None and getattr(size, field) is not None:
+            items[dim.name] = _scaled_items(field, getattr(size, field), size, time_step, dim.dtype)
+        elif field == "years" and time_step != case.time_step:
+            n_years = int(round(len(template_items) * case.time_step))
+            items[dim.name] = _scaled_items(field, n_years, size, time_step, dim.dtype)
+        else:
+            items[dim.name] = template_items
+        if not items[dim.name]:
+            raise ValueError(f"Dimension {dim.name} has no items in template {case.template_path}")
+    return items
+
+
+# ===================================================================
+# Parameters
+# ===================================================================
+
+def _template_file(case: BenchmarkCase, cfg: GeneralCfg, name: str) -> Optional[str]:
+    variant = getattr(cfg, "variant", None)
+    for filename in [f"{name}_{variant}.csv", f"{name}.csv"]:
+        path = os.path.join(case.template_path, "datasets", filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _read_template(path: Optional[str]) -> Optional[pd.DataFrame]:
+    if path is None or os.path.getsize(path) == 0:
+        return None
+    return pd.read_csv(path)
+
+
+def make_parameter_df(
+    name: str,
+    dim_names: List[str],
+    items: Dict[str, list],
+    template: Optional[pd.DataFrame],
+    scaled: List[str],
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """
+    Long-format parameter data over the product of the dimension items.
+
+    Columns of the template that vary over a single item only (e.g. the first year of a
+    start value) keep a single item; unscaled dimensions keep the template items.
+    Values are drawn uniformly within the template range (integers if the template is integer).
+    """
+    if template is not None and template.empty:
+        return pd.DataFrame(columns=dim_names + ["value"])
+
+    dim_items = []
+    for dim_name in dim_names:
+        dim_items.append(items[dim_name])
+        if template is None or dim_name not in template.columns:
+            continue
+        template_items = template[dim_name].unique().tolist()
+        if dim_name in scaled:
+            if len(template_items) == 1:
+                dim_items[-1] = items[dim_name][:1]
+        else:
+            dim_items[-1] = [i for i in items[dim_name] if i in template_items] or items[dim_name]
+
+    grid = np.meshgrid(*[np.arange(len(i)) for i in dim_items], indexing="ij")
+    df = pd.DataFrame({
+        dim_name: np.asarray(dim_items[k], dtype=object)[grid[k].ravel()] for k, dim_name in enumerate(dim_names)
+    })
+
+    if name == "MarketShare" and "region" in dim_names and "other_region" in dim_names:
+        # Each region supplies its own market
+        df["value"] = (df["region"] == df["other_region"]).astype(float)
+        return df
+
+    low, high, integer = 0.0, 1.0, False
+    if template is not None:
+        values = pd.to_numeric(template.iloc[:, -1], errors="coerce").dropna()
+        if not values.empty:
+            low, high = float(values.min()), float(values.max())
+            integer = bool(np.all(values == np.round(values)))
+    if integer:
+        df["value"] = rng.integers(int(low), int(high) + 1, size=len(df))
+    else:
+        df["value"] = rng.uniform(low, high, size=len(df))
+    return df
+
+
+# ===================================================================
+# Writer
+# ===================================================================
+
+def load_case_config(case: BenchmarkCase, input_data_path: str, output_path: str) -> dict:
+    """Config of the case as read by run_eumfa, with visualization switched off and paths redirected."""
+    model_config = load_config_file(case.config_file)
+    model_config["input_data_path"] = input_data_path
+    model_config["output_path"] = output_path
+    for item in model_config.get("visualization", {}).values():
+        if isinstance(item, dict) and "do_visualize" in item:
+            item["do_visualize"] = False
+    model_config.pop("logging", None)
+    return model_config
+
+
+def write_synthetic_inputs(case: BenchmarkCase, size: BenchmarkSize, root: str, seed: int = 0) -> Tuple[dict, dict]:
+    """
+    Write dimension and parameter CSVs of the case to root/input.
+    Returns the model config reading them and a summary (dimension sizes, number of parameter rows).
+    """
+    input_path = os.path.join(root, "input")
+    model_config = load_case_config(case, input_path, os.path.join(root, "output"))
+    cfg = GeneralCfg.from_model_class(**model_config)
+    definition = get_definition(cfg)
+    dimension_files = get_dimension_files(cfg)
+    rng = np.random.default_rng(seed)
+
+    items = make_dimension_items(cfg, case, size)
+    scaled = [
+        dim_name for field, names in SCALED_DIMENSIONS.items() for dim_name in names
+        if getattr(size, field) is not None or (field == "years" and (size.time_step or case.time_step) != case.time_step)
+    ]
+
+    os.makedirs(os.path.join(input_path, "dimensions"), exist_ok=True)
+    for dim_name, dim_items in items.items():
+        pd.Series(dim_items).to_csv(
+            os.path.join(input_path, "dimensions", f"{dimension_files[dim_name]}.csv"), index=False, header=False
+        )
+
+    os.makedirs(os.path.join(input_path, "datasets"), exist_ok=True)
+    dim_names = {dim.letter: dim.name for dim in definition.dimensions}
+    n_rows = 0
+    for parameter in definition.parameters:
+        template = _read_template(_template_file(case, cfg, parameter.name))
+        df = make_parameter_df(
+            parameter.name, [dim_names[letter] for letter in parameter.dim_letters], items, template, scaled, rng
+        )
+        df.to_csv(os.path.join(input_path, "datasets", f"{parameter.name}.csv"), index=False)
+        n_rows += len(df)
+    logging.info(f"benchmark - {case.name}: {len(definition.parameters)} parameters, {n_rows} rows written to {input_path}")
+
+    summary = {
+        "dimensions": {dim_name: len(dim_items) for dim_name, dim_items in items.items()},
+        "parameter_rows": n_rows,
+    }
+    return model_config, summary
+
+
+def resolve_size(name: str, **overrides) -> BenchmarkSize:
+    """Predefined size, with the given fields overridden (None values are ignored)."""
+    return replace(SIZES[name], **{k: v for k, v in overrides.items() if v is not None})
@@ -1,4 +1,13 @@
+import argparse
 from run_eumfa import run_eumfa
+from src.common.config_service import parse_overrides
+
+# ARGUMENTS
+parser = argparse.ArgumentParser(description='Run the buildings sub-module.')
+parser.add_argument('--profile', dest='profile', action='store_true', help='profile model stages and print a ranked table')
+parser.add_argument('--profile-memory', dest='profile_memory', action='store_true', help='also record tracemalloc peaks (slow)')
+parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE', help='override a config item, e.g. customization.sparse_trade=true (repeatable)')
+args = parser.parse_args()
 
 cfg_file = "config/buildings.yml"
-run_eumfa(cfg_file)
+run_eumfa(cfg_file, profile=args.profile, profile_memory=args.profile_memory, overrides=parse_overrides(args.overrides))
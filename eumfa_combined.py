@@ -25,13 +25,18 @@ import logging
 import os
 from typing import Dict, List, Optional, Tuple, cast
 
+import flodym as fd
 import numpy as np
 import pandas as pd
-import yaml
 from scipy.stats import norm
 
 from run_eumfa import run_eumfa
-from src.common.combine_flows import FlowCalculator, _filter_and_split_buildings_eol
+from src.common.async_export import EXPORT_QUEUE
+from src.common.combine_flows import (
+    FlowCalculator,
+    _filter_and_split_buildings_eol,
+    split_stock_outflow_by_cohort,
+)
 from src.common.combine_spec import (
     MAPPING,
     TOPDOWN,
@@ -41,6 +46,7 @@ from src.common.combine_spec import (
     get_plastics_config,
     get_steel_config,
 )
+from src.common.dimension_registry import clean_labels
 
 # =============================================================================
 
@@ -60,6 +66,39 @@ COMBINE_CEMENT = False
 DOWNSTREAM_ONLY = False
 BASE_YEAR = 2023
 
+# Flows of the historic and future runs exported for the historic/future combination
+STEEL_EXPORT_FLOWS = [
+    "sysenv => Steel product market",
+    "Steel product market => Steel goods manufacturing",
+    "Steel goods manufacturing => Steel goods market",
+    "Steel goods market => End use stock",
+    "End use stock => Waste management",
+    "Waste management => AVAILABLE SCRAP sysenv",
+    "Waste management => LOST SCRAP sysenv",
+]
+PLASTICS_EXPORT_FLOWS = [
+    "sysenv => Polymer market",
+    "Polymer market => PRIMARY Plastics manufacturing",
+    "Polymer market => SECONDARY Plastics manufacturing",
+    "Plastics manufacturing => Plastics market",
+    "Plastics market => End use stock",
+    "End use stock => Waste collection",
+    "Waste collection => Waste sorting",
+    "Waste sorting => Sorted waste market",
+    "Sorted waste market => Recycling",
+    "Recycling => RECYCLATE sysenv",
+    "Recycling => LOSSES sysenv",
+]
+
+# Config overrides of the model runs coupled into the combined workflow (no export, no plots)
+COUPLED_RUN_OVERRIDES = {
+    "do_export": {"pickle": False, "csv": False},
+    "visualization": {
+        name: {"do_visualize": False}
+        for name in ("inflow", "production", "outflow", "sankey", "dashboard")
+    },
+}
+
 # Global FlowCalculator instance
 
 fc = FlowCalculator()
@@ -223,12 +262,7 @@ def map_bottom_up_to_target(
 
     # Clean original dimension values
     if orig_dim in reg_mapped.columns:
-        reg_mapped[orig_dim] = (
-            reg_mapped[orig_dim]
-            .astype(str)
-            .str.replace("\ufeff", "", regex=False)
-            .str.strip()
-        )
+        reg_mapped[orig_dim] = clean_labels(reg_mapped[orig_dim])
 
     # Build and apply product mapping
     mapping_df = fc.build_products_map_array(
@@ -828,7 +862,7 @@ def run_plastics_coupling(
     2. Project residual using cumulative growth
     3. Calculate residual EOL using inline DSM
     4. Calculate total EOL flows
-    5. Run historic stock model
+    5. Run baseline stock model (continuing EOL of cohorts before the base year)
     6. Calculate total future demand
     7. Run future flows model and combine outputs
 
@@ -933,7 +967,7 @@ def run_plastics_coupling(
     )
 
     # =========================================================================
-    # STEP 5: Run historic stock model
+    # STEP 5: Run baseline stock model, split EOL by cohort
     # =========================================================================
     logging.info("[Plastics] Step 5: Running historic stock model")
 
@@ -1264,39 +1298,20 @@ def _save_plastics_intermediate_files(
         logging.info(f"[Plastics] Saved: {filename}")
 
 
-def _zero_future_steel_parameters(model, time_items: List, base_year: int) -> None:
-    """Zero out steel inflow-related parameters for years >= base_year."""
-    demand_param = model.mfa.parameters["DomesticProduction"]
-    for t_idx, year in enumerate(time_items):
-        if year >= base_year:
-            demand_param.values[:, t_idx, :, :, :, :] = 0.0
-
-    for pname in [
-        "ImportNewProducts",
-        "ImportNewGoods",
-        "ExportNewProducts",
-        "ExportNewGoods",
-    ]:
-        if pname not in model.mfa.parameters:
-            continue
-        param = model.mfa.parameters[pname]
-        for t_idx, year in enumerate(time_items):
-            if year >= base_year:
-                param.values[:, t_idx, :, :, :, :] = 0.0
-
-
 def extract_eol_flow_steel(
     mfa_model,
     flow_name: str = "End use stock => Waste management",
     base_year: int = 2023,
     sector_filter: Optional[str] = None,
+    flow=None,
 ) -> pd.DataFrame:
-    """Extract steel EOL flow for time >= base_year."""
-    if flow_name not in mfa_model.mfa.flows:
+    """Extract steel EOL flow for time >= base_year (of flow instead of the model flow, if given)."""
+    if flow is None and flow_name not in mfa_model.mfa.flows:
         logging.warning(f"Flow '{flow_name}' not found in model")
         return pd.DataFrame()
 
-    df = mfa_model.mfa.flows[flow_name].to_df().reset_index()
+    flow = mfa_model.mfa.flows[flow_name] if flow is None else flow
+    df = flow.to_df().reset_index()
     df = std_steel_cols(df)
     df = df[df["time"] >= base_year]
     if sector_filter and "sector" in df.columns:
@@ -1304,25 +1319,78 @@ def extract_eol_flow_steel(
     return df[df["value"].abs() > 1e-9].copy()
 
 
-def _export_historic_steel_flows(model) -> None:
-    """Export historic steel flows."""
+def _continuing_steel_eol(model, base_year: int):
+    """
+    Collected EOL (End use stock => Waste management) of the cohorts built before
+    base_year, from the outflow by cohort of the end use stock of the same run.
+    """
+    mfa = model.mfa
+    eol = mfa.flows["End use stock => Waste management"]
+    historic_outflow, _ = split_stock_outflow_by_cohort(mfa.stocks["End use stock"], base_year)
+    continuing = fd.FlodymArray(dims=eol.dims, name=eol.name)
+    continuing[...] = historic_outflow * mfa.parameters["EoLRecoveryRate"]
+    return continuing
+
+
+def _continuing_steel_flows(model, base_year: int) -> Dict[str, fd.FlodymArray]:
+    """
+    Collected EOL and the AVAILABLE / LOST scrap derived from it, of the cohorts
+    built before base_year (see _continuing_steel_eol), by flow name.
+    """
+    mfa = model.mfa
+    eol = _continuing_steel_eol(model, base_year)
+    available_scrap, lost_scrap = (
+        fd.FlodymArray(dims=mfa.flows[name].dims, name=name)
+        for name in (
+            "Waste management => AVAILABLE SCRAP sysenv",
+            "Waste management => LOST SCRAP sysenv",
+        )
+    )
+    mfa.compute_scrap(eol, available_scrap, lost_scrap)
+    return {
+        "End use stock => Waste management": eol,
+        "Waste management => AVAILABLE SCRAP sysenv": available_scrap,
+        "Waste management => LOST SCRAP sysenv": lost_scrap,
+    }
+
+
+def _historic_part(flow: fd.FlodymArray, base_year: int) -> fd.FlodymArray:
+    """
+    Part of a baseline flow that belongs to the historic run: the cohorts built
+    before base_year (summed over the age-cohort dimension) for flows with one,
+    the years before base_year (zero from base_year on) otherwise.
+    """
+    letter = "c" if "c" in flow.dims.letters else "t"
+    axis = flow.dims.letters.index(letter)
+    before = np.asarray(flow.dims[letter].items) < base_year
+    if letter == "c":
+        values = np.compress(before, flow.values, axis=axis).sum(axis=axis)
+        return fd.FlodymArray(dims=flow.dims.drop("c"), values=values, name=flow.name)
+    shape = [1] * flow.dims.ndim
+    shape[axis] = -1
+    values = np.where(before.reshape(shape), flow.values, 0)
+    return fd.FlodymArray(dims=flow.dims, values=values, name=flow.name)
+
+
+def _export_historic_steel_flows(
+    model, base_year: int, continuing_flows: Dict[str, fd.FlodymArray]
+) -> None:
+    """
+    Export historic steel flows: the flows before base_year, and from base_year on
+    the EOL and scrap of the cohorts built before base_year (continuing_flows).
+    """
     output_dir = "data/baseline_pd_steel/output/export/flows"
     os.makedirs(output_dir, exist_ok=True)
 
-    export_flows = [
-        "sysenv => Steel product market",
-        "Steel product market => Steel goods manufacturing",
-        "Steel goods manufacturing => Steel goods market",
-        "Steel goods market => End use stock",
-        "End use stock => Waste management",
-        "Waste management => AVAILABLE SCRAP sysenv",
-        "Waste management => LOST SCRAP sysenv",
-    ]
-
-    for flow_name in export_flows:
+    for flow_name in STEEL_EXPORT_FLOWS:
         if flow_name not in model.mfa.flows:
             continue
-        df = model.mfa.flows[flow_name].to_df().reset_index()
+        if flow_name in continuing_flows:
+            # cohorts before base_year, i.e. the whole flow before base_year
+            flow = continuing_flows[flow_name]
+        else:
+            flow = _historic_part(model.mfa.flows[flow_name], base_year)
+        df = flow.to_df().reset_index()
         safe_name = _steel_flow_export_stem(flow_name)
         out_path = os.path.join(output_dir, f"{safe_name}_baseline.csv")
         fc.export_numeric_csv(df, out_path, value_cols=("value",))
@@ -1334,19 +1402,15 @@ def _steel_flow_export_stem(flow_name: str) -> str:
 
 
 def _extract_historic_steel_future_supplements(
-    model, base_year: int
+    continuing_flows: Dict[str, fd.FlodymArray], base_year: int
 ) -> Dict[str, pd.DataFrame]:
-    """Extract post-base-year historic steel outflows to supplement future exports."""
-    flow_names = [
-        "End use stock => Waste management",
-        "Waste management => AVAILABLE SCRAP sysenv",
-        "Waste management => LOST SCRAP sysenv",
-    ]
+    """
+    Extract the post-base-year outflows of the cohorts built before base_year
+    (continuing_flows) to supplement future exports, which cover the later cohorts.
+    """
     supplements = {}
-    for flow_name in flow_names:
-        if flow_name not in model.mfa.flows:
-            continue
-        df = model.mfa.flows[flow_name].to_df().reset_index()
+    for flow_name, flow in continuing_flows.items():
+        df = flow.to_df().reset_index()
         df = std_steel_cols(df)
         df = df[df["time"] >= base_year].copy()
         df = df[df["value"].abs() > 1e-9].copy()
@@ -1373,7 +1437,11 @@ def _run_historic_steel_model(
     time_col: str,
     value_col: str,
 ) -> Dict[str, pd.DataFrame]:
-    """Run historic steel model and extract continuing EOL for coupled sectors."""
+    """
+    Run the steel baseline and extract the continuing EOL (of the cohorts built
+    before base_year) for coupled sectors, by splitting the cohort axis of the
+    end use stock outflow.
+    """
     empty_df = pd.DataFrame(
         columns=[
             time_col,
@@ -1388,31 +1456,25 @@ def _run_historic_steel_model(
 
     try:
         from src.steel.steel_model import SteelModel
-        from src.common.common_cfg import GeneralCfg
-
-        with open("config/steel_baseline_pd.yml", "r") as f:
-            config_dict = yaml.safe_load(f)
-
-        config_dict["input_data_path"] = "data/baseline_pd_steel/input"
-        config_dict["output_path"] = "data/baseline_pd_steel/output"
-
-        config_dict["do_export"] = {"pickle": False, "csv": False}
-        config_dict["visualization"] = {
-            "inflow": {"do_visualize": False},
-            "production": {"do_visualize": False},
-            "outflow": {"do_visualize": False},
-            "sankey": {"do_visualize": False},
-            "dashboard": {"do_visualize": False},
-        }
-
-        cfg = GeneralCfg.from_model_class(**config_dict)
+        from src.common.config_service import resolve_config
+
+        cfg = resolve_config(
+            "config/steel_baseline_pd.yml",
+            overrides={
+                **COUPLED_RUN_OVERRIDES,
+                "input_data_path": "data/baseline_pd_steel/input",
+                "output_path": "data/baseline_pd_steel/output",
+            },
+            derive_data_paths=False,
+        )
         model = SteelModel(cfg=cfg)
-        time_items = list(model.mfa.dims["t"].items)
-        _zero_future_steel_parameters(model, time_items, base_year)
         model.mfa.compute()
+        continuing_flows = _continuing_steel_flows(model, base_year)
 
-        _export_historic_steel_flows(model)
-        supplements = _extract_historic_steel_future_supplements(model, base_year)
+        _export_historic_steel_flows(model, base_year, continuing_flows)
+        supplements = _extract_historic_steel_future_supplements(
+            continuing_flows, base_year
+        )
         _save_historic_steel_future_supplements(
             supplements, TOPDOWN["steel_fd_sv_gr_dir"]
         )
@@ -1424,6 +1486,7 @@ def _run_historic_steel_model(
                 flow_name="End use stock => Waste management",
                 base_year=base_year,
                 sector_filter=sector,
+                flow=continuing_flows["End use stock => Waste management"],
             )
             if not historic_eol.empty:
                 path = os.path.join(
@@ -1439,22 +1502,13 @@ def _run_historic_steel_model(
         return {sector: empty_df.copy() for sector in coupled_sectors}
 
 
-def _export_future_steel_flows(model) -> None:
+def _export_future_steel_flows(
+    model, output_dir: str = "data/combined_steel_future/output/export/flows"
+) -> None:
     """Export future steel flows."""
-    output_dir = "data/combined_steel_future/output/export/flows"
     os.makedirs(output_dir, exist_ok=True)
 
-    export_flows = [
-        "sysenv => Steel product market",
-        "Steel product market => Steel goods manufacturing",
-        "Steel goods manufacturing => Steel goods market",
-        "Steel goods market => End use stock",
-        "End use stock => Waste management",
-        "Waste management => AVAILABLE SCRAP sysenv",
-        "Waste management => LOST SCRAP sysenv",
-    ]
-
-    for flow_name in export_flows:
+    for flow_name in STEEL_EXPORT_FLOWS:
         if flow_name not in model.mfa.flows:
             continue
         df = model.mfa.flows[flow_name].to_df().reset_index()
@@ -1581,21 +1635,13 @@ def _run_future_steel_model_and_combine(
 
     try:
         from src.steel.steel_model import SteelModel
-        from src.common.common_cfg import GeneralCfg
-
-        with open("config/steel_combined_future.yml", "r") as f:
-            config_dict = yaml.safe_load(f)
+        from src.common.config_service import resolve_config
 
-        config_dict["do_export"] = {"pickle": False, "csv": False}
-        config_dict["visualization"] = {
-            "inflow": {"do_visualize": False},
-            "production": {"do_visualize": False},
-            "outflow": {"do_visualize": False},
-            "sankey": {"do_visualize": False},
-            "dashboard": {"do_visualize": False},
-        }
-
-        cfg = GeneralCfg.from_model_class(**config_dict)
+        cfg = resolve_config(
+            "config/steel_combined_future.yml",
+            overrides=COUPLED_RUN_OVERRIDES,
+            derive_data_paths=False,
+        )
         model = SteelModel(cfg=cfg)
         model.mfa.compute()
         _export_future_steel_flows(model)
@@ -1870,7 +1916,8 @@ def _run_historic_plastics_model(
     value_col: str,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
-    Run historic plastics model and extract continuing EOL.
+    Run the plastics baseline and extract the continuing EOL, i.e. the EOL of the
+    cohorts built before base_year, from the cohort axis of its EOL flow.
 
     Returns (historic_eol_bc, historic_eol_auto)
     """
@@ -1888,34 +1935,20 @@ def _run_historic_plastics_model(
 
     try:
         from src.plastics.plastics_model import PlasticsModel
-        from src.common.common_cfg import GeneralCfg
-
-        # Load and modify config
-        with open("config/plastics_baseline.yml", "r") as f:
-            config_dict = yaml.safe_load(f)
-
-        config_dict["do_export"] = {"pickle": False, "csv": False}
-        config_dict["visualization"] = {
-            "inflow": {"do_visualize": False},
-            "production": {"do_visualize": False},
-            "outflow": {"do_visualize": False},
-            "sankey": {"do_visualize": False},
-            "dashboard": {"do_visualize": False},
-        }
-
-        cfg = GeneralCfg.from_model_class(**config_dict)
-        model = PlasticsModel(cfg=cfg)
+        from src.common.config_service import resolve_config
 
-        # Zero parameters for future years
-        time_items = list(model.mfa.dims["t"].items)
-        _zero_future_parameters(model, time_items, base_year)
-
-        # Run computation
+        # Load config, without export and plots
+        cfg = resolve_config(
+            "config/plastics_baseline.yml",
+            overrides=COUPLED_RUN_OVERRIDES,
+            derive_data_paths=False,
+        )
+        model = PlasticsModel(cfg=cfg)
         model.mfa.compute()
-        logging.info("[Plastics] Historic model computation completed")
+        logging.info("[Plastics] Baseline model computation completed")
 
         # Export flows
-        _export_historic_plastics_flows(model)
+        _export_historic_plastics_flows(model, base_year)
 
         # Extract continuing EOL for both sectors
         historic_eol_bc = extract_eol_flow_memory_efficient(
@@ -1960,66 +1993,24 @@ def _run_historic_plastics_model(
         return empty_df, empty_df
 
 
-def _zero_future_parameters(model, time_items: List, base_year: int) -> None:
-    """Zero out parameters for years >= base_year in historic model."""
-    # Zero DomesticDemand
-    demand_param = model.mfa.parameters["DomesticDemand"]
-    zeroed_years = 0
-    for t_idx, year in enumerate(time_items):
-        if year >= base_year:
-            demand_param.values[:, t_idx, :, :, :] = 0.0
-            zeroed_years += 1
-    logging.info(f"[Plastics] Zeroed DomesticDemand for {zeroed_years} years")
-
-    # Zero import/export parameters
-    for pname in ["ImportNew", "ExportNew", "ImportRateNew", "ExportRateNew"]:
-        if pname not in model.mfa.parameters:
-            continue
-        param = model.mfa.parameters[pname]
-        arr = param.values
-        nd = arr.ndim
-        time_axis = 2 if nd >= 3 else 1
-
-        for t_idx, year in enumerate(time_items):
-            if year >= base_year:
-                indexer = [slice(None)] * nd
-                indexer[time_axis] = t_idx
-                arr[tuple(indexer)] = 0.0
-
-
-def _export_historic_plastics_flows(model) -> None:
-    """Export historic plastics flows with cohort aggregation."""
+def _export_historic_plastics_flows(model, base_year: int) -> None:
+    """
+    Export historic plastics flows with cohort aggregation: the cohorts built before
+    base_year for flows with an age-cohort dimension, the years before base_year for
+    the others (see _historic_part).
+    """
     output_dir = "data/baseline_plastics/output/export/flows"
     os.makedirs(output_dir, exist_ok=True)
 
-    export_flows = [
-        "sysenv => Polymer market",
-        "Polymer market => PRIMARY Plastics manufacturing",
-        "Polymer market => SECONDARY Plastics manufacturing",
-        "Plastics manufacturing => Plastics market",
-        "Plastics market => End use stock",
-        "End use stock => Waste collection",
-        "Waste collection => Waste sorting",
-        "Waste sorting => Sorted waste market",
-        "Sorted waste market => Recycling",
-        "Recycling => RECYCLATE sysenv",
-        "Recycling => LOSSES sysenv",
-    ]
-
     exported = 0
-    for flow_name in export_flows:
+    for flow_name in PLASTICS_EXPORT_FLOWS:
         if flow_name not in model.mfa.flows:
             continue
 
         flow = model.mfa.flows[flow_name]
-        has_cohort = "c" in flow.dims.letters
 
         try:
-            if has_cohort:
-                flow_agg = flow.sum_over(("c",))
-                df = flow_agg.to_df().reset_index()
-            else:
-                df = flow.to_df().reset_index()
+            df = _historic_part(flow, base_year).to_df().reset_index()
 
             safe_name = flow_name.replace(" => ", "__").replace(" ", "_").lower()
             out_path = os.path.join(output_dir, f"{safe_name}_baseline.csv")
@@ -2209,21 +2200,13 @@ def _run_future_plastics_model_and_combine(
     # Run future model
     try:
         from src.plastics.plastics_model import PlasticsModel
-        from src.common.common_cfg import GeneralCfg
-
-        with open("config/plastics_combined_future.yml", "r") as f:
-            config_dict = yaml.safe_load(f)
+        from src.common.config_service import resolve_config
 
-        config_dict["do_export"] = {"pickle": False, "csv": False}
-        config_dict["visualization"] = {
-            "inflow": {"do_visualize": False},
-            "production": {"do_visualize": False},
-            "outflow": {"do_visualize": False},
-            "sankey": {"do_visualize": False},
-            "dashboard": {"do_visualize": False},
-        }
-
-        cfg = GeneralCfg.from_model_class(**config_dict)
+        cfg = resolve_config(
+            "config/plastics_combined_future.yml",
+            overrides=COUPLED_RUN_OVERRIDES,
+            derive_data_paths=False,
+        )
         model = PlasticsModel(cfg=cfg)
         model.mfa.compute()
         logging.info("[Plastics] Future model computation completed")
@@ -2239,27 +2222,14 @@ def _run_future_plastics_model_and_combine(
     _combine_plastics_flows(base_year)
 
 
-def _export_future_plastics_flows(model) -> None:
-    """Export future plastics flows."""
-    output_dir = "data/combined_plastics_future/output/export/flows"
+def _export_future_plastics_flows(
+    model, output_dir: str = "data/combined_plastics_future/output/export/flows"
+) -> None:
+    """Export future plastics flows with cohort aggregation."""
     os.makedirs(output_dir, exist_ok=True)
 
-    export_flows = [
-        "sysenv => Polymer market",
-        "Polymer market => PRIMARY Plastics manufacturing",
-        "Polymer market => SECONDARY Plastics manufacturing",
-        "Plastics manufacturing => Plastics market",
-        "Plastics market => End use stock",
-        "End use stock => Waste collection",
-        "Waste collection => Waste sorting",
-        "Waste sorting => Sorted waste market",
-        "Sorted waste market => Recycling",
-        "Recycling => RECYCLATE sysenv",
-        "Recycling => LOSSES sysenv",
-    ]
-
     exported = 0
-    for flow_name in export_flows:
+    for flow_name in PLASTICS_EXPORT_FLOWS:
         if flow_name not in model.mfa.flows:
             continue
 
@@ -2359,12 +2329,12 @@ def main():
         if not DOWNSTREAM_ONLY:
             if USE_BUILDINGS:
                 logging.info("Running buildings model...")
-                flows_buildings = run_eumfa("config/buildings.yml")
+                flows_buildings = run_eumfa("config/buildings.yml", wait_for_exports=False)
 
             if USE_VEHICLES:
                 try:
                     logging.info("Running vehicles model...")
-                    flows_vehicles = run_eumfa("config/vehicles.yml")
+                    flows_vehicles = run_eumfa("config/vehicles.yml", wait_for_exports=False)
                 except Exception as e:
                     logging.warning(f"Vehicles model failed: {e}")
 
@@ -2380,6 +2350,9 @@ def main():
         if COMBINE_STEEL:
             run_steel_coupling(flows_buildings, flows_vehicles)
 
+        # Exports of the bottom-up models were written in the background meanwhile
+        EXPORT_QUEUE.wait()
+
         logging.info("=" * 60)
         logging.info("COMBINED MODEL COMPLETE")
         logging.info("=" * 60)
@@ -0,0 +1,18 @@
+import argparse
+from run_eumfa import run_sensitivity
+from src.common.config_service import parse_overrides
+
+# ARGUMENTS
+parser = argparse.ArgumentParser(description='Get model and scenario for a Monte-Carlo sensitivity run.')
+parser.add_argument('-m', '--model', dest='model', type=str, help='model name (plastics or steel)')
+parser.add_argument('-s', '--scenario', dest='scenario', type=str, help='scenario names')
+parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE', help='override a config item, e.g. customization.sparse_trade=true (repeatable)')
+args = parser.parse_args()
+
+# Model and scenario name
+model = 'steel' if args.model is None else args.model
+scenario = 'baseline_pd_sensitivity' if args.scenario is None else args.scenario
+
+# Run the Monte-Carlo engine with the sensitivity section of the config file
+cfg_file = f"config/{model}_{scenario}.yml"
+run_sensitivity(cfg_file, overrides=parse_overrides(args.overrides))
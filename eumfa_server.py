@@ -0,0 +1,17 @@
+import argparse
+from run_eumfa import run_server
+
+# ARGUMENTS
+parser = argparse.ArgumentParser(description='Start a local model server keeping the inputs of the given scenarios in memory.')
+parser.add_argument('-c', '--config', dest='configs', action='append', default=[], help='config file whose inputs are read at start (repeatable)')
+parser.add_argument('--host', dest='host', type=str, default='127.0.0.1', help='address to listen on')
+parser.add_argument('-p', '--port', dest='port', type=int, default=8765, help='port to listen on')
+parser.add_argument('-w', '--workers', dest='workers', type=int, default=2, help='number of runs computed at the same time')
+args = parser.parse_args()
+
+# Config files of the scenarios kept in memory
+cfg_files = args.configs if args.configs else ["config/steel_baseline_pd.yml"]
+
+# Serve run requests, e.g.
+# curl -X POST localhost:8765/runs -d '{"config": "config/steel_baseline_pd.yml", "overrides": {"dtype": "float32"}, "wait": true}'
+run_server(cfg_files, host=args.host, port=args.port, max_workers=args.workers)
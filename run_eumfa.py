@@ -1,38 +1,24 @@
 import logging
-import yaml, os
+import os
 import flodym as fd
 
 
 from src.common.common_cfg import GeneralCfg
-from src.buildings.buildings_model import BuildingsModel
-from src.vehicles.vehicles_model import VehiclesModel
-from src.plastics.plastics_model import PlasticsModel
-from src.steel.steel_model import SteelModel
-from src.cement_topdown.cement_topdown_model import CementTopdownModel
-from src.cement_stock.cement_stock_model import CementStockModel
-from src.cement_flows.cement_flows_model import CementFlowsModel
-
-models = {
-    "buildings": BuildingsModel,
-    "vehicles": VehiclesModel,
-    "plastics": PlasticsModel,
-    "steel": SteelModel,
-    "cement_topdown": CementTopdownModel,
-    "cement_stock" : CementStockModel,
-    "cement_flows" : CementFlowsModel
-}
+from src.common.config_service import load_config_file, resolve_config
+from src.common.model_registry import MODEL_CLASSES, get_model_class
+from src.common.profiling import PROFILER
+from src.common.async_export import EXPORT_QUEUE
 
 def get_model_config(filename):
-    with open(filename, "r") as stream:
-        data = yaml.safe_load(stream)
-    return {k: v for k, v in data.items()}
+    return load_config_file(filename)
 
 
-def init_mfa(cfg: dict) -> fd.MFASystem:
-    """Choose MFA subclass and return an initialized instance."""
+def init_mfa(cfg) -> fd.MFASystem:
+    """Choose MFA subclass and return an initialized instance (cfg as resolved GeneralCfg or config dict)."""
 
-    cfg = GeneralCfg.from_model_class(**cfg)
-    mfa = models[cfg.model_class](cfg=cfg)
+    if not isinstance(cfg, GeneralCfg):
+        cfg = GeneralCfg.from_model_class(**cfg)
+    mfa = get_model_class(cfg.model_class)(cfg=cfg)
     return mfa
 
 
@@ -45,32 +31,71 @@ def recalculate_mfa(model_config):
 
 
 
-def run_eumfa(cfg_file: str):
-    model_config = get_model_config(cfg_file)
-    
+def prepare_model_config(cfg_file: str, overrides: dict = None) -> GeneralCfg:
+    """Resolve the config file (with input and output data paths and overrides) and set up logging."""
+    model_config = resolve_config(cfg_file, overrides=overrides)
+
     # Check that input data folder exists and is not empty
-    input_path = f"data/{model_config['scenario']}_{model_config['model_class']}/input"
+    input_path = model_config.input_data_path
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"Input data folder not found: {input_path}")
     if not os.listdir(input_path):
         raise ValueError(f"Input data folder is empty: {input_path}")
-    # Add input and output data paths to config
-    model_config['input_data_path'] = input_path
-    # If the config file specifies a variant, include it in the output path; otherwise, use a default output path.
-    try:
-        model_config['output_path'] = f"data/{model_config['scenario']}_{model_config['model_class']}/output_{model_config['variant']}"
-    except KeyError:
-        model_config['output_path'] = f"data/{model_config['scenario']}_{model_config['model_class']}/output"
-
-    try:
-        logging_level = model_config['logging']['level'].upper()
-    except KeyError:
-        logging_level = "INFO"
+
+    logging_level = model_config.logging.get('level', "INFO").upper()
     logging.basicConfig(
         format="%(asctime)s %(levelname)-8s %(message)s",
         level=logging_level,
         datefmt="%Y-%m-%d %H:%M:%S",
     )
+    return model_config
+
+
+def run_eumfa(cfg_file: str, profile: bool = False, profile_memory: bool = False, overrides: dict = None, wait_for_exports: bool = True):
+    """
+    Run the model of a config file. Export files are written in the background; with wait_for_exports,
+    they are complete on return (and failed writes raised), otherwise the caller waits for EXPORT_QUEUE.
+    """
+    model_config = prepare_model_config(cfg_file, overrides=overrides)
+
+    # Per-stage profiling, enabled by the --profile flag or by the profile config item.
+    # tracemalloc peaks are only recorded on request since tracing slows pandas/numpy code down considerably.
+    profile_cfg = model_config.profile
+    profile = profile or profile_memory or profile_cfg.get('enabled', False)
+    if profile:
+        PROFILER.reset()
+        PROFILER.enable(track_memory=profile_memory or profile_cfg.get('track_memory', False))
 
     flows_as_dataframes = recalculate_mfa(model_config)
-    return flows_as_dataframes
\ No newline at end of file
+    if wait_for_exports:
+        EXPORT_QUEUE.wait()
+
+    if profile:
+        PROFILER.disable()
+        PROFILER.write(
+            os.path.join(model_config.output_path, "profile"),
+            run_info={"config": cfg_file, "model_class": model_config.model_class, "scenario": model_config.scenario},
+        )
+        print(PROFILER.ranked_table())
+    return flows_as_dataframes
+
+
+def run_sensitivity(cfg_file: str, overrides: dict = None):
+    """Monte-Carlo evaluation of the sensitivity section of the config on a single loaded model."""
+    from src.common.sensitivity import MonteCarloEngine
+
+    model_config = prepare_model_config(cfg_file, overrides=overrides)
+    mfa = init_mfa(cfg=model_config)
+    engine = MonteCarloEngine(mfa)
+    engine.run()
+    engine.export_parquet(os.path.join(mfa.cfg.output_path, "sensitivity"))
+    return engine
+
+
+def run_server(cfg_files: list, host: str = "127.0.0.1", port: int = 8765, max_workers: int = 2):
+    """Local model server holding the inputs of the config files in memory (see src/common/model_server.py)."""
+    from src.common.model_server import ModelServer, serve
+
+    for cfg_file in cfg_files:
+        prepare_model_config(cfg_file)
+    serve(ModelServer(cfg_files, max_workers=max_workers), host=host, port=port)
@@ -2,6 +2,7 @@ import flodym as fd
 from typing import TYPE_CHECKING
 
 from src.common.custom_export import CustomDataExporter
+from src.common.profiling import profiled
 
 if TYPE_CHECKING:
     from src.buildings.buildings_model import BuildingsModel
@@ -19,6 +20,7 @@ class BuildingsDataExporter(CustomDataExporter):
         "Glass stock in buildings",
     }
 
+    @profiled()
     def visualize_results(self, model: "BuildingsModel"):
         if self.cfg.inflow["do_visualize"]:
             self.visualize_inflow(mfa=model.mfa)
@@ -1,11 +1,14 @@
 import flodym as fd
+from src.common.profiling import profiled
 
 
 class BuildingsMFASystem(fd.MFASystem):
 
+    @profiled()
     def compute(self):
         self.compute_flows()
 
+    @profiled()
     def compute_flows(self):
         prm = self.parameters
         flw = self.flows
@@ -40,6 +43,7 @@ class BuildingsMFASystem(fd.MFASystem):
             flw["Concrete stock in buildings => sysenv"] - \
             flw["Concrete stock in buildings => Concrete stock in buildings"]
 
+    @profiled()
     def get_flows_as_dataframes(self):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return {flow_name: flow.to_df() for flow_name, flow in self.flows.items()}
\ No newline at end of file
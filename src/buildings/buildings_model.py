@@ -2,6 +2,8 @@ import os
 import logging
 
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.input_cache import load_mfa_from_csv
 from .buildings_mfa_system import BuildingsMFASystem
 from .buildings_export import BuildingsDataExporter
 from .buildings_definition import get_definition
@@ -20,6 +22,7 @@ class BuildingsModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
 
         dimension_map = {
@@ -45,7 +48,8 @@ class BuildingsModel:
             parameter_files[parameter.name] = os.path.join(
                 self.cfg.input_data_path, "datasets", f"{parameter.name}.csv"
             )
-        self.mfa = BuildingsMFASystem.from_csv(
+        self.mfa = load_mfa_from_csv(
+            BuildingsMFASystem,
             definition=self.definition,
             dimension_files=dimension_files,
             parameter_files=parameter_files,
@@ -58,6 +62,7 @@ class BuildingsModel:
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return self.mfa.get_flows_as_dataframes()
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         logging.info("Model computations completed.")
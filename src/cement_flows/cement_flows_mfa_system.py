@@ -1,12 +1,15 @@
 import flodym as fd
+from src.common.profiling import profiled
 
 class CementFlowsMFASystem(fd.MFASystem):
 
+    @profiled()
     def compute(self):
         self.compute_historic_stock()
         self.compute_future_flows()
 
 
+    @profiled()
     def compute_historic_stock(self):
         prm = self.parameters
         flw = self.flows
@@ -44,6 +47,7 @@ class CementFlowsMFASystem(fd.MFASystem):
         flw["CDW sorted market historic => sysenv historic"][...] = \
             flw["CDW separation historic => CDW sorted market historic"][...] - prm["trade_CDW_sorted"]
 
+    @profiled()
     def compute_future_flows(self):
         prm = self.parameters
         flw = self.flows
@@ -73,6 +77,7 @@ class CementFlowsMFASystem(fd.MFASystem):
             flw["CDW separation future => CDW sorted market future"][...] - prm["trade_CDW_sorted"]
 
 
+    @profiled()
     def get_flows_as_dataframes(self):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         print("Cement flows calculated")
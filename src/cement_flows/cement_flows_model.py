@@ -1,6 +1,8 @@
 import os
 import logging
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.input_cache import load_mfa_from_csv
 from .cement_flows_mfa_system import CementFlowsMFASystem
 from .cement_flows_export import CementFlowsDataExporter
 from .cement_flows_definition import get_definition
@@ -18,6 +20,7 @@ class CementFlowsModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
 
         dimension_map = {
@@ -42,7 +45,8 @@ class CementFlowsModel:
             parameter_files[parameter.name] = os.path.join(
                 self.cfg.input_data_path, "datasets", f"{parameter.name}.csv"
             )
-        self.mfa = CementFlowsMFASystem.from_csv(
+        self.mfa = load_mfa_from_csv(
+            CementFlowsMFASystem,
             definition=self.definition,
             dimension_files=dimension_files,
             parameter_files=parameter_files,
@@ -55,6 +59,7 @@ class CementFlowsModel:
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return self.mfa.get_flows_as_dataframes()
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         logging.info("Model computations completed.")
@@ -2,6 +2,7 @@ import flodym as fd
 from typing import TYPE_CHECKING
 
 from src.common.custom_export import CustomDataExporter
+from src.common.profiling import profiled
 
 if TYPE_CHECKING:
     from src.cement_stock.cement_stock_model import CementStockMFASystem
@@ -25,6 +26,7 @@ class CementStockDataExporter(CustomDataExporter):
         "CDW sorted market",
     }
 
+    @profiled()
     def visualize_results(self, model: "CementStockMFASystem"):
         if self.cfg.inflow["do_visualize"]:
             self.visualize_inflow(mfa=model.mfa)
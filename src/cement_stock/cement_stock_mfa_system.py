@@ -1,10 +1,13 @@
 import flodym as fd
+from src.common.profiling import profiled
 
 class CementStockMFASystem(fd.MFASystem):
 
+    @profiled()
     def compute(self):
         self.compute_future_stock()
 
+    @profiled()
     def compute_future_stock(self):
         prm = self.parameters
         flw = self.flows
@@ -20,6 +23,7 @@ class CementStockMFASystem(fd.MFASystem):
         flw["End use stock future => CDW collection future"][...] = stk["End use stock future"].outflow * \
                                                                prm["dissipative_losses"]
 
+    @profiled()
     def get_flows_as_dataframes(self):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return {flow_name: flow.to_df() for flow_name, flow in self.flows.items()}
\ No newline at end of file
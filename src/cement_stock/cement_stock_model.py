@@ -2,6 +2,8 @@ import os
 import logging
 
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.input_cache import load_mfa_from_csv
 from .cement_stock_mfa_system import CementStockMFASystem
 from .cement_stock_export import CementStockDataExporter
 from .cement_stock_definition import get_definition
@@ -18,6 +20,7 @@ class CementStockModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
 
         dimension_map = {
@@ -42,7 +45,8 @@ class CementStockModel:
             parameter_files[parameter.name] = os.path.join(
                 self.cfg.input_data_path, "datasets", f"{parameter.name}.csv"
             )
-        self.mfa = CementStockMFASystem.from_csv(
+        self.mfa = load_mfa_from_csv(
+            CementStockMFASystem,
             definition=self.definition,
             dimension_files=dimension_files,
             parameter_files=parameter_files,
@@ -55,6 +59,7 @@ class CementStockModel:
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return self.mfa.get_flows_as_dataframes()
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         logging.info("Model computations completed.")
@@ -2,16 +2,20 @@
 import flodym as fd
 from src.cement_flows.cement_flows_mfa_system import CementFlowsMFASystem as FlowsFuncs
 from src.cement_stock.cement_stock_mfa_system import CementStockMFASystem as StockFuncs
+from src.common.profiling import profiled
 
 class CementTopdownMFASystem(fd.MFASystem):
+    @profiled()
     def compute(self):
         self.compute_historic_chain()
         self.compute_future_chain()
 
+    @profiled()
     def compute_historic_chain(self):
         # Reuse the historic computation from cement_flows
         FlowsFuncs.compute_historic_stock(self)
 
+    @profiled()
     def compute_future_chain(self):
         prm, flw = self.parameters, self.flows
 
@@ -35,6 +39,7 @@ class CementTopdownMFASystem(fd.MFASystem):
         # 4) Run the existing future chain from cement_flows (correct clinker logic)
         FlowsFuncs.compute_future_flows(self)
 
+    @profiled()
     def get_flows_as_dataframes(self):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return {flow_name: flow.to_df() for flow_name, flow in self.flows.items()}
\ No newline at end of file
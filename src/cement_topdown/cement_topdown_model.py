@@ -2,6 +2,8 @@
 import os
 import logging
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.input_cache import load_mfa_from_csv
 from .cement_topdown_mfa_system import CementTopdownMFASystem
 from src.cement_flows.cement_flows_export import CementFlowsDataExporter as CementTopdownDataExporter
 from .cement_topdown_definition import get_definition
@@ -17,6 +19,7 @@ class CementTopdownModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
         dimension_map = {
             "Time": "time_in_years",
@@ -37,7 +40,8 @@ class CementTopdownModel:
             for prm in self.definition.parameters
         }
 
-        self.mfa = CementTopdownMFASystem.from_csv(
+        self.mfa = load_mfa_from_csv(
+            CementTopdownMFASystem,
             definition=self.definition,
             dimension_files=dimension_files,
             parameter_files=parameter_files,
@@ -49,6 +53,7 @@ class CementTopdownModel:
     def get_flows_as_dataframes(self):
         return self.mfa.get_flows_as_dataframes()
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         logging.info("Model computations completed.")
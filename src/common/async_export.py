@@ -0,0 +1,107 @@
+# src/common/async_export.py
+
+"""
+Background writing of the export files of the model runs.
+
+This module provides:
+- ExportQueue, running file writes (e.g. DataFrame.to_csv) on a small thread pool, with a bound
+  on the number of pending writes, and raising the failed writes when waited for
+- ExportError, raised by ExportQueue.wait if any write failed
+- EXPORT_QUEUE, the queue used by the data exporters of all models
+
+The data exporters convert flows, stocks and parameters to DataFrames (and MFA systems to pickled
+bytes) in the calling thread, so arrays changed after the export call do not reach the files, and
+queue the writing, so the conversion of the next array overlaps with writing the previous one
+(pandas and the file writes release the GIL for most of their time). submit blocks while
+max_pending writes are queued, which bounds the memory of the DataFrames waiting to be written.
+run_eumfa waits for the queue at the end of a run; the combined workflow waits only before it
+reads exported files and at its end.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import pandas as pd
+
+from src.common.profiling import PROFILER
+
+
+# Threads writing export files, and writes queued at most before submit blocks
+EXPORT_THREADS = 4
+MAX_PENDING_EXPORTS = 8
+
+
+def _write_bytes(data: bytes, path: str):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class ExportError(RuntimeError):
+    """One or more queued export writes failed."""
+
+
+class ExportQueue:
+    """Thread pool for export writes; with n_threads=0, writes are done in the calling thread."""
+
+    def __init__(self, n_threads: int = EXPORT_THREADS, max_pending: int = MAX_PENDING_EXPORTS):
+        self.n_threads = n_threads
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._futures: List[Future] = []
+        self._failures: List[Tuple[str, BaseException]] = []
+        self._lock = threading.Lock()
+
+    def submit(self, write: Callable, *args, description: str = None, **kwargs):
+        """Queue write(*args, **kwargs); blocks while max_pending writes are queued."""
+        description = description or getattr(write, "__qualname__", str(write))
+        if self.n_threads == 0:
+            self._run(write, args, kwargs, description)
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_threads, thread_name_prefix="export")
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(self._run, write, args, kwargs, description)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        with self._lock:
+            self._futures.append(future)
+
+    def write_csv(self, df: pd.DataFrame, path: str, **to_csv_kwargs):
+        """Queue writing a DataFrame to a csv file."""
+        self.submit(df.to_csv, path, description=f"writing {path}", **to_csv_kwargs)
+
+    def write_bytes(self, data: bytes, path: str):
+        """Queue writing bytes, e.g. a pickle of arrays the caller may change after submitting, to a file."""
+        self.submit(_write_bytes, data, path, description=f"writing {path}")
+
+    def _run(self, write: Callable, args: tuple, kwargs: dict, description: str):
+        try:
+            write(*args, **kwargs)
+        except Exception as error:
+            logging.error(f"export - {description} failed: {type(error).__name__}: {error}")
+            with self._lock:
+                self._failures.append((description, error))
+
+    def wait(self):
+        """Wait for all queued writes; raise an ExportError listing the writes that failed."""
+        with PROFILER.stage("ExportQueue.wait"):
+            while True:
+                with self._lock:
+                    futures, self._futures = self._futures, []
+                if not futures:
+                    break
+                for future in futures:
+                    future.result()
+        with self._lock:
+            failures, self._failures = self._failures, []
+        if failures:
+            details = "; ".join(f"{description}: {error}" for description, error in failures)
+            raise ExportError(f"{len(failures)} export writes failed: {details}") from failures[0][1]
+
+
+EXPORT_QUEUE = ExportQueue()
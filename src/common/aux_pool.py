@@ -0,0 +1,97 @@
+# src/common/aux_pool.py
+
+"""
+Pool of auxiliary array buffers for the compute stages of the MFA systems.
+
+This module provides:
+- AuxPool, handing out zeroed FlodymArrays for a DimensionSet and dtype and taking
+  their buffers back for reuse once a compute stage is done
+- AuxPoolMixin for MFA systems: get_aux_array / release_aux_arrays on a pool owned by
+  the system, so buffers are reused across compute stages, region blocks and the
+  repeated computes of a sensitivity run
+- AUX_POOL_STATS, allocations and reuses of all pools (updated under a lock, as pools of
+  sector partitions are used from worker threads), recorded per stage by the profiler
+
+Buffers are keyed by shape and dtype. Only buffers handed out by the pool are taken
+back; an aux entry rebound to a new array (aux["x"] = ...) is not, so stages fill
+their aux arrays in place (aux["x"][...] = ...).
+"""
+
+import threading
+from typing import Dict, Iterable, List, Union
+
+import flodym as fd
+import numpy as np
+
+from src.common.precision import get_dtype
+from src.common.profiling import PROFILER
+
+
+AUX_POOL_STATS = {"allocations": 0, "reuses": 0, "allocated_mb": 0.0}
+_STATS_LOCK = threading.Lock()
+
+PROFILER.add_counter("aux_allocations", lambda: AUX_POOL_STATS["allocations"])
+PROFILER.add_counter("aux_reuses", lambda: AUX_POOL_STATS["reuses"])
+PROFILER.add_counter("aux_allocated_mb", lambda: AUX_POOL_STATS["allocated_mb"])
+
+
+class AuxPool:
+    """Free buffers by (shape, dtype) and the buffers currently handed out."""
+
+    def __init__(self):
+        self._free: Dict[tuple, List[np.ndarray]] = {}
+        self._lent: Dict[int, np.ndarray] = {}
+
+    def get(self, dims: fd.DimensionSet, dtype: type = np.float64, name: str = None) -> fd.FlodymArray:
+        """Zeroed FlodymArray with dims, on a free buffer of the same shape and dtype if there is one."""
+        free = self._free.get((dims.shape, np.dtype(dtype)))
+        if free:
+            values = free.pop()
+            values.fill(0)
+            with _STATS_LOCK:
+                AUX_POOL_STATS["reuses"] += 1
+        else:
+            values = np.zeros(dims.shape, dtype=dtype)
+            with _STATS_LOCK:
+                AUX_POOL_STATS["allocations"] += 1
+                AUX_POOL_STATS["allocated_mb"] += values.nbytes / 1024**2
+        self._lent[id(values)] = values
+        return fd.FlodymArray(dims=dims, values=values, name=name)
+
+    def release(self, arrays: Iterable[fd.FlodymArray]):
+        """Take back the buffers of arrays handed out by get. The arrays must not be used afterwards."""
+        for array in arrays:
+            values = self._lent.pop(id(array.values), None)
+            if values is not None:
+                self._free.setdefault((values.shape, values.dtype), []).append(values)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the free buffers."""
+        return sum(values.nbytes for free in self._free.values() for values in free)
+
+    def clear(self):
+        self._free = {}
+
+
+class AuxPoolMixin:
+    """
+    Mixin for MFA systems drawing the auxiliary arrays of their compute stages from a pool.
+    Must come before fd.MFASystem in the bases.
+    """
+
+    @property
+    def aux_pool(self) -> AuxPool:
+        if "_aux_pool" not in self.__dict__:
+            object.__setattr__(self, "_aux_pool", AuxPool())
+        return self.__dict__["_aux_pool"]
+
+    def get_aux_array(self, dims: Union[tuple, fd.DimensionSet]) -> fd.FlodymArray:
+        """Zeroed array in the configured dtype, for dim letters of the system or a DimensionSet."""
+        if not isinstance(dims, fd.DimensionSet):
+            dims = self.dims.get_subset(dims)
+        return self.aux_pool.get(dims, dtype=get_dtype(self.cfg))
+
+    def release_aux_arrays(self, aux: Dict[str, fd.FlodymArray]):
+        """Return the aux arrays of a finished compute stage to the pool."""
+        self.aux_pool.release(aux.values())
@@ -0,0 +1,151 @@
+# src/common/banded_stock.py
+
+"""
+Inflow-driven dynamic stock model storing cohorts as a (time x age) band.
+
+This module provides:
+- BandedInflowDrivenDSM, a drop-in subclass of fd.InflowDrivenDSM which, with a
+  survival_cutoff, keeps only the ages at which some share of a cohort survives
+
+fd.InflowDrivenDSM stores survival and outflow tables and stock and outflow by cohort
+as full (t x c) matrices, although for short lifetimes almost all cells far from the
+diagonal are zero. With a survival_cutoff, the lifetime tables are evaluated per cohort
+only up to the first age at which less than the cutoff survives in every element, and
+that remaining share leaves the stock at this age, so that the mass balance is kept.
+Memory and lifetime evaluations become O(t x max_age) instead of O(t^2).
+
+Band arrays are indexed [t, a, ...], with cohort c = t - a. Without a survival_cutoff
+the model behaves exactly like fd.InflowDrivenDSM.
+"""
+
+import logging
+from typing import Optional
+
+import flodym as fd
+import numpy as np
+
+
+# Number of ages evaluated first per cohort; doubled until the survival falls below the cutoff
+INITIAL_AGE_WINDOW = 16
+
+
+class BandedInflowDrivenDSM(fd.InflowDrivenDSM):
+    """
+    Inflow-driven DSM storing survival, stock and outflow by cohort as (t x age) bands.
+    Set survival_cutoff (e.g. 1e-4 for the 99.99th percentile of the lifetime) before compute.
+    """
+
+    survival_cutoff: Optional[float] = None
+    _sf_band: np.ndarray = None
+    _pdf_band: np.ndarray = None
+    _stock_band: np.ndarray = None
+    _outflow_band: np.ndarray = None
+    _band_prms: dict = None
+
+    @property
+    def is_banded(self) -> bool:
+        return self.survival_cutoff is not None
+
+    @property
+    def n_ages(self) -> int:
+        """Width of the age band (number of time steps a cohort is tracked)."""
+        return self._n_t if self._sf_band is None else self._sf_band.shape[1]
+
+    def compute(self):
+        if not self.is_banded:
+            super().compute()
+            return
+        if not 0.0 < self.survival_cutoff < 1.0:
+            raise ValueError(f"survival_cutoff must be between 0 and 1, got {self.survival_cutoff}.")
+        self._check_needed_arrays()
+        self._compute_lifetime_band()
+        dtype = self.inflow.values.dtype
+        inflow_per_period = self._to_whole_period(self.inflow.values).astype(dtype, copy=False)
+        self._stock_band = self._cohort_band(inflow_per_period, self._sf_band)
+        self._outflow_band = self._cohort_band(self.inflow.values, self._pdf_band)
+        self.stock.values[...] = self._stock_band.sum(axis=1, dtype=np.float64)
+        self.outflow.values[...] = self._outflow_band.sum(axis=1, dtype=np.float64)
+
+    def get_stock_by_cohort(self) -> np.ndarray:
+        if not self.is_banded:
+            return super().get_stock_by_cohort()
+        return self._band_to_cohorts(self._stock_band)
+
+    def get_outflow_by_cohort(self) -> np.ndarray:
+        if not self.is_banded:
+            return super().get_outflow_by_cohort()
+        return self._band_to_cohorts(self._outflow_band)
+
+    # ===================================================================
+    # Band computations
+    # ===================================================================
+
+    def _lifetime_prms_unchanged(self) -> bool:
+        prms = self.lifetime_model.prms
+        return (
+            self._band_prms is not None
+            and self._band_prms.keys() == prms.keys()
+            and all(np.array_equal(self._band_prms[k], v) for k, v in prms.items())
+        )
+
+    def _cohort_survival(self, m: int, n_ages: int) -> np.ndarray:
+        """Survival of cohort m at its first n_ages ages, as flodym's survival table column m."""
+        lifetime_model = self.lifetime_model
+        bounds = lifetime_model._t.bounds
+        sf = 0.0
+        for eta, weight in zip(*lifetime_model.get_quad_points_and_weights()):
+            t = eta * bounds[m + 1] + (1 - eta) * bounds[m]
+            remaining_ages = lifetime_model._tile(bounds[m + 1 : m + 1 + n_ages] - t)
+            sf = sf + weight * lifetime_model._survival_by_year_id(remaining_ages, m)
+        return sf
+
+    def _truncated_cohort_survival(self, m: int) -> np.ndarray:
+        """Survival of cohort m up to the first age below survival_cutoff in all elements, which is set to zero."""
+        n_max = self._n_t - m
+        n_ages = min(INITIAL_AGE_WINDOW, n_max)
+        while True:
+            sf = self._cohort_survival(m, n_ages)
+            # NaN survival (undefined lifetime parameters) does not hold the band open
+            below = ~(sf >= self.survival_cutoff).reshape(n_ages, -1).any(axis=1)
+            if below.any():
+                n_kept = int(np.argmax(below)) + 1
+                sf = sf[:n_kept]
+                sf[-1] = np.where(np.isnan(sf[-1]), sf[-1], 0.0)
+                return sf
+            if n_ages == n_max:
+                return sf
+            n_ages = min(2 * n_ages, n_max)
+
+    def _compute_lifetime_band(self):
+        """Survival and outflow probability bands, reused as long as the lifetime parameters do not change."""
+        if self._sf_band is not None and self._lifetime_prms_unchanged():
+            return
+        dtype = self.inflow.values.dtype
+        cohort_sf = [self._truncated_cohort_survival(m) for m in range(self._n_t)]
+        n_ages = max(len(sf) for sf in cohort_sf)
+        sf_band = np.zeros((self._n_t, n_ages) + self._shape_no_t, dtype=dtype)
+        for m, sf in enumerate(cohort_sf):
+            ages = np.arange(len(sf))
+            sf_band[m + ages, ages] = sf
+        pdf_band = np.empty_like(sf_band)
+        pdf_band[:, 0] = 1.0 - sf_band[:, 0]
+        pdf_band[0, 1:] = 0.0
+        pdf_band[1:, 1:] = sf_band[:-1, :-1] - sf_band[1:, 1:]
+        self._sf_band, self._pdf_band = sf_band, pdf_band
+        self._band_prms = {k: np.copy(v) for k, v in self.lifetime_model.prms.items()}
+        logging.debug(f"{self.name}: cohorts tracked over {n_ages} of {self._n_t} time steps")
+
+    def _cohort_band(self, inflow: np.ndarray, table: np.ndarray) -> np.ndarray:
+        """band[t, a] = inflow[t - a] * table[t, a]"""
+        band = np.zeros_like(table)
+        for a in range(table.shape[1]):
+            np.multiply(inflow[: self._n_t - a], table[a:, a], out=band[a:, a])
+        return band
+
+    def _band_to_cohorts(self, band: np.ndarray) -> np.ndarray:
+        """Expand a (t x age) band to the full (t x c) cohort matrix of fd.InflowDrivenDSM."""
+        cohorts = np.zeros(self._shape_cohort, dtype=band.dtype)
+        for a in range(band.shape[1]):
+            t = np.arange(a, self._n_t)
+            cohorts[t, t - a] = band[a:, a]
+        return cohorts
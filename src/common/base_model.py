@@ -3,4 +3,4 @@ from pydantic import BaseModel, ConfigDict
 
 class EUMFABaseModel(BaseModel):
 
-    model_config = ConfigDict(extra="forbid", protected_namespaces=(), arbitrary_types_allowed=True)
+    model_config = ConfigDict(extra="forbid", protected_namespaces=(), arbitrary_types_allowed=True, frozen=True)
@@ -0,0 +1,69 @@
+# src/common/checkpoint.py
+
+"""
+Checkpoints of the state of long time loops, as memory-mappable snapshots.
+
+This module provides:
+- write_checkpoint, writing the state arrays and a JSON description after a number of
+  completed time steps to a checkpoint folder
+- find_checkpoint, the checkpoint of a path: a checkpoint folder, or the latest checkpoint in
+  a folder of checkpoints
+- read_checkpoint, the description and the memory-mapped state arrays of a checkpoint
+
+A checkpoint is a folder <path>/step_<completed steps> with one .npy file per state array and
+checkpoint.json. It is written to a temporary folder and renamed when complete, so a crash
+while writing never leaves an incomplete checkpoint. All checkpoints of a run are kept: a
+later scenario can resume from any of them, e.g. to share a historic trajectory. Arrays are
+read with mmap_mode="r", so pages are only read when the state is copied back.
+"""
+
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+INFO_FILE = "checkpoint.json"
+STEP_PREFIX = "step_"
+
+
+def write_checkpoint(path: str, completed_steps: int, arrays: Dict[str, np.ndarray], info: dict) -> str:
+    """Write a checkpoint of the arrays after completed_steps time steps; returns its folder."""
+    folder = os.path.join(path, f"{STEP_PREFIX}{completed_steps:06d}")
+    tmp_folder = f"{folder}.tmp{os.getpid()}"
+    os.makedirs(tmp_folder, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_folder, f"{name}.npy"), values)
+    info = dict(info, completed_steps=completed_steps, arrays=sorted(arrays))
+    with open(os.path.join(tmp_folder, INFO_FILE), "w") as f:
+        json.dump(info, f, indent=2, default=str)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder)
+    os.rename(tmp_folder, folder)
+    logging.info(f"checkpoint - {completed_steps} time steps written to {folder}")
+    return folder
+
+
+def find_checkpoint(path: str) -> str:
+    """path if it is a checkpoint, otherwise the checkpoint with the most completed steps in path."""
+    if os.path.exists(os.path.join(path, INFO_FILE)):
+        return path
+    checkpoints = sorted(
+        name for name in os.listdir(path) if name.startswith(STEP_PREFIX) and os.path.exists(os.path.join(path, name, INFO_FILE))
+    ) if os.path.isdir(path) else []
+    if not checkpoints:
+        raise FileNotFoundError(f"No checkpoint found in {path}.")
+    return os.path.join(path, checkpoints[-1])
+
+
+def read_checkpoint(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Description and memory-mapped arrays of the checkpoint at path (see find_checkpoint)."""
+    folder = find_checkpoint(path)
+    with open(os.path.join(folder, INFO_FILE)) as f:
+        info = json.load(f)
+    arrays = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r") for name in info["arrays"]}
+    logging.info(f"checkpoint - resuming from {folder} after {info['completed_steps']} time steps")
+    return info, arrays
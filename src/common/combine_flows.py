@@ -9,6 +9,7 @@ This module provides:
 - Residual calculation (direct multiplication and cumulative growth)
 - Historic/future flow combination
 - Cohort filtering utilities for buildings EOL
+- Cohort partitioning of MFA system stock outflows at the base year
 
 """
 
@@ -16,8 +17,15 @@ import logging
 import os
 from typing import Dict, List, Optional, Tuple
 
+import flodym as fd
+import numpy as np
 import pandas as pd
 
+from src.common.dimension_registry import DIMENSIONS, clean_labels
+
+
+# Upper bound of the rows of a residual projection (growth rate rows x items of broadcast keys)
+MAX_RESIDUAL_ROWS = 50_000_000
 
 # =============================================================================
 
@@ -118,6 +126,25 @@ def filter_and_split_buildings_eol(
     return pd.DataFrame(results)
 
 
+# =============================================================================
+
+# COHORT PARTITIONING UTILITIES (for MFA system EOL)
+
+# =============================================================================
+
+
+def split_stock_outflow_by_cohort(stock: fd.Stock, base_year: int) -> Tuple[fd.FlodymArray, fd.FlodymArray]:
+    """
+    Outflow of a computed dynamic stock model from the cohorts before base_year and
+    from the cohorts from base_year on, each with the dimensions of stock.outflow.
+    """
+    by_cohort = stock.get_outflow_by_cohort()  # (t, c, ...), cohorts are the time items
+    before = np.asarray(stock.outflow.dims[stock.time_letter].items) < base_year
+    historic = fd.FlodymArray(dims=stock.outflow.dims, values=by_cohort[:, before].sum(axis=1), name=stock.outflow.name)
+    future = fd.FlodymArray(dims=stock.outflow.dims, values=by_cohort[:, ~before].sum(axis=1), name=stock.outflow.name)
+    return historic, future
+
+
 # =============================================================================
 
 # FLOW CALCULATOR CLASS
@@ -183,19 +210,8 @@ class FlowCalculator:
 
     @staticmethod
     def _read_dim_items(path: str, sep: Optional[str] = None) -> List[str]:
-        """Read dimension items from a CSV file."""
-        df = pd.read_csv(path, sep=sep or None, engine="python")
-        if df.empty:
-            return []
-        first_col = df.columns[0]
-        return (
-            df[first_col]
-            .dropna()
-            .astype(str)
-            .str.replace("\ufeff", "", regex=False)
-            .str.strip()
-            .tolist()
-        )
+        """Dimension items of a CSV file, read once per process (see dimension_registry.py)."""
+        return list(DIMENSIONS.items(path, sep=sep))
 
     # -------------------------------------------------------------------------
     # Region Mapping
@@ -239,12 +255,7 @@ class FlowCalculator:
             "target_element",
         ):
             if col in m.columns:
-                m[col] = (
-                    m[col]
-                    .astype(str)
-                    .str.replace("\ufeff", "", regex=False)
-                    .str.strip()
-                )
+                m[col] = clean_labels(m[col])
 
         # Filter to source dimension and rename columns
         sel = m[m["original_dimension"] == src_dim].copy()
@@ -332,9 +343,7 @@ class FlowCalculator:
         # Clean string columns
         for c in m.columns:
             if m[c].dtype == object:
-                m[c] = (
-                    m[c].astype(str).str.replace("\ufeff", "", regex=False).str.strip()
-                )
+                m[c] = clean_labels(m[c])
 
         rows = []
         for _, r in m.iterrows():
@@ -478,6 +487,7 @@ class FlowCalculator:
         value_col: str = "value",
         default_fill: str = "Unknown",
         fill_values_per_df: Optional[Dict[str, Dict]] = None,
+        max_output_rows: int = MAX_RESIDUAL_ROWS,
     ) -> pd.DataFrame:
         """
         Compute residual demand using DIRECT MULTIPLICATION growth.
@@ -485,6 +495,10 @@ class FlowCalculator:
         residual[base_year] = start_value - bottom_up
         residual[t] = residual[base_year] * growth_rate[t]
 
+        Growth rates without some of the alignment keys apply to all their items. The
+        residual base is held as an array over the key codes and indexed per growth row,
+        so memory is proportional to the output, which is limited to max_output_rows.
+
         Used for cement model.
         """
 
@@ -581,20 +595,7 @@ class FlowCalculator:
             stub[value_col] = 1.0
             growth_rate_df = pd.concat([growth_rate_df, stub], ignore_index=True)
 
-        # Broadcast growth across missing keys
-        for k in align_keys:
-            if k not in growth_rate_df.columns:
-                uniques = residual_base[[k]].drop_duplicates()
-                growth_rate_df = (
-                    growth_rate_df.assign(__k=1)
-                    .merge(uniques.assign(__k=1), on="__k")
-                    .drop(columns="__k")
-                )
-
-        # Merge and project
-        if align_keys:
-            gr_merged = growth_rate_df.merge(residual_base, on=align_keys, how="left")
-        else:
+        if not align_keys:
             gr_merged = growth_rate_df.assign(
                 residual_base=float(
                     residual_base["residual_base"].iloc[0]
@@ -602,15 +603,71 @@ class FlowCalculator:
                     else 0
                 )
             )
-
-        gr_merged["residual_base"] = gr_merged["residual_base"].fillna(0)
-        gr_merged[value_col] = gr_merged["residual_base"] * gr_merged[value_col]
-        gr_merged.loc[gr_merged[time_col] == base_year, value_col] = gr_merged.loc[
-            gr_merged[time_col] == base_year, "residual_base"
-        ]
-
-        out_cols = (align_keys if align_keys else []) + [time_col, value_col]
-        return gr_merged[out_cols]
+            gr_merged[value_col] = gr_merged["residual_base"] * gr_merged[value_col]
+            gr_merged.loc[gr_merged[time_col] == base_year, value_col] = gr_merged.loc[
+                gr_merged[time_col] == base_year, "residual_base"
+            ]
+            return gr_merged[[time_col, value_col]]
+
+        # Residual base as a dense array with one axis per alignment key, items in
+        # order of appearance
+        key_items = {k: residual_base[k].drop_duplicates() for k in align_keys}
+        residual = np.zeros(tuple(len(key_items[k]) for k in align_keys))
+        residual[
+            tuple(pd.Index(key_items[k]).get_indexer(residual_base[k]) for k in align_keys)
+        ] = residual_base["residual_base"].to_numpy()
+
+        # Growth rows are matched on the keys they carry and broadcast across the
+        # items of the keys they lack (the last of these varying fastest)
+        present = [k for k in align_keys if k in growth_rate_df.columns]
+        missing = [k for k in align_keys if k not in growth_rate_df.columns]
+        n_rows = len(growth_rate_df)
+        n_broadcast = int(np.prod([len(key_items[k]) for k in missing], dtype=np.int64))
+        n_out = n_rows * n_broadcast
+        if max(n_out, residual.size) > max_output_rows:
+            raise ValueError(
+                f"Residual output would have {n_out} rows ({n_rows} growth rate rows x "
+                f"{n_broadcast} combinations of {missing}) and a residual base of "
+                f"{residual.size} cells, more than max_output_rows={max_output_rows}."
+            )
+        present_shape = [len(key_items[k]) for k in present]
+        residual = residual.transpose(
+            [align_keys.index(k) for k in present + missing]
+        ).reshape(int(np.prod(present_shape, dtype=np.int64)), n_broadcast)
+
+        base = np.zeros((n_rows, n_broadcast))
+        if not present:
+            base[:] = residual[0]
+        elif residual.size:
+            row_codes = [
+                pd.Index(key_items[k]).get_indexer(growth_rate_df[k]) for k in present
+            ]
+            matched = np.logical_and.reduce([c >= 0 for c in row_codes])
+            flat = np.ravel_multi_index([c[matched] for c in row_codes], present_shape)
+            base[matched] = residual[flat]
+
+        values = base * growth_rate_df[value_col].to_numpy()[:, None]
+        at_base_year = (growth_rate_df[time_col] == base_year).to_numpy()
+        values[at_base_year] = base[at_base_year]
+
+        rows = np.repeat(np.arange(n_rows), n_broadcast)
+        combos = (
+            np.unravel_index(np.arange(n_broadcast), [len(key_items[k]) for k in missing])
+            if missing
+            else ()
+        )
+        columns = {}
+        for k in align_keys:
+            if k in present:
+                columns[k] = growth_rate_df[k].take(rows)
+            else:
+                columns[k] = key_items[k].take(np.tile(combos[missing.index(k)], n_rows))
+        columns[time_col] = growth_rate_df[time_col].take(rows)
+        out = pd.DataFrame(
+            {k: column.reset_index(drop=True) for k, column in columns.items()}
+        )
+        out[value_col] = values.reshape(-1)
+        return out
 
     def compute_residual_cumulative_growth(
         self,
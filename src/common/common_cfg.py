@@ -43,12 +43,41 @@ class PlasticsCustomizationCfg(ModelCustomization):
     circular: bool = False # Enable circular-specific features (cycles of recycled and reused plastics)
     end_use_sectors: str = "all"
     waste_not_for_recycling: list = []
+    memory_budget_mb: float = None # compute outflows in blocks of regions fitting this budget (None: all regions at once)
+    sparse_trade: bool = False # store parameters with region and other_region dims for the region pairs with trade only
+    survival_cutoff: float = None # track cohorts in the end use stock only while more than this share survives, e.g. 1e-4 (None: all ages)
+    time_step: float = None # time step of the circular model in years, e.g. 0.25 (None: from the time dimension file, which must match a given value)
+    checkpoint_every: int = None # write a checkpoint of the time loop of the circular model every this many time steps (None: no checkpoints)
+    checkpoint_path: str = None # folder of the checkpoints (None: <output_path>/checkpoints)
+    resume_from: str = None # checkpoint, or folder of checkpoints (latest one), to continue the time loop of the circular model from
+    numba: bool = False # run the time loop of the circular model with a kernel compiled by numba (optional dependency; NumPy otherwise)
 
 class SteelCustomizationCfg(ModelCustomization):
 
     model_driven: str = "production"  # options: production, final_demand
 
 
+class ParameterDistributionCfg(EUMFABaseModel):
+
+    distribution: str = "uniform"  # options: uniform, normal, triangular, lognormal
+    low: float = 0.9  # uniform, triangular
+    high: float = 1.1  # uniform, triangular
+    mode: float = 1.0  # triangular
+    mean: float = 1.0  # normal, lognormal (median of the factor)
+    std: float = 0.1  # normal, lognormal (sigma of the underlying normal)
+    clip: list = None  # optional [min, max] applied to the perturbed parameter values
+
+class SensitivityCfg(EUMFABaseModel):
+
+    sampling: str = "lhs"  # options: lhs, sobol, random
+    n_samples: int = 64
+    batch_size: int = 8
+    seed: int = None
+    parameters: dict[str, ParameterDistributionCfg] = {}  # multiplicative factor per parameter
+    flows: list = []  # flows to summarize (all flows if empty), age-cohorts are summed out
+    quantiles: list = [0.05, 0.5, 0.95]
+
+
 class VisualizationCfg(EUMFABaseModel):
 
     stock: dict = {"do_visualize": False}
@@ -96,6 +125,11 @@ class GeneralCfg(EUMFABaseModel):
     scenario: str
     variant: str = None
     logging: dict = {"level": "INFO"}
+    profile: dict = {"enabled": False, "track_memory": False} # per-stage timing/memory profile written next to the output
+    dtype: str = "float64" # options: float64, float32 (flows, stocks and parameters of plastics and steel)
+    sector_partitions: int = None # compute the flows of plastics and steel on this many blocks of end use sectors in parallel threads (None: all sectors at once)
+    reduced_parameters: bool = False # store parameters (plastics and steel) which are constant along some dimensions with these dimensions collapsed, as read-only broadcast views
+    parameter_cache: str = None # folder for snapshots of the interpolated parameters (plastics and steel), reused while the inputs are unchanged (None: no snapshots)
     input_data_path: str
     customization: ModelCustomization
     visualization: VisualizationCfg
@@ -137,11 +171,13 @@ class PlasticsCfg(GeneralCfg):
 
     visualization: PlasticsVisualizationCfg
     customization: PlasticsCustomizationCfg
+    sensitivity: SensitivityCfg = None
 
 class SteelCfg(GeneralCfg):
 
     visualization: SteelVisualizationCfg
     customization: SteelCustomizationCfg
+    sensitivity: SensitivityCfg = None
 
 class CementTopdownCfg(GeneralCfg):
     visualization: CementTopdownVisualizationCfg
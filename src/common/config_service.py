@@ -0,0 +1,109 @@
+# src/common/config_service.py
+
+"""
+Loading, layering and validation of the model config files.
+
+This module provides:
+- load_config_file, the content of a YAML config file, parsed once per file version
+- merge_configs, layering configs (e.g. base + variant + command line overrides)
+- parse_overrides, command line overrides 'key.subkey=value' as a nested config dict
+- add_data_paths, the input and output data paths of scenario, model class and variant
+- resolve_config, the validated GeneralCfg of layered config files and overrides
+
+Resolved configs are cached, so sweeps and the combined workflow neither re-read nor
+re-validate a config file. The models are frozen only at their top level, so each caller
+gets a deep copy of the cached config: changing one of its dicts (e.g. do_export) in place
+does not reach other callers. Derive a modified config with resolve_config(...,
+overrides=...) instead of changing one.
+YAML is parsed with the C loader of PyYAML (CSafeLoader) when libyaml is available.
+"""
+
+import copy
+import json
+import os
+from typing import Dict, List
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+from src.common.common_cfg import GeneralCfg
+
+
+# Parsed config files by absolute path: (file version, content)
+_PARSED: Dict[str, tuple] = {}
+# Resolved configs by config files (with their versions), overrides and path handling
+_RESOLVED: Dict[str, GeneralCfg] = {}
+
+
+def _file_version(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_config_file(filename: str) -> dict:
+    """Content of a YAML config file, as a copy the caller may modify."""
+    path = os.path.abspath(filename)
+    version = _file_version(path)
+    if path not in _PARSED or _PARSED[path][0] != version:
+        with open(path, "r") as stream:
+            _PARSED[path] = (version, yaml.load(stream, Loader=SafeLoader) or {})
+    return copy.deepcopy(_PARSED[path][1])
+
+
+def merge_configs(*layers: dict) -> dict:
+    """Merge config layers; later layers override earlier ones, nested dicts are merged key by key."""
+    merged = {}
+    for layer in layers:
+        for key, value in layer.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = merge_configs(merged[key], value)
+            else:
+                merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def parse_overrides(items: List[str]) -> dict:
+    """Overrides like ['customization.sparse_trade=true', 'dtype=float32'] as a nested dict, values parsed as YAML."""
+    overrides = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Config override must be given as key=value, got {item}.")
+        *parents, leaf = key.strip().split(".")
+        layer = overrides
+        for parent in parents:
+            layer = layer.setdefault(parent, {})
+        layer[leaf] = yaml.load(value, Loader=SafeLoader)
+    return overrides
+
+
+def add_data_paths(config: dict) -> dict:
+    """Set input_data_path and output_path (with the variant, if given) from scenario and model class."""
+    data_path = f"data/{config['scenario']}_{config['model_class']}"
+    config["input_data_path"] = f"{data_path}/input"
+    if config.get("variant") is not None:
+        config["output_path"] = f"{data_path}/output_{config['variant']}"
+    else:
+        config["output_path"] = f"{data_path}/output"
+    return config
+
+
+def resolve_config(*cfg_files: str, overrides: dict = None, derive_data_paths: bool = True) -> GeneralCfg:
+    """
+    Validated config of the layered config files and overrides (applied last), as a deep copy
+    of the cached config. With derive_data_paths, the data paths of the files are replaced by
+    those of add_data_paths.
+    """
+    paths = [os.path.abspath(cfg_file) for cfg_file in cfg_files]
+    key = json.dumps([[(path, _file_version(path)) for path in paths], overrides, derive_data_paths], sort_keys=True, default=str)
+    if key not in _RESOLVED:
+        config = merge_configs(*[load_config_file(path) for path in paths])
+        if derive_data_paths:
+            config = add_data_paths(config)
+        config = merge_configs(config, overrides or {})
+        _RESOLVED[key] = GeneralCfg.from_model_class(**config)
+    return _RESOLVED[key].model_copy(deep=True)
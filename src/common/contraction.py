@@ -0,0 +1,68 @@
+# src/common/contraction.py
+
+"""
+einsum contractions with the summation of single-operand indices done first.
+
+This module provides:
+- contract, a drop-in replacement for np.einsum(subscripts, *operands)
+
+np.einsum sums an index that appears in only one operand inside the joint loop over all
+indices, e.g. z in the circular market share contraction 'rtspexz,rRtsp->Rtspex', so the
+product is evaluated for every z. contract first reduces each operand over its own indices
+and then contracts the reduced operands, which is much faster for such subscripts.
+einsum's optimize paths are not used, since they change the summation order of the
+contraction (BLAS) and hence the results in the last digits.
+Broadcast axes (zero strides, e.g. of reduced parameters, see reduced_rank.py) are dropped from
+an operand if another operand carries the index, so that an index summed over which is constant
+in one operand is reduced in the others first.
+The plan is cached per subscripts string.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def _plan(subscripts: str) -> tuple:
+    """Reduction subscripts per operand (None if nothing to reduce) and the subscripts of the contraction."""
+    inputs, output = subscripts.replace(" ", "").split("->")
+    inputs = inputs.split(",")
+    reductions, reduced_inputs = [], []
+    for i, operand_subs in enumerate(inputs):
+        others = "".join(inputs[:i] + inputs[i + 1:]) + output
+        kept = "".join(s for s in operand_subs if s in others)
+        if len(set(kept)) != len(kept):  # repeated index (diagonal), left to the contraction
+            kept = operand_subs
+        reductions.append(f"{operand_subs}->{kept}" if kept != operand_subs else None)
+        reduced_inputs.append(kept)
+    return tuple(reductions), f"{','.join(reduced_inputs)}->{output}"
+
+
+def _drop_broadcast_axes(subscripts: str, operands: tuple) -> tuple:
+    """Subscripts and operands without the broadcast axes of indices that another operand carries."""
+    inputs, output = subscripts.replace(" ", "").split("->")
+    inputs = inputs.split(",")
+    operands = list(operands)
+    for i, op in enumerate(operands):
+        index, kept = [], ""
+        for letter, n, stride in zip(inputs[i], op.shape, op.strides):
+            others = "".join(inputs[:i] + inputs[i + 1:])
+            if stride == 0 and n > 1 and letter in others and inputs[i].count(letter) == 1:
+                index.append(0)
+            else:
+                index.append(slice(None))
+                kept += letter
+        if kept != inputs[i]:
+            operands[i] = op[tuple(index)]
+            inputs[i] = kept
+    return f"{','.join(inputs)}->{output}", operands
+
+
+def contract(subscripts: str, *operands: np.ndarray) -> np.ndarray:
+    """np.einsum(subscripts, *operands), summing indices that only one operand carries beforehand."""
+    if any(0 in op.strides for op in operands):
+        subscripts, operands = _drop_broadcast_axes(subscripts, operands)
+    reductions, contraction = _plan(subscripts)
+    reduced = [op if reduction is None else np.einsum(reduction, op) for reduction, op in zip(reductions, operands)]
+    return np.einsum(contraction, *reduced)
@@ -1,14 +1,20 @@
 import os
 import logging
-from matplotlib import pyplot as plt
+import pickle
 import pandas as pd
-from typing import Dict
+from typing import TYPE_CHECKING, Dict
 from src.common.base_model import EUMFABaseModel
-import plotly.graph_objects as go
 import flodym as fd
-import flodym.export as fde
 
 from src.common.common_cfg import VisualizationCfg
+from src.common.profiling import profiled
+from src.common.async_export import EXPORT_QUEUE
+
+# flodym.export (which loads matplotlib and plotly) and the plotting libraries are slow to
+# import, so they are imported where used, i.e. only if exporting or visualizing
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+    import flodym.export as fde
 
 
 class CustomDataExporter(EUMFABaseModel):
@@ -18,43 +24,59 @@ class CustomDataExporter(EUMFABaseModel):
     cfg: VisualizationCfg
     _display_names: dict = {}
 
+    @profiled()
     def export_mfa(self, mfa: fd.MFASystem):
+        """Export the MFA system as pickle and/or its flows and stocks to csv (converted here, written in the background, see async_export)."""
+        import flodym.export as fde
         if self.do_export["pickle"]:
-            fde.export_mfa_to_pickle(mfa=mfa, export_path=self.export_path("mfa.pickle"))
+            os.makedirs(self.export_path(), exist_ok=True)
+            # as fde.export_mfa_to_pickle; pickled here, as the caller may change the arrays of mfa after returning
+            EXPORT_QUEUE.write_bytes(pickle.dumps(fde.convert_to_dict(mfa)), self.export_path("mfa.pickle"))
         if self.do_export["csv"]:
+            # as fde.export_mfa_flows_to_csv and fde.export_mfa_stocks_to_csv
             dir_out = os.path.join(self.export_path(), "flows")
-            fde.export_mfa_flows_to_csv(mfa=mfa, export_directory=dir_out)
-            fde.export_mfa_stocks_to_csv(mfa=mfa, export_directory=dir_out)
-
+            os.makedirs(dir_out, exist_ok=True)
+            for flow_name, flow in mfa.flows.items():
+                EXPORT_QUEUE.write_csv(flow.to_df(), os.path.join(dir_out, f"{fde.helper.to_valid_file_name(flow_name)}.csv"))
+            for stock_name, stock in mfa.stocks.items():
+                EXPORT_QUEUE.write_csv(stock.stock.to_df(), os.path.join(dir_out, f"{fde.helper.to_valid_file_name(stock_name)}_stock.csv"))
+            logging.info(f"Flows and stocks queued for export to {dir_out}")
+
+    @profiled()
     def export_selected_mfa_flows_to_csv(self, mfa: fd.MFASystem, flow_names: list[str]):
         '''Export selected flows from the flodym MFA system to CSV files.'''
+        import flodym.export as fde
         dir_out = os.path.join(self.export_path(), "flows")
         if not os.path.exists(dir_out):
             os.makedirs(dir_out)
         for flow_name in flow_names:
             try:
                 flow = mfa.flows[flow_name]
-                flow.to_df().to_csv(os.path.join(dir_out, f"{fde.helper.to_valid_file_name(flow_name)}.csv"))
+                EXPORT_QUEUE.write_csv(flow.to_df(), os.path.join(dir_out, f"{fde.helper.to_valid_file_name(flow_name)}.csv"))
             except KeyError:
                 logging.INFO(f"Export to csv: flow '{flow_name}' not found in MFA system.")
                 continue
     
+    @profiled()
     def export_selected_flows_to_csv(self, flow_dfs: Dict[str, pd.DataFrame], flow_names: list[str]):
         '''Export selected flows already available as dataframes to CSV files.'''
+        import flodym.export as fde
         dir_out = os.path.join(self.export_path(), "flows")
         if not os.path.exists(dir_out):
             os.makedirs(dir_out)
         for flow_name in flow_names:
             try:
                 flow = flow_dfs[flow_name]
-                flow.to_csv(os.path.join(dir_out, f"{fde.helper.to_valid_file_name(flow_name)}.csv"))
+                EXPORT_QUEUE.write_csv(flow, os.path.join(dir_out, f"{fde.helper.to_valid_file_name(flow_name)}.csv"))
             except KeyError:
                 logging.INFO(f"Export to csv: flow '{flow_name}' not found in provided flow_dfs dictionary.")
                 continue
 
 
+    @profiled()
     def export_sliced_stocks_to_csv(self, mfa: fd.MFASystem, stock_names: list[str], slice_dicts: list[Dict]):
         '''Export sliced stocks from the flodym MFA system to CSV files.'''
+        import flodym.export as fde
         dir_out = os.path.join(self.export_path(), "stocks")
         if not os.path.exists(dir_out):
             os.makedirs(dir_out)
@@ -66,19 +88,21 @@ class CustomDataExporter(EUMFABaseModel):
                 for slice_dict in slice_dicts:
                     for col, vals in slice_dict.items():
                         sliced_stock = sliced_stock[sliced_stock[col].isin(vals)]
-                sliced_stock.to_csv(os.path.join(dir_out, f"{fde.helper.to_valid_file_name(stock_name)}_sliced.csv"))
+                EXPORT_QUEUE.write_csv(sliced_stock, os.path.join(dir_out, f"{fde.helper.to_valid_file_name(stock_name)}_sliced.csv"))
             except KeyError:
                 logging.INFO(f"Export to csv: stock '{stock_name}' not found in MFA system.")
                 continue
 
+    @profiled()
     def export_sliced_stocks_by_age_cohort_to_csv(self, mfa: fd.MFASystem, stock_names: list[str], slice_dicts: list[Dict]):
         '''Export sliced stocks *including the age-cohort dimension* from the flodym MFA system to CSV files.'''
+        import flodym.export as fde
         dir_out = os.path.join(self.export_path(), "stocks")
         if not os.path.exists(dir_out):
             os.makedirs(dir_out)
         for stock_name in stock_names:
             try:
-                stock = mfa.stocks[stock_name]._stock_by_cohort # WARNING: this is a numpy array, not a FlodymArray!
+                stock = mfa.stocks[stock_name].get_stock_by_cohort() # WARNING: this is a numpy array, not a FlodymArray!
                 # 
                 if not mfa.cfg.customization.prodcom:
                     if not mfa.cfg.customization.circular:
@@ -93,7 +117,7 @@ class CustomDataExporter(EUMFABaseModel):
                 for slice_dict in slice_dicts:
                     for col, vals in slice_dict.items():
                         sliced_stock = sliced_stock[sliced_stock[col].isin(vals)]
-                sliced_stock.to_csv(os.path.join(dir_out, f"{fde.helper.to_valid_file_name(stock_name)}_by_age_cohort_sliced.csv"))
+                EXPORT_QUEUE.write_csv(sliced_stock, os.path.join(dir_out, f"{fde.helper.to_valid_file_name(stock_name)}_by_age_cohort_sliced.csv"))
             except KeyError:
                 logging.INFO(f"Export to csv: stock '{stock_name}' not found in MFA system.")
                 continue
@@ -108,13 +132,14 @@ class CustomDataExporter(EUMFABaseModel):
     def figure_path(self, filename: str):
         return os.path.join(self.output_path, "figures", filename)
 
-    def _show_and_save_plotly(self, fig: go.Figure, name):
+    def _show_and_save_plotly(self, fig: "go.Figure", name):
         if self.cfg.do_save_figs:
             fig.write_image(self.figure_path(f"{name}.png"))
         if self.cfg.do_show_figs:
             fig.show()
 
     def visualize_sankey(self, mfa: fd.MFASystem):
+        import flodym.export as fde
         plotter = fde.PlotlySankeyPlotter(
             mfa=mfa, display_names=self._display_names, **self.cfg.sankey
         )
@@ -130,7 +155,7 @@ class CustomDataExporter(EUMFABaseModel):
     def figure_path(self, filename: str) -> str:
         return os.path.join(self.output_path, "figures", filename)
 
-    def plot_and_save_figure(self, plotter: fde.ArrayPlotter, filename: str, do_plot: bool = True):
+    def plot_and_save_figure(self, plotter: "fde.ArrayPlotter", filename: str, do_plot: bool = True):
         if do_plot:
             plotter.plot()
         if self.cfg.do_show_figs:
@@ -140,10 +165,12 @@ class CustomDataExporter(EUMFABaseModel):
 
     def stop_and_show(self):
         if self.cfg.plotting_engine == "pyplot" and self.cfg.do_show_figs:
+            from matplotlib import pyplot as plt
             plt.show()
 
     @property
     def plotter_class(self):
+        import flodym.export as fde
         if self.cfg.plotting_engine == "plotly":
             return fde.PlotlyArrayPlotter
         elif self.cfg.plotting_engine == "pyplot":
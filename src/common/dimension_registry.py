@@ -0,0 +1,109 @@
+# src/common/dimension_registry.py
+
+"""
+Process-wide registry of the dimension files of the models and the combined model.
+
+This module provides:
+- DIMENSIONS, the registry: every dimension file version is read once per process
+  - dimension, the flodym Dimension of a dimension definition read from a file
+  - items, the cleaned labels of a dimension file (first column), e.g. for the "all" expansion
+    of the product mappings of the combined model
+  - item_index and codes, label -> index maps of files and of flodym Dimensions, and the
+    integer codes of an array of labels (-1 for labels that are not items)
+- RegistryDimensionReader, the CSV dimension reader of MFASystem.from_csv using the registry
+- clean_labels, label cleaning (str, without byte order mark and surrounding whitespace) done
+  once per distinct label instead of once per row
+
+Entries are keyed by the absolute file path with its modification time and size, as in the
+input cache (see input_cache.py), so an edited file is read again. Labels are interned, so
+equal labels of different files are the same string object and compare by identity first.
+Dimensions are shared: callers must not modify their items.
+"""
+
+import os
+import sys
+from typing import Dict, Optional, Sequence, Tuple
+
+import flodym as fd
+import numpy as np
+import pandas as pd
+
+
+def _file_key(path: str) -> tuple:
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def clean_labels(values: pd.Series) -> pd.Series:
+    """values.astype(str) without byte order marks and surrounding whitespace, cleaning each distinct label once."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    cleaned = pd.Series(uniques).astype(str).str.replace("\ufeff", "", regex=False).str.strip()
+    return cleaned.take(codes).set_axis(values.index).rename(values.name)
+
+
+class DimensionRegistry:
+    """Dimensions and label -> index maps, read once per dimension file version."""
+
+    def __init__(self):
+        self._dimensions: Dict[tuple, fd.Dimension] = {}
+        self._items: Dict[tuple, Tuple[str, ...]] = {}
+        self._indices: Dict[object, tuple] = {}
+        self.reads = 0
+
+    def clear(self):
+        self._dimensions = {}
+        self._items = {}
+        self._indices = {}
+
+    def dimension(self, definition: fd.DimensionDefinition, path: str) -> fd.Dimension:
+        """Dimension of definition read from path (as fd.CSVDimensionReader)."""
+        key = (_file_key(path), definition.name, definition.letter, str(definition.dtype))
+        if key not in self._dimensions:
+            self.reads += 1
+            dimension = fd.CSVDimensionReader(dimension_files={definition.name: path}).read_dimension(definition)
+            if all(isinstance(item, str) for item in dimension.items):
+                dimension.items = [sys.intern(item) for item in dimension.items]
+            self._dimensions[key] = dimension
+        return self._dimensions[key]
+
+    def items(self, path: str, sep: Optional[str] = None) -> Tuple[str, ...]:
+        """Cleaned labels of the first column of a dimension file with a header (empty cells dropped)."""
+        key = (_file_key(path), sep)
+        if key not in self._items:
+            self.reads += 1
+            df = pd.read_csv(path, sep=sep or None, engine="python")
+            labels = clean_labels(df[df.columns[0]].dropna()) if not df.empty else pd.Series([], dtype=str)
+            self._items[key] = tuple(sys.intern(label) for label in labels)
+        return self._items[key]
+
+    def item_index(self, dimension) -> Dict[object, int]:
+        """label -> index map of a flodym Dimension or of the items of a dimension file (path)."""
+        if isinstance(dimension, str):
+            key = _file_key(dimension)
+            items = self.items(dimension)
+        else:
+            # Dimensions are shared and not modified, so they are identified by their object,
+            # which the entry keeps alive
+            key = id(dimension)
+            items = dimension.items
+        if key not in self._indices:
+            self._indices[key] = (dimension, {item: i for i, item in enumerate(items)})
+        return self._indices[key][1]
+
+    def codes(self, dimension, labels: Sequence) -> np.ndarray:
+        """Index of each label along the dimension (see item_index); -1 for labels that are not items."""
+        index = self.item_index(dimension)
+        codes, uniques = pd.factorize(pd.Series(labels), use_na_sentinel=False)
+        positions = np.array([index.get(label, -1) for label in uniques], dtype=np.intp)
+        return positions[codes]
+
+
+DIMENSIONS = DimensionRegistry()
+
+
+class RegistryDimensionReader(fd.CSVDimensionReader):
+    """CSVDimensionReader reading each dimension file version once per process (DIMENSIONS)."""
+
+    def read_dimension(self, definition: fd.DimensionDefinition) -> fd.Dimension:
+        return DIMENSIONS.dimension(definition, self.dimension_files[definition.name])
@@ -0,0 +1,143 @@
+# src/common/input_cache.py
+
+"""
+In-memory cache of the parameters read from the input CSV files.
+
+This module provides:
+- INPUT_CACHE, parameter values by file version and requested dimensions,
+  disabled by default and enabled by the model server (see model_server.py)
+- CachedCSVDataReader, the CSV data reader of MFASystem.from_csv going through the cache
+- load_mfa_from_csv, MFASystem.from_csv for the models, using the cache when it is enabled
+  and reading large parameter files in chunks (see streaming_csv.py)
+
+Entries are keyed by the absolute file path with its modification time and size, so an
+edited input file is read again. Parameters are handed out as copies, since the compute
+stages modify parameters in place (e.g. interpolate_parameters); dimensions are shared and
+always read through the process-wide registry (see dimension_registry.py).
+"""
+
+import logging
+import os
+from typing import Callable, Dict
+
+import flodym as fd
+
+from src.common.dimension_registry import RegistryDimensionReader
+from src.common.streaming_csv import StreamingCSVParameterReader
+
+
+class InputCache:
+    """Read dimensions and parameters by cache key, counting hits and misses."""
+
+    def __init__(self):
+        self.enabled = False
+        self._entries: Dict[tuple, object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_read(self, key: tuple, read: Callable[[], object]):
+        if key in self._entries:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._entries[key] = read()
+        return self._entries[key]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the cached parameter values."""
+        return sum(entry.values.nbytes for entry in self._entries.values() if isinstance(entry, fd.Parameter))
+
+
+INPUT_CACHE = InputCache()
+
+
+def _file_key(path: str) -> tuple:
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def _dims_key(dims: fd.DimensionSet) -> tuple:
+    return tuple((dim.letter, tuple(dim.items)) for dim in dims)
+
+
+class CachedCSVDataReader(fd.CompoundDataReader):
+    """CSV dimension and parameter reader (as in MFASystem.from_csv) reading each file version once."""
+
+    def __init__(
+        self,
+        dimension_files: dict,
+        parameter_files: dict,
+        allow_missing_parameter_values: bool = False,
+        allow_extra_parameter_values: bool = False,
+        cache: InputCache = INPUT_CACHE,
+    ):
+        super().__init__(
+            dimension_reader=RegistryDimensionReader(dimension_files=dimension_files),
+            parameter_reader=StreamingCSVParameterReader(
+                parameter_files=parameter_files,
+                allow_missing_values=allow_missing_parameter_values,
+                allow_extra_values=allow_extra_parameter_values,
+            ),
+        )
+        self.dimension_files = dimension_files
+        self.parameter_files = parameter_files
+        self.allow_flags = (allow_missing_parameter_values, allow_extra_parameter_values)
+        self.cache = cache
+
+    def read_parameter_values(self, parameter_name: str, dims: fd.DimensionSet) -> fd.Parameter:
+        key = (
+            "parameter",
+            _file_key(self.parameter_files[parameter_name]),
+            parameter_name,
+            _dims_key(dims),
+            self.allow_flags,
+        )
+        cached = self.cache.get_or_read(
+            key, lambda: super(CachedCSVDataReader, self).read_parameter_values(parameter_name, dims)
+        )
+        return fd.Parameter(dims=cached.dims, values=cached.values.copy(), name=cached.name)
+
+
+def load_mfa_from_csv(
+    mfa_class: type,
+    definition: fd.MFADefinition,
+    dimension_files: dict,
+    parameter_files: dict,
+    allow_missing_parameter_values: bool = False,
+    allow_extra_parameter_values: bool = False,
+) -> fd.MFASystem:
+    """mfa_class.from_csv, with dimensions and parameters from INPUT_CACHE if it is enabled."""
+    if not INPUT_CACHE.enabled:
+        data_reader = fd.CompoundDataReader(
+            dimension_reader=RegistryDimensionReader(dimension_files=dimension_files),
+            parameter_reader=StreamingCSVParameterReader(
+                parameter_files=parameter_files,
+                allow_missing_values=allow_missing_parameter_values,
+                allow_extra_values=allow_extra_parameter_values,
+            ),
+        )
+        return mfa_class.from_data_reader(definition=definition, data_reader=data_reader)
+    data_reader = CachedCSVDataReader(
+        dimension_files=dimension_files,
+        parameter_files=parameter_files,
+        allow_missing_parameter_values=allow_missing_parameter_values,
+        allow_extra_parameter_values=allow_extra_parameter_values,
+    )
+    misses = INPUT_CACHE.misses
+    mfa = mfa_class.from_data_reader(definition=definition, data_reader=data_reader)
+    logging.info(f"model - {mfa_class.__name__} inputs: {INPUT_CACHE.misses - misses} read from csv, rest from the input cache")
+    return mfa
@@ -0,0 +1,32 @@
+# src/common/model_registry.py
+
+"""
+Registry of the model classes by the model_class config item.
+
+This module provides:
+- MODEL_CLASSES, the import path of the model class of each model_class
+- get_model_class, the model class of a model_class, imported on first use
+
+Model classes are imported on first use so that running one model does not import all
+others (see benchmarks/import_time.py).
+"""
+
+import importlib
+
+
+MODEL_CLASSES = {
+    "buildings": "src.buildings.buildings_model.BuildingsModel",
+    "vehicles": "src.vehicles.vehicles_model.VehiclesModel",
+    "plastics": "src.plastics.plastics_model.PlasticsModel",
+    "steel": "src.steel.steel_model.SteelModel",
+    "cement_topdown": "src.cement_topdown.cement_topdown_model.CementTopdownModel",
+    "cement_stock" : "src.cement_stock.cement_stock_model.CementStockModel",
+    "cement_flows" : "src.cement_flows.cement_flows_model.CementFlowsModel"
+}
+
+
+def get_model_class(model_class: str) -> type:
+    if model_class not in MODEL_CLASSES:
+        raise ValueError(f"Model class {model_class} not supported.")
+    module_name, class_name = MODEL_CLASSES[model_class].rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
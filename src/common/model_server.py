@@ -0,0 +1,202 @@
+# src/common/model_server.py
+
+"""
+Local model server keeping the inputs of configured scenarios in memory between runs.
+
+This module provides:
+- ModelServer, reading the inputs of the configured scenarios once (INPUT_CACHE) and running
+  requests concurrently in a pool of worker processes forked from the warm server process
+- run_request, one model run of a config file with overrides, flows and stocks written to Parquet
+- serve, the JSON interface on a local HTTP port
+
+HTTP interface:
+- POST /runs {"config": "config/steel_baseline_pd.yml", "overrides": {"dtype": "float32"}, "wait": false}
+  starts a run and returns {"id": ..., "status": "running"}; with "wait": true, the finished run
+- GET /runs/<id>: {"id", "config", "status" (running, done or failed), "output_path", "files", "error"}
+- GET /status: the warm configs, number and size of the cached inputs and the runs
+
+The workers are forked once the inputs are read, so they share the cached inputs copy-on-write
+and never modify them: each run works on copies of the parameters (see input_cache.py).
+Inputs of configs that were not warmed at start are read by the worker and cached in it only.
+Needs the fork start method of multiprocessing (Linux, macOS).
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import flodym as fd
+
+from src.common.config_service import resolve_config
+from src.common.input_cache import INPUT_CACHE
+from src.common.model_registry import get_model_class
+
+
+def _file_name(name: str) -> str:
+    return name.replace(" => ", "__").replace(" ", "_") + ".parquet"
+
+
+def export_parquet(mfa: fd.MFASystem, output_path: str) -> List[str]:
+    """Write the non-zero values of all flows and stocks to one Parquet file each."""
+    os.makedirs(output_path, exist_ok=True)
+    arrays = {name: flow for name, flow in mfa.flows.items()}
+    arrays.update({f"stock {name}": stock.stock for name, stock in mfa.stocks.items()})
+    files = []
+    for name, array in arrays.items():
+        file_path = os.path.join(output_path, _file_name(name))
+        array.to_df(index=False, sparse=True).to_parquet(file_path, index=False)
+        files.append(file_path)
+    return files
+
+
+def run_request(cfg_file: str, overrides: dict, run_id: str) -> dict:
+    """Compute the model of a config file with overrides and write its results to <output_path>/runs/<run_id>."""
+    start = time.perf_counter()
+    cfg = resolve_config(cfg_file, overrides=overrides)
+    model = get_model_class(cfg.model_class)(cfg=cfg)
+    model.mfa.compute()
+    output_path = os.path.join(cfg.output_path, "runs", run_id)
+    files = export_parquet(model.mfa, output_path)
+    logging.info(f"server - run {run_id} of {cfg_file} done in {time.perf_counter() - start:.1f} s")
+    return {"output_path": output_path, "files": files}
+
+
+class ModelServer:
+    """
+    Warm inputs of the configured scenarios and a worker pool for run requests.
+
+    Parameters
+    ----------
+    cfg_files : list of str
+        Config files whose inputs are read before the workers start
+    max_workers : int
+        Number of worker processes, i.e. of runs computed at the same time
+    """
+
+    def __init__(self, cfg_files: List[str], max_workers: int = 2):
+        self.cfg_files = list(cfg_files)
+        self.max_workers = max_workers
+        self.runs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def start(self):
+        """Read the inputs of the configured scenarios, then fork the workers."""
+        INPUT_CACHE.enable()
+        for cfg_file in self.cfg_files:
+            start = time.perf_counter()
+            cfg = resolve_config(cfg_file)
+            get_model_class(cfg.model_class)(cfg=cfg)
+            logging.info(f"server - inputs of {cfg_file} read in {time.perf_counter() - start:.1f} s")
+        logging.info(f"server - {len(INPUT_CACHE)} inputs cached ({INPUT_CACHE.nbytes / 1024**2:.1f} MB of parameters)")
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("fork"))
+        # fork all workers now, while the server process has no other threads
+        for future in [self._pool.submit(os.getpid) for _ in range(self.max_workers)]:
+            future.result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def submit(self, cfg_file: str, overrides: dict = None) -> str:
+        """Start a run and return its id."""
+        if self._pool is None:
+            raise RuntimeError("ModelServer must be started before submitting runs.")
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        future = self._pool.submit(run_request, cfg_file, overrides or {}, run_id)
+        with self._lock:
+            self.runs[run_id] = {"config": cfg_file, "overrides": overrides or {}, "future": future}
+        return run_id
+
+    def result(self, run_id: str, wait: bool = False) -> dict:
+        """State of a run, with its output files once it is done."""
+        run = self.runs[run_id]
+        future = run["future"]
+        if wait:
+            future.exception()
+        info = {"id": run_id, "config": run["config"], "overrides": run["overrides"], "status": "running"}
+        if future.done():
+            error = future.exception()
+            if error is None:
+                info.update(status="done", **future.result())
+            else:
+                info.update(status="failed", error=f"{type(error).__name__}: {error}")
+        return info
+
+    def status(self) -> dict:
+        return {
+            "warm_configs": self.cfg_files,
+            "cached_inputs": len(INPUT_CACHE),
+            "cached_mb": round(INPUT_CACHE.nbytes / 1024**2, 1),
+            "max_workers": self.max_workers,
+            "runs": {run_id: self.result(run_id)["status"] for run_id in list(self.runs)},
+        }
+
+
+# ===================================================================
+# HTTP interface
+# ===================================================================
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "EUMFAModelServer"
+
+    @property
+    def model_server(self) -> ModelServer:
+        return self.server.model_server
+
+    def _reply(self, code: int, content: dict):
+        body = json.dumps(content, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._reply(200, self.model_server.status())
+        elif self.path.startswith("/runs/") and self.path[len("/runs/"):] in self.model_server.runs:
+            self._reply(200, self.model_server.result(self.path[len("/runs/"):]))
+        else:
+            self._reply(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/runs":
+            self._reply(404, {"error": f"Not found: {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            cfg_file = request["config"]
+            if not os.path.exists(cfg_file):
+                raise FileNotFoundError(f"Config file not found: {cfg_file}")
+        except (ValueError, KeyError, FileNotFoundError) as error:
+            self._reply(400, {"error": f"{type(error).__name__}: {error}"})
+            return
+        run_id = self.model_server.submit(cfg_file, overrides=request.get("overrides"))
+        self._reply(200, self.model_server.result(run_id, wait=request.get("wait", False)))
+
+    def log_message(self, format, *args):
+        logging.info(f"server - {self.address_string()} {format % args}")
+
+
+def serve(model_server: ModelServer, host: str = "127.0.0.1", port: int = 8765):
+    """Start the model server and answer requests on host:port until interrupted."""
+    model_server.start()
+    httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+    httpd.model_server = model_server
+    logging.info(f"server - listening on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        model_server.shutdown()
@@ -0,0 +1,141 @@
+# src/common/parameter_cache.py
+
+"""
+Snapshots of the interpolated parameters, reused by runs with unchanged inputs.
+
+This module provides:
+- parameter_hash, a hash of the values of parameters and of the time dimension of an MFA system
+- InterpolationCacheMixin for MFA systems: interpolate_parameters_cached, taking the interpolated
+  parameters from a snapshot if one exists for the raw parameter values, and interpolating and
+  writing a snapshot otherwise
+- export_parameter_csv, the csv export of a parameter, copied from its snapshot if written before
+
+Snapshots are folders <parameter_cache>/<system class>_<hash> with one .npy file per interpolated
+parameter. The hash covers the raw values (with dtype and, for sparse trade parameters, links) of
+these parameters, the time items and the source of interpolate_parameters. Snapshot arrays are
+memory-mapped copy-on-write (mmap_mode="c"): pages are read on first access, later in-place
+changes stay in memory and the snapshot files are never modified.
+Interpolating is idempotent, so parameters that are already interpolated (e.g. at a second
+compute of the same system) are recognized by the hash of the interpolated values and kept.
+With the reduced_parameters config item, the parameters are expanded before they are
+interpolated in place and reduced again afterwards (see reduced_rank.py).
+"""
+
+import hashlib
+import inspect
+import logging
+import os
+import shutil
+from typing import List
+
+import flodym as fd
+import numpy as np
+import pandas as pd
+
+from src.common.async_export import EXPORT_QUEUE
+from src.common.reduced_rank import expand_parameters, reduce_parameters
+
+
+def _update_with_array(digest, values: np.ndarray):
+    values = np.ascontiguousarray(values)
+    digest.update(f"{values.dtype.str}{values.shape}".encode())
+    digest.update(values.reshape(-1).view(np.uint8))
+
+
+def parameter_hash(mfa: fd.MFASystem, names: List[str]) -> str:
+    """Hash of the named parameters, the time items and the interpolation code of the system."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(type(mfa).__name__.encode())
+    digest.update(inspect.getsource(type(mfa).interpolate_parameters).encode())
+    digest.update(repr(list(mfa.dims["t"].items)).encode())
+    for name in names:
+        parameter = mfa.parameters[name]
+        digest.update(name.encode())
+        _update_with_array(digest, parameter.values)
+        if getattr(parameter, "links", None) is not None:
+            _update_with_array(digest, parameter.links)
+    return digest.hexdigest()
+
+
+class InterpolationCacheMixin:
+    """
+    Mixin for MFA systems caching the result of interpolate_parameters in the parameter_cache
+    folder of the config. Must come before fd.MFASystem in the bases.
+    """
+
+    def disable_parameter_cache(self):
+        """Interpolate without snapshots, e.g. for the many perturbed inputs of a sensitivity run."""
+        object.__setattr__(self, "_parameter_cache_enabled", False)
+
+    @property
+    def parameter_snapshot(self) -> str:
+        """Snapshot folder of the current interpolated parameters (None if not cached)."""
+        return self.__dict__.get("_parameter_snapshot")
+
+    def interpolate_parameters_cached(self, names: List[str]):
+        """interpolate_parameters, which only fills in the parameters names, or their values of a snapshot."""
+        folder = self.cfg.parameter_cache
+        if folder is None or not self.__dict__.get("_parameter_cache_enabled", True):
+            expand_parameters(self, names)
+            self.interpolate_parameters()
+            self._reduce_interpolated(names)
+            return
+        key = parameter_hash(self, names)
+        if key == self.__dict__.get("_interpolated_hash"):
+            logging.info("mfa_system - parameters are interpolated already")
+            return
+        path = os.path.join(folder, f"{type(self).__name__}_{key}")
+        if os.path.isdir(path):
+            logging.info(f"mfa_system - interpolated parameters from snapshot {path}")
+            for name in names:
+                values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c")
+                if values.shape != self.parameters[name].values.shape:
+                    raise ValueError(f"Snapshot {path} of {name} has shape {values.shape}, expected {self.parameters[name].values.shape}.")
+                self.parameters[name].values = values
+        else:
+            expand_parameters(self, names)
+            self.interpolate_parameters()
+            self._write_snapshot(path, names)
+        object.__setattr__(self, "_parameter_snapshot", path)
+        object.__setattr__(self, "_interpolated_hash", parameter_hash(self, names))
+        self._reduce_interpolated(names)
+
+    def _reduce_interpolated(self, names: List[str]):
+        if getattr(self.cfg, "reduced_parameters", False):
+            reduce_parameters(self, names)
+
+    def _write_snapshot(self, path: str, names: List[str]):
+        """Write to a temporary folder first, so that an incomplete snapshot is never used."""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        for name in names:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), self.parameters[name].values)
+        try:
+            os.rename(tmp_path, path)
+            logging.info(f"mfa_system - interpolated parameters written to snapshot {path}")
+        except OSError:  # written by a concurrent run in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _write_csv_replace(df: pd.DataFrame, path: str):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def export_parameter_csv(mfa: fd.MFASystem, name: str, path: str):
+    """
+    Queue the export of a parameter (non-zero values) to csv. Interpolated parameters of a snapshot
+    are converted once and stored with the snapshot; later exports copy that file.
+    """
+    snapshot = getattr(mfa, "parameter_snapshot", None)
+    cached_csv = None
+    if snapshot is not None and os.path.exists(os.path.join(snapshot, f"{name}.npy")):
+        cached_csv = os.path.join(snapshot, f"{name}.csv")
+        if os.path.exists(cached_csv):
+            EXPORT_QUEUE.submit(shutil.copyfile, cached_csv, path, description=f"copying {cached_csv}")
+            return
+    df = mfa.parameters[name].to_df(index=False, sparse=True)
+    EXPORT_QUEUE.write_csv(df, path, index=False)
+    if cached_csv is not None:
+        EXPORT_QUEUE.submit(_write_csv_replace, df, cached_csv, description=f"writing {cached_csv}")
@@ -0,0 +1,125 @@
+# src/common/precision.py
+
+"""
+Floating point precision of the flows, stocks and parameters of an MFA system.
+
+This module provides:
+- get_dtype, the dtype selected by the dtype config item (float32 or float64)
+- cast_mfa_arrays, converting the loaded parameters, flows and stocks of an MFA system
+- compute_lifetime_tables, the survival and outflow tables of an inflow-driven DSM in the
+  dtype of its inflow
+- compute_inflow_driven_stock, running an inflow-driven DSM in the dtype of its inflow
+- PrecisionMixin for MFA systems: new arrays in the configured dtype and mass
+  balances accumulated in float64
+
+float32 halves the memory and bandwidth of the large age-cohort flows. Values are
+stored in float32, but reductions used for balances and stock totals accumulate
+in float64 so that rounding errors do not grow with the number of cohorts.
+"""
+
+import logging
+from typing import Dict
+
+import flodym as fd
+import numpy as np
+
+
+DTYPES = {"float32": np.float32, "float64": np.float64}
+
+
+def get_dtype(cfg) -> type:
+    """dtype of the dtype config item (float64 if the config has none)."""
+    name = getattr(cfg, "dtype", None) or "float64"
+    if name not in DTYPES:
+        raise ValueError(f"Config item dtype has invalid value: {name}. Choose one of {list(DTYPES)}.")
+    return DTYPES[name]
+
+
+def cast_mfa_arrays(mfa: fd.MFASystem, dtype: type):
+    """
+    Convert the parameters of a newly initialized MFA system to dtype and reallocate its
+    (still empty) flows and stock arrays in dtype.
+    """
+    if dtype == np.float64:
+        return
+    logging.info(f"mfa_system - converting parameters, flows and stocks to {np.dtype(dtype).name}")
+    for parameter in mfa.parameters.values():
+        parameter.values = parameter.values.astype(dtype)
+    arrays = list(mfa.flows.values())
+    for stock in mfa.stocks.values():
+        arrays += [stock.stock, stock.inflow, stock.outflow]
+    for array in arrays:
+        array.values = np.zeros(array.shape, dtype=dtype)
+
+
+def compute_lifetime_tables(stock: fd.InflowDrivenDSM) -> np.ndarray:
+    """
+    Compute the survival and outflow tables of the lifetime model of stock, as used by
+    compute_inflow_driven_stock, and return the outflow table: (t x c) pdf, or the (t x age)
+    band of a banded stock. Tables are kept until the lifetime parameters are set again.
+    """
+    if getattr(stock, "is_banded", False):
+        stock._compute_lifetime_band()
+        return stock._pdf_band
+    dtype = stock.inflow.values.dtype
+    lifetime_model = stock.lifetime_model
+    if dtype != np.float64 and (lifetime_model._pdf is None or lifetime_model._pdf.dtype != dtype):
+        lifetime_model._sf = np.zeros(lifetime_model._shape_cohort, dtype=dtype)
+        lifetime_model.compute_survival_factor()
+        lifetime_model._pdf = np.zeros(lifetime_model._shape_cohort, dtype=dtype)
+        lifetime_model.compute_outflow_pdf()
+    return lifetime_model.pdf
+
+
+def compute_inflow_driven_stock(stock: fd.InflowDrivenDSM):
+    """
+    Compute stock and outflows like InflowDrivenDSM.compute, in the dtype of the stock inflow.
+
+    flodym computes the survival and outflow tables (t x c) in float64, which makes the cohort
+    arrays float64 regardless of the inflow. For float32 inflows, the tables are allocated in
+    float32 and the cohort sums accumulate in float64. Banded stocks handle the dtype themselves.
+    """
+    dtype = stock.inflow.values.dtype
+    if dtype == np.float64 or getattr(stock, "is_banded", False):
+        stock.compute()
+        return
+    lifetime_model = stock.lifetime_model
+    compute_lifetime_tables(stock)
+
+    stock._check_needed_arrays()
+    inflow_per_period = stock._to_whole_period(stock.inflow.values).astype(dtype)
+    stock._stock_by_cohort = np.einsum("c...,tc...->tc...", inflow_per_period, lifetime_model.sf)
+    stock.stock.values[...] = stock._stock_by_cohort.sum(axis=1, dtype=np.float64)
+    stock._outflow_by_cohort = np.einsum("c...,tc...->tc...", stock.inflow.values, lifetime_model.pdf)
+    stock.outflow.values[...] = stock._outflow_by_cohort.sum(axis=1, dtype=np.float64)
+
+
+class PrecisionMixin:
+    """
+    Mixin for MFA systems honouring the dtype config item.
+    Must come before fd.MFASystem in the bases.
+    """
+
+    def get_new_array(self, dim_letters: tuple = None, **kwargs) -> fd.FlodymArray:
+        if "values" not in kwargs and getattr(self, "cfg", None) is not None:
+            kwargs["values"] = np.zeros(self.dims.get_subset(dim_letters).shape, dtype=get_dtype(self.cfg))
+        return super().get_new_array(dim_letters, **kwargs)
+
+    def _get_mass_balance(self) -> Dict[str, fd.FlodymArray]:
+        """As fd.MFASystem._get_mass_balance, with all contributions converted to float64 before summing."""
+
+        def as_float64(array: fd.FlodymArray) -> fd.FlodymArray:
+            return fd.FlodymArray(dims=array.dims, values=array.values.astype(np.float64))
+
+        contributions = {p: [] for p in self.processes.keys()}
+        for flow in self.flows.values():
+            flow_64 = as_float64(flow)
+            contributions[flow.from_process.name].append(-flow_64)
+            contributions[flow.to_process.name].append(flow_64)
+        for stock in self.stocks.values():
+            if stock.process is None:
+                continue
+            stock_change = as_float64(stock.inflow) - as_float64(stock.outflow)
+            contributions[stock.process.name].append(-stock_change)
+            contributions["sysenv"].append(stock_change)
+        return {p_name: sum(parts) for p_name, parts in contributions.items()}
@@ -0,0 +1,198 @@
+# src/common/profiling.py
+
+"""
+Per-stage timing and memory profiling of the EU MFA models.
+
+This module provides:
+- Profiler with a stage() context manager recording wall time, CPU time,
+  peak RSS and (optionally) the tracemalloc peak of each named stage
+- profiled decorator, used on the compute methods of all MFA systems, on
+  model initialization and on export
+- counters (add_counter), whose change over each stage is recorded as well,
+  e.g. the allocations of the aux array pool
+- JSON/CSV export of a run profile and a ranked text table
+
+The process-wide PROFILER is disabled by default, in which case decorated
+functions are called without any overhead apart from one attribute check.
+Stages are nested per thread; stages of worker threads (e.g. the sector partitions
+computed in parallel) are recorded under the stage given as their parent.
+"""
+
+import functools
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the process (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024**2 if sys.platform == "darwin" else maxrss / 1024
+
+
+class Profiler:
+    """
+    Collect timing and memory records for nested named stages.
+
+    Stages are identified by their path, e.g. 'PlasticsModel.run > PlasticsMFASystem.compute'.
+    Repeated calls of the same stage path are aggregated (calls, summed times, max peaks).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.track_memory = False
+        self.records: Dict[str, dict] = {}
+        self.counters: Dict[str, Callable[[], float]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self) -> List[dict]:
+        """Open stages of the calling thread."""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_path(self) -> str:
+        """Path of the innermost open stage of the calling thread (None outside of stages)."""
+        return self._stack[-1]["path"] if self._stack else None
+
+    def add_counter(self, name: str, read: Callable[[], float]):
+        """Record the change of a cumulative counter over each stage as column name."""
+        self.counters[name] = read
+
+    def enable(self, track_memory: bool = False):
+        self.enabled = True
+        self.track_memory = track_memory
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.track_memory = False
+
+    def reset(self):
+        self.records = {}
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str, parent: str = None):
+        """
+        Record wall time, CPU time and memory of the enclosed block. parent is the path of the
+        enclosing stage if none is open in the calling thread, e.g. for stages of worker threads.
+        """
+        if not self.enabled:
+            yield
+            return
+        parent = self.current_path() or parent
+        path = name if parent is None else f"{parent} > {name}"
+        if self.track_memory:
+            # Fold the peak reached so far into the parent before measuring this stage alone
+            if self._stack:
+                parent = self._stack[-1]
+                parent["traced_peak"] = max(parent["traced_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = {"path": path, "traced_peak": 0}
+        self._stack.append(frame)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        rss_start = _peak_rss_mb()
+        counters_start = {counter: read() for counter, read in self.counters.items()}
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            self._stack.pop()
+            traced_peak = None
+            if self.track_memory:
+                traced_peak = max(frame["traced_peak"], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]["traced_peak"] = max(self._stack[-1]["traced_peak"], traced_peak)
+            counters = {counter: self.counters[counter]() - start for counter, start in counters_start.items()}
+            with self._lock:
+                self._add_record(path, wall, cpu, rss_start, traced_peak, counters)
+
+    def _add_record(self, path: str, wall: float, cpu: float, rss_start: float, traced_peak: int, counters: dict):
+        rss_peak = _peak_rss_mb()
+        record = self.records.setdefault(path, {
+            "stage": path,
+            "depth": path.count(" > "),
+            "calls": 0,
+            "wall_s": 0.0,
+            "cpu_s": 0.0,
+            "peak_rss_mb": 0.0,
+            "rss_growth_mb": 0.0,
+            "traced_peak_mb": None,
+        })
+        record["calls"] += 1
+        record["wall_s"] += wall
+        record["cpu_s"] += cpu
+        record["peak_rss_mb"] = max(record["peak_rss_mb"], rss_peak)
+        record["rss_growth_mb"] += rss_peak - rss_start
+        if traced_peak is not None:
+            record["traced_peak_mb"] = max(record["traced_peak_mb"] or 0.0, traced_peak / 1024**2)
+        for counter, change in counters.items():
+            record[counter] = record.get(counter, 0) + change
+
+    def profiled(self, name: str = None):
+        """Decorator recording each call of the function as a stage (default name: qualified name)."""
+
+        def decorator(func):
+            stage_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.stage(stage_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def to_df(self) -> pd.DataFrame:
+        """Records as a DataFrame, ranked by wall time."""
+        df = pd.DataFrame(list(self.records.values()))
+        if df.empty:
+            return df
+        return df.sort_values("wall_s", ascending=False).reset_index(drop=True)
+
+    def write(self, output_path: str, run_info: dict = None):
+        """Write profile.json and profile.csv to output_path."""
+        os.makedirs(output_path, exist_ok=True)
+        df = self.to_df()
+        df.to_csv(os.path.join(output_path, "profile.csv"), index=False)
+        profile = {"run": run_info or {}, "stages": df.to_dict(orient="records")}
+        with open(os.path.join(output_path, "profile.json"), "w") as f:
+            json.dump(profile, f, indent=2)
+        logging.info(f"Profile written to {output_path}")
+
+    def ranked_table(self, top: int = None) -> str:
+        """Text table of the stages ranked by wall time."""
+        df = self.to_df()
+        if df.empty:
+            return "No stages profiled."
+        if top is not None:
+            df = df.head(top)
+        columns = ["stage", "calls", "wall_s", "cpu_s", "peak_rss_mb"]
+        if df["traced_peak_mb"].notna().any():
+            columns.append("traced_peak_mb")
+        columns += [counter for counter in self.counters if counter in df and df[counter].any()]
+        df = df[columns].copy()
+        df["stage"] = df["stage"].str.ljust(df["stage"].str.len().max())
+        return df.to_string(index=False, justify="left", float_format=lambda x: f"{x:.3f}")
+
+
+PROFILER = Profiler()
+profiled = PROFILER.profiled
@@ -0,0 +1,85 @@
+# src/common/reduced_rank.py
+
+"""
+Reduced-rank storage of parameters which are constant along some of their dimensions.
+
+This module provides:
+- constant_axes, the axes along which the values of an array are identical
+- collapse_values, the values of an array with its constant axes collapsed to length one
+- is_reduced, whether values are a broadcast view with zero strides
+- reduce_parameters, storing the parameters of an MFA system that are constant along some
+  dimensions as broadcast views of their collapsed values (reduced_parameters config item)
+- expand_parameters, making reduced parameters writable again before they are changed in place
+
+Many rate parameters are given per region, sector or waste category with the same value for all
+items, e.g. a SortingRate (rtspw) that only varies over time and polymer. A reduced parameter
+keeps the shape of its dimensions, so FlodymArray operations, slicing and exports work as
+before, but its values are a read-only view (np.broadcast_to) of an array with only the varying
+dimensions: memory scales with these. contract drops the broadcast axes of an operand, so a
+contraction over a constant axis sums the other operands before multiplying.
+Values are compared bit by bit, so collapsing never changes a value (-0.0, NaN payloads).
+"""
+
+import logging
+from typing import Iterable, Tuple
+
+import flodym as fd
+import numpy as np
+
+
+def _bits(values: np.ndarray) -> np.ndarray:
+    return values.view(np.dtype(f"u{values.dtype.itemsize}")) if values.dtype.kind == "f" else values
+
+
+def constant_axes(values: np.ndarray) -> Tuple[int, ...]:
+    """Axes (of length > 1) along which all values are identical."""
+    axes = []
+    bits = _bits(values)
+    for axis, n in enumerate(values.shape):
+        if n < 2:
+            continue
+        first = bits[tuple(slice(0, 1) if a == axis else slice(None) for a in range(bits.ndim))]
+        if np.array_equal(bits, np.broadcast_to(first, bits.shape)):
+            axes.append(axis)
+            # constant along axis, so the remaining axes can be checked on the first slice
+            bits = first
+    return tuple(axes)
+
+
+def collapse_values(values: np.ndarray, axes: Tuple[int, ...]) -> np.ndarray:
+    """Contiguous copy of values with the given (constant) axes of length one."""
+    return np.ascontiguousarray(values[tuple(slice(0, 1) if a in axes else slice(None) for a in range(values.ndim))])
+
+
+def is_reduced(values: np.ndarray) -> bool:
+    return any(stride == 0 and n > 1 for stride, n in zip(values.strides, values.shape))
+
+
+def reduce_parameters(mfa: fd.MFASystem, names: Iterable[str] = None):
+    """
+    Store the (named or all) parameters of the MFA system which are constant along some
+    dimensions as read-only broadcast views of their collapsed values.
+    """
+    for name in mfa.parameters.keys() if names is None else names:
+        parameter = mfa.parameters[name]
+        # sparse trade parameters are stored on their links already
+        if not isinstance(parameter, fd.FlodymArray) or is_reduced(parameter.values):
+            continue
+        values = parameter.values
+        axes = constant_axes(values)
+        if not axes:
+            continue
+        collapsed = collapse_values(values, axes)
+        parameter.values = np.broadcast_to(collapsed, values.shape)
+        logging.info(
+            f"mfa_system - reduced parameter {name}: constant along {''.join(parameter.dims.letters[a] for a in axes)}, "
+            f"{values.nbytes / 1024**2:.1f} MB -> {collapsed.nbytes / 1024**2:.1f} MB"
+        )
+
+
+def expand_parameters(mfa: fd.MFASystem, names: Iterable[str]):
+    """Replace the values of reduced parameters among names by writable full copies."""
+    for name in names:
+        parameter = mfa.parameters.get(name)
+        if isinstance(parameter, fd.FlodymArray) and is_reduced(parameter.values):
+            parameter.values = np.array(parameter.values)
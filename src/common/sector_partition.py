@@ -0,0 +1,179 @@
+# src/common/sector_partition.py
+
+"""
+Compute of the plastics and steel MFA systems on blocks of end use sectors in parallel.
+
+This module provides:
+- sector_blocks, contiguous slices of the sector dimension in a given number of groups
+- take_sector_block, the view of a flow, stock array or parameter on a block of sectors
+- SectorPartitionMixin for MFA systems: compute_by_sector_blocks, running a compute method on
+  one sub-system per block of sectors in a thread pool (sector_partitions config item)
+
+After the parameter interpolation, the flows and stocks of the plastics and steel systems are
+computed for each end use sector independently; only flows without the sector dimension (e.g.
+the available steel scrap by waste category) sum over sectors. A sub-system works on views of
+the parameters, flows and stock arrays of its sectors, so in-place writes go directly into the
+arrays of the system. Arrays a compute stage replaces (e.g. with set_values) are copied back,
+flows without the sector dimension are summed over the blocks, and the stock and outflow by
+cohort are joined along the sectors. NumPy releases the GIL in the array operations, so the
+blocks run in parallel threads, without copies of the inputs.
+Results equal those of the unpartitioned compute up to the summation order of sums over
+sectors. With a survival_cutoff, the ages tracked by the end use stock are found per block.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import flodym as fd
+import numpy as np
+
+from src.common.profiling import PROFILER
+from src.common.sparse_trade import SparseTradeArray
+
+
+SECTOR_LETTER = "s"
+
+
+def sector_blocks(n_sectors: int, n_partitions: int) -> List[slice]:
+    """Slices of the sector dimension in n_partitions groups of (almost) equal size."""
+    n_partitions = max(1, min(n_partitions, n_sectors))
+    bounds = np.linspace(0, n_sectors, n_partitions + 1).round().astype(int)
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def sector_block_dims(dims: fd.DimensionSet, block: slice) -> fd.DimensionSet:
+    return fd.DimensionSet(dim_list=[
+        fd.Dimension(name=d.name, letter=d.letter, items=d.items[block], dtype=d.dtype) if d.letter == SECTOR_LETTER else d
+        for d in dims
+    ])
+
+
+def _sector_index(dims: fd.DimensionSet, block: slice) -> tuple:
+    return tuple(block if letter == SECTOR_LETTER else slice(None) for letter in dims.letters)
+
+
+def take_sector_block(array, block: slice):
+    """View of array on a block of sectors; assigning to its values writes into array."""
+    if SECTOR_LETTER not in array.dims.letters:
+        return array
+    dims = sector_block_dims(array.dims, block)
+    if isinstance(array, SparseTradeArray):
+        return array.take_block(SECTOR_LETTER, block, dims)
+    return array.model_copy(update={"dims": dims, "values": array.values[_sector_index(array.dims, block)]})
+
+
+def _stitch_array(array: fd.FlodymArray, parts: List[fd.FlodymArray], blocks: List[slice]):
+    """Write the results of the blocks that are not views of array (any more) into array."""
+    if SECTOR_LETTER not in array.dims.letters:
+        array.values[...] = parts[0].values
+        for part in parts[1:]:
+            array.values += part.values
+        return
+    replaced = [(part, block) for part, block in zip(parts, blocks) if not np.shares_memory(part.values, array.values)]
+    dtype = np.result_type(array.values, *[part.values for part, _ in replaced])
+    if dtype != array.values.dtype:
+        array.values = array.values.astype(dtype)
+    for part, block in replaced:
+        array.values[_sector_index(array.dims, block)] = part.values
+
+
+def _join_cohort_arrays(arrays: List[np.ndarray], axis: int, pad_axis: int = None) -> np.ndarray:
+    """Concatenate the by-cohort arrays of the blocks; with pad_axis, zero-pad bands to the widest one."""
+    if pad_axis is not None:
+        width = max(array.shape[pad_axis] for array in arrays)
+        arrays = [
+            np.pad(array, [(0, width - array.shape[pad_axis]) if i == pad_axis else (0, 0) for i in range(array.ndim)])
+            for array in arrays
+        ]
+    return np.concatenate(arrays, axis=axis)
+
+
+def _stitch_stock(stock: fd.Stock, parts: List[fd.Stock], blocks: List[slice]):
+    for key in ("stock", "inflow", "outflow"):
+        _stitch_array(getattr(stock, key), [getattr(part, key) for part in parts], blocks)
+    # by-cohort arrays are indexed (t, c or age, *stock dims without time)
+    axis = 2 + [letter for letter in stock.dims.letters if letter != stock.time_letter].index(SECTOR_LETTER)
+    if getattr(parts[0], "is_banded", False):
+        stock.survival_cutoff = parts[0].survival_cutoff
+        for key in ("_sf_band", "_pdf_band", "_stock_band", "_outflow_band"):
+            setattr(stock, key, _join_cohort_arrays([getattr(part, key) for part in parts], axis, pad_axis=1))
+        stock._band_prms = None
+        return
+    for key in ("_stock_by_cohort", "_outflow_by_cohort"):
+        arrays = [getattr(part, key, None) for part in parts]
+        if all(array is not None for array in arrays):
+            setattr(stock, key, _join_cohort_arrays(arrays, axis))
+
+
+class SectorPartitionMixin:
+    """
+    Mixin for MFA systems computing blocks of end use sectors in parallel threads.
+    Must come before fd.MFASystem in the bases.
+    """
+
+    def compute_by_sector_blocks(self, method: str):
+        """
+        Run the compute method of the given name on this system, or with the sector_partitions
+        config item on one sub-system per block of sectors in parallel.
+        """
+        blocks = sector_blocks(len(self.dims[SECTOR_LETTER].items), self.cfg.sector_partitions or 1)
+        if len(blocks) == 1:
+            getattr(self, method)()
+            return
+        n_threads = min(len(blocks), os.cpu_count() or 1)
+        logging.info(f"mfa_system - {method} in {len(blocks)} blocks of end use sectors on {n_threads} threads")
+        parts = [self._sector_subsystem(block) for block in blocks]
+        parent = PROFILER.current_path()
+
+        def run(part: fd.MFASystem):
+            with PROFILER.stage("sector block", parent=parent):
+                getattr(part, method)()
+
+        with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="sectors") as pool:
+            list(pool.map(run, parts))
+        self._stitch_sector_blocks(parts, blocks)
+
+    def _sector_subsystem(self, block: slice) -> fd.MFASystem:
+        """System on a block of sectors, working on views of the arrays of this system."""
+        flows = {}
+        for name, flow in self.flows.items():
+            if SECTOR_LETTER in flow.dims.letters:
+                flows[name] = take_sector_block(flow, block)
+            else:
+                flows[name] = flow.model_copy(update={"values": np.zeros_like(flow.values)})
+        stocks = {}
+        for name, stock in self.stocks.items():
+            if SECTOR_LETTER not in stock.dims.letters:
+                raise ValueError(f"Stock {name} has no dimension {SECTOR_LETTER} and cannot be computed by blocks of sectors.")
+            dims = sector_block_dims(stock.dims, block)
+            arrays = {key: take_sector_block(getattr(stock, key), block) for key in ("stock", "inflow", "outflow")}
+            if getattr(stock, "lifetime_model", None) is not None:
+                arrays["lifetime_model"] = type(stock.lifetime_model)(dims=dims, time_letter=stock.time_letter)
+            stocks[name] = type(stock)(dims=dims, name=stock.name, process=stock.process, time_letter=stock.time_letter, **arrays)
+        # parameters may be sparse trade arrays, which fail the validation of MFASystem
+        return type(self).model_construct(
+            dims=sector_block_dims(self.dims, block),
+            parameters={name: take_sector_block(parameter, block) for name, parameter in self.parameters.items()},
+            processes=self.processes,
+            flows=flows,
+            stocks=stocks,
+            cfg=self.cfg,
+        )
+
+    def _stitch_sector_blocks(self, parts: List[fd.MFASystem], blocks: List[slice]):
+        """Results of the blocks which are not in the arrays of this system yet."""
+        for name, flow in self.flows.items():
+            _stitch_array(flow, [part.flows[name] for part in parts], blocks)
+        for name, stock in self.stocks.items():
+            _stitch_stock(stock, [part.stocks[name] for part in parts], blocks)
+        # parameters created by the compute method, e.g. FinalDemand from start_value and growth_rate
+        for name in parts[0].parameters.keys() - self.parameters.keys():
+            new = [part.parameters[name] for part in parts]
+            dims = self.dims.get_subset(new[0].dims.letters)
+            if SECTOR_LETTER in dims.letters:
+                values = np.concatenate([parameter.values for parameter in new], axis=dims.letters.index(SECTOR_LETTER))
+            else:
+                values = new[0].values
+            self.parameters[name] = new[0].model_copy(update={"dims": dims, "values": values})
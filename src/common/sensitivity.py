@@ -0,0 +1,337 @@
+# src/common/sensitivity.py
+
+"""
+Monte-Carlo / sensitivity engine for the EU MFA flow systems.
+
+This module provides:
+- Sampling of multiplicative parameter factors (Latin hypercube, Sobol, random)
+- Streaming summary statistics (mean, std, min, max, P² quantile estimates)
+- MonteCarloEngine evaluating all samples against a single loaded MFA system
+- Parquet export of the per-flow statistics and of the sample design
+
+All samples are evaluated on the MFA system already loaded by the model (no
+CSV re-parsing). Only the perturbed parameters are restored from a snapshot
+between samples; flows are summarized batch-wise so that individual samples
+are never kept in memory.
+"""
+
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import flodym as fd
+from scipy import stats
+from scipy.stats import qmc
+
+from src.common.common_cfg import ParameterDistributionCfg, SensitivityCfg
+from src.common.reduced_rank import expand_parameters
+
+
+# =============================================================================
+
+# SAMPLING
+
+# =============================================================================
+
+
+def draw_unit_samples(sampling: str, n_samples: int, n_dims: int, seed: int = None) -> np.ndarray:
+    """
+    Draw samples in the unit hypercube [0, 1)^n_dims.
+
+    Parameters
+    ----------
+    sampling : str
+        One of 'lhs', 'sobol' or 'random'
+    n_samples : int
+        Number of samples
+    n_dims : int
+        Number of sampled parameters
+    seed : int
+        Seed for reproducibility
+
+    Returns
+    -------
+    ndarray
+        Array of shape (n_samples, n_dims)
+    """
+    if sampling == "lhs":
+        return qmc.LatinHypercube(d=n_dims, seed=seed).random(n_samples)
+    if sampling == "sobol":
+        if n_samples & (n_samples - 1):
+            logging.warning(f"Sobol sampling: n_samples={n_samples} is not a power of 2, balance properties are lost.")
+        return qmc.Sobol(d=n_dims, scramble=True, seed=seed).random(n_samples)
+    if sampling == "random":
+        return np.random.default_rng(seed).random((n_samples, n_dims))
+    raise ValueError(f"Sampling method {sampling} not supported. Choose 'lhs', 'sobol' or 'random'.")
+
+
+def distribution_ppf(dist: ParameterDistributionCfg, u: np.ndarray) -> np.ndarray:
+    """Map unit samples to parameter factors with the inverse CDF of the distribution."""
+    if dist.distribution == "uniform":
+        return stats.uniform.ppf(u, loc=dist.low, scale=dist.high - dist.low)
+    if dist.distribution == "normal":
+        return stats.norm.ppf(u, loc=dist.mean, scale=dist.std)
+    if dist.distribution == "triangular":
+        c = (dist.mode - dist.low) / (dist.high - dist.low)
+        return stats.triang.ppf(u, c, loc=dist.low, scale=dist.high - dist.low)
+    if dist.distribution == "lognormal":
+        return stats.lognorm.ppf(u, dist.std, scale=dist.mean)
+    raise ValueError(
+        f"Distribution {dist.distribution} not supported. Choose 'uniform', 'normal', 'triangular' or 'lognormal'."
+    )
+
+
+# =============================================================================
+
+# STREAMING STATISTICS
+
+# =============================================================================
+
+
+class P2Quantile:
+    """
+    P² estimator (Jain & Chlamtac, 1985) of one quantile, vectorized over array cells.
+
+    Keeps five markers per cell instead of the observations themselves.
+    Until five observations are seen, the exact quantile is returned.
+    """
+
+    def __init__(self, p: float, shape: tuple):
+        self.p = p
+        self.count = 0
+        self.q = np.zeros((5,) + shape)
+        self.n = np.broadcast_to(np.arange(5.0).reshape((5,) + (1,) * len(shape)), (5,) + shape).copy()
+        self.n_desired = np.array([0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0])
+        self.dn = np.array([0.0, p / 2, p, (1 + p) / 2, 1.0])
+
+    def update(self, x: np.ndarray):
+        if self.count < 5:
+            self.q[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                self.q.sort(axis=0)
+            return
+        self.count += 1
+        q, n = self.q, self.n
+
+        # Cell of the new observation and update of the extreme markers
+        k = (x >= q[1]).astype(int) + (x >= q[2]) + (x >= q[3])
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+        for i in range(1, 5):
+            n[i] += k < i
+        self.n_desired += self.dn
+
+        # Adjust the three middle markers
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(1, 4):
+                d = self.n_desired[i] - n[i]
+                move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+                if not move.any():
+                    continue
+                ds = np.sign(d)
+                q_parabolic = q[i] + ds / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + ds) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - ds) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                q_next = np.where(ds > 0, q[i + 1], q[i - 1])
+                n_next = np.where(ds > 0, n[i + 1], n[i - 1])
+                q_linear = q[i] + ds * (q_next - q[i]) / (n_next - n[i])
+                ok = (q[i - 1] < q_parabolic) & (q_parabolic < q[i + 1])
+                q[i] = np.where(move, np.where(ok, q_parabolic, q_linear), q[i])
+                n[i] = np.where(move, n[i] + ds, n[i])
+
+    @property
+    def value(self) -> np.ndarray:
+        if self.count < 5:
+            return np.quantile(self.q[: self.count], self.p, axis=0)
+        return self.q[2]
+
+
+class StreamingStatistics:
+    """
+    Running mean, standard deviation, min, max and quantiles of an array-valued result.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of one sample of the result
+    quantiles : list
+        Quantiles to estimate (e.g. [0.05, 0.5, 0.95])
+    """
+
+    def __init__(self, shape: tuple, quantiles: List[float]):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        self.quantiles = [P2Quantile(p, shape) for p in quantiles]
+
+    def update_batch(self, batch: np.ndarray):
+        """Merge a batch of samples (first axis) into the running statistics (Chan et al.)."""
+        n_b = batch.shape[0]
+        mean_b = batch.mean(axis=0)
+        m2_b = ((batch - mean_b) ** 2).sum(axis=0)
+        n_a = self.count
+        self.count += n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / self.count
+        self.m2 += m2_b + delta**2 * n_a * n_b / self.count
+        np.minimum(self.min, batch.min(axis=0), out=self.min)
+        np.maximum(self.max, batch.max(axis=0), out=self.max)
+        for sample in batch:
+            for quantile in self.quantiles:
+                quantile.update(sample)
+
+    @property
+    def std(self) -> np.ndarray:
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        result = {"mean": self.mean, "std": self.std, "min": self.min, "max": self.max}
+        for quantile in self.quantiles:
+            result[f"q{quantile.p * 100:g}"] = quantile.value
+        return result
+
+
+# =============================================================================
+
+# MONTE-CARLO ENGINE
+
+# =============================================================================
+
+
+class MonteCarloEngine:
+    """
+    Evaluate parameter samples against the MFA system of an initialized model.
+
+    Each sampled parameter is multiplied by a factor drawn from its distribution
+    (see SensitivityCfg.parameters). The MFA system is recomputed for every sample
+    and the selected flows, summed over age-cohorts, are merged batch-wise into
+    streaming statistics.
+
+    Parameters
+    ----------
+    model : PlasticsModel or SteelModel
+        Initialized model, whose mfa is reused for all samples
+    cfg : SensitivityCfg
+        Sensitivity configuration (defaults to model.cfg.sensitivity)
+    """
+
+    def __init__(self, model, cfg: SensitivityCfg = None):
+        self.model = model
+        self.mfa = model.mfa
+        self.cfg = cfg if cfg is not None else model.cfg.sensitivity
+        if self.cfg is None or not self.cfg.parameters:
+            raise ValueError("No parameter distributions given in the sensitivity config.")
+        unknown = [p for p in self.cfg.parameters if p not in self.mfa.parameters]
+        if unknown:
+            raise ValueError(f"Sensitivity parameters {unknown} are not parameters of the MFA system.")
+        self.parameter_names = list(self.cfg.parameters.keys())
+        self.flow_names = self.cfg.flows if self.cfg.flows else list(self.mfa.flows.keys())
+        # Every sample has other inputs, so snapshots of the interpolated parameters would not be reused
+        if hasattr(self.mfa, "disable_parameter_cache"):
+            self.mfa.disable_parameter_cache()
+        # Snapshot of the raw (not yet interpolated) values of the perturbed parameters
+        self._base_values = {p: self.mfa.parameters[p].values.copy() for p in self.parameter_names}
+        self.samples = None
+        self.flow_totals = None
+        self.statistics = {}
+
+    def draw_samples(self) -> pd.DataFrame:
+        """Draw the multiplicative factors for all samples (one column per parameter)."""
+        u = draw_unit_samples(self.cfg.sampling, self.cfg.n_samples, len(self.parameter_names), self.cfg.seed)
+        factors = {
+            prm_name: distribution_ppf(self.cfg.parameters[prm_name], u[:, i])
+            for i, prm_name in enumerate(self.parameter_names)
+        }
+        self.samples = pd.DataFrame(factors)
+        return self.samples
+
+    def _apply_sample(self, factors: pd.Series):
+        # perturbed parameters are written in place, also after compute reduced them again
+        expand_parameters(self.mfa, self.parameter_names)
+        for prm_name in self.parameter_names:
+            values = self._base_values[prm_name] * factors[prm_name]
+            clip = self.cfg.parameters[prm_name].clip
+            if clip is not None:
+                np.clip(values, clip[0], clip[1], out=values)
+            self.mfa.parameters[prm_name].values[...] = values
+
+    def _restore_parameters(self):
+        expand_parameters(self.mfa, self.parameter_names)
+        for prm_name in self.parameter_names:
+            self.mfa.parameters[prm_name].values[...] = self._base_values[prm_name]
+
+    def _summed_flow(self, flow_name: str) -> fd.FlodymArray:
+        flow = self.mfa.flows[flow_name]
+        if "c" in flow.dims.letters:
+            return flow.sum_over("c")
+        return flow
+
+    def run(self) -> Dict[str, StreamingStatistics]:
+        """Evaluate all samples in batches and return the statistics per flow."""
+        if self.samples is None:
+            self.draw_samples()
+        n_samples = len(self.samples)
+        logging.info(
+            f"sensitivity - {n_samples} samples ({self.cfg.sampling}) of {self.parameter_names}, "
+            f"batch size {self.cfg.batch_size}"
+        )
+        self._result_dims = {}
+        self.statistics = {}
+        totals = {flow_name: np.zeros(n_samples) for flow_name in self.flow_names}
+
+        try:
+            for start in range(0, n_samples, self.cfg.batch_size):
+                stop = min(start + self.cfg.batch_size, n_samples)
+                logging.info(f"sensitivity - samples {start + 1}-{stop} of {n_samples}")
+                batch = {flow_name: [] for flow_name in self.flow_names}
+                for i in range(start, stop):
+                    self._apply_sample(self.samples.iloc[i])
+                    self.mfa.compute()
+                    for flow_name in self.flow_names:
+                        flow = self._summed_flow(flow_name)
+                        self._result_dims[flow_name] = flow.dims
+                        batch[flow_name].append(flow.values.copy())
+                        totals[flow_name][i] = flow.values.sum()
+                for flow_name, values in batch.items():
+                    values = np.stack(values)
+                    if flow_name not in self.statistics:
+                        self.statistics[flow_name] = StreamingStatistics(values.shape[1:], self.cfg.quantiles)
+                    self.statistics[flow_name].update_batch(values)
+        finally:
+            self._restore_parameters()
+
+        self.flow_totals = pd.DataFrame(totals)
+        return self.statistics
+
+    def statistics_to_df(self, flow_name: str) -> pd.DataFrame:
+        """Long-format DataFrame with one column per dimension and one per statistic."""
+        dims = self._result_dims[flow_name]
+        index = pd.MultiIndex.from_product([d.items for d in dims], names=dims.names)
+        values = {k: v.flatten() for k, v in self.statistics[flow_name].to_dict().items()}
+        return pd.DataFrame(values, index=index).reset_index()
+
+    def export_parquet(self, output_path: str):
+        """
+        Write the statistics of each flow and the sample design to Parquet files.
+
+        Parameters
+        ----------
+        output_path : str
+            Folder for the files (created if needed)
+        """
+        os.makedirs(output_path, exist_ok=True)
+        for flow_name in self.statistics:
+            file_name = flow_name.replace(" => ", "__").replace(" ", "_") + ".parquet"
+            self.statistics_to_df(flow_name).to_parquet(os.path.join(output_path, file_name), index=False)
+        design = pd.concat([self.samples, self.flow_totals.add_prefix("total: ")], axis=1)
+        design.insert(0, "seed", self.cfg.seed)
+        design.to_parquet(os.path.join(output_path, "samples.parquet"), index=False)
+        logging.info(f"sensitivity - results written to {output_path}")
@@ -0,0 +1,235 @@
+# src/common/sparse_trade.py
+
+"""
+Sparse storage of trade parameters, which carry both the region (r) and the other_region (o) dimension.
+
+This module provides:
+- SparseTradeArray, storing only the region pairs with trade (links), each with the dense
+  block of the remaining dimensions, i.e. a block COO format on the (r, o) pair
+- the operations the MFA systems use on trade parameters: multiplication with FlodymArrays,
+  addition of two trade arrays, sum_to, and trade_einsum for the market share contraction
+- link_blocks, the values of a dense or sparse trade parameter as one block per region pair
+- sparsify_trade_parameters, converting the trade parameters of an MFA system
+
+Memory scales with the number of trade links instead of the number of regions squared. The
+dense intermediates of products like flow * ImportRate over (o, r, ...) are avoided as well.
+Results are equal to the dense computation up to the summation order of floating point sums.
+"""
+
+import logging
+from numbers import Number
+
+import flodym as fd
+import numpy as np
+
+from src.common.contraction import contract
+
+
+REGION_LETTERS = ("r", "o")
+
+
+def is_trade_array(array: fd.FlodymArray) -> bool:
+    return all(letter in array.dims.letters for letter in REGION_LETTERS)
+
+
+def link_blocks(array) -> np.ndarray:
+    """
+    Values of a trade parameter with one block of the remaining dimensions per region pair.
+    Writing into the blocks writes into the parameter. The region dimensions must be the first two.
+    """
+    if isinstance(array, SparseTradeArray):
+        return array.values
+    if array.dims.letters[:2] not in [REGION_LETTERS, REGION_LETTERS[::-1]]:
+        raise ValueError(f"Region dimensions of {array.name} must be the first two, got {array.dims.letters}.")
+    blocks = array.values.view()
+    blocks.shape = (-1,) + array.values.shape[2:]  # raises instead of copying if not possible as a view
+    return blocks
+
+
+# ===================================================================
+# Contractions over the links
+# ===================================================================
+
+def _link_letter(*subscripts: str) -> str:
+    used = set("".join(subscripts))
+    return next(letter for letter in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ" if letter not in used)
+
+
+def _links_einsum(sparse: "SparseTradeArray", sparse_subs: str, out_subs: str, dense_subs: str = "", dense_values: np.ndarray = None):
+    """
+    einsum of the sparse operand (and optionally one dense operand) evaluated on the links.
+    Returns the values with a leading link axis, the output subscripts without the region pair,
+    and the subscripts of the region pair (in the order of the link columns).
+    """
+    pair = tuple(sparse_subs[sparse.dims.letters.index(letter)] for letter in sparse.pair_letters)
+    link = _link_letter(sparse_subs, out_subs, dense_subs)
+    operands = [sparse.values]
+    subscripts = [link + "".join(s for s in sparse_subs if s not in pair)]
+    if dense_values is not None:
+        dense_pair = [letter for letter in pair if letter in dense_subs]
+        gathered = np.moveaxis(dense_values, [dense_subs.index(letter) for letter in dense_pair], range(len(dense_pair)))
+        if dense_pair:
+            gathered = gathered[tuple(sparse.links[:, pair.index(letter)] for letter in dense_pair)]
+        operands.append(gathered)
+        subscripts.append((link if dense_pair else "") + "".join(s for s in dense_subs if s not in pair))
+    out_rest = "".join(s for s in out_subs if s not in pair)
+    values = contract(",".join(subscripts) + "->" + link + out_rest, *operands)
+    return values, out_rest, pair
+
+
+def _scatter(values: np.ndarray, links: np.ndarray, pair: tuple, out_subs: str, out_rest: str, sizes: dict) -> np.ndarray:
+    """Dense array with subscripts out_subs from values on the links (leading axis)."""
+    kept = [letter for letter in pair if letter in out_subs]
+    if not kept:
+        return values.sum(axis=0)
+    out = np.zeros([sizes[letter] for letter in kept + list(out_rest)], dtype=values.dtype)
+    if len(kept) == 2:
+        out[links[:, 0], links[:, 1]] = values
+    else:
+        ids = links[:, pair.index(kept[0])]
+        for i in np.unique(ids):
+            out[i] = values[ids == i].sum(axis=0)
+    return np.moveaxis(out, range(len(kept)), [out_subs.index(letter) for letter in kept])
+
+
+def trade_einsum(subscripts: str, values: np.ndarray, share) -> np.ndarray:
+    """
+    np.einsum(subscripts, values, share.values) (via contract) for a dense or sparse trade
+    parameter share, e.g. the market share contraction 'rtspe,rRtsp->Rtspe'.
+    """
+    if not isinstance(share, SparseTradeArray):
+        return contract(subscripts, values, share.values)
+    inputs, out_subs = subscripts.split("->")
+    dense_subs, sparse_subs = inputs.split(",")
+    link_values, out_rest, pair = _links_einsum(share, sparse_subs, out_subs, dense_subs, values)
+    sizes = dict(zip(dense_subs, values.shape))
+    sizes.update(zip(sparse_subs, share.dims.shape))
+    return _scatter(link_values, share.links, pair, out_subs, out_rest, sizes)
+
+
+# ===================================================================
+# Sparse trade array
+# ===================================================================
+
+class SparseTradeArray:
+    """
+    Trade parameter stored on its links, i.e. the (r, o) region pairs with any non-zero value.
+    values has shape (n_links, *remaining dims); links holds the indices of each link along the
+    two region dimensions, in the order they appear in dims.
+    """
+
+    def __init__(self, dims: fd.DimensionSet, links: np.ndarray, values: np.ndarray, name: str = None):
+        self.dims = dims
+        self.links = links
+        self.values = values
+        self.name = name
+        self.pair_letters = tuple(letter for letter in dims.letters if letter in REGION_LETTERS)
+        if len(self.pair_letters) != 2:
+            raise ValueError(f"SparseTradeArray needs both dimensions {REGION_LETTERS}, got {dims.letters}.")
+
+    @classmethod
+    def from_flodym_array(cls, array: fd.FlodymArray) -> "SparseTradeArray":
+        pair_letters = tuple(letter for letter in array.dims.letters if letter in REGION_LETTERS)
+        pair_axes = [array.dims.letters.index(letter) for letter in pair_letters]
+        values = np.moveaxis(array.values, pair_axes, [0, 1])
+        # NaN counts as a link, so that it propagates as in the dense computation
+        has_trade = (values != 0).reshape(values.shape[:2] + (-1,)).any(axis=2)
+        links = np.argwhere(has_trade)
+        return cls(dims=array.dims, links=links, values=values[links[:, 0], links[:, 1]], name=array.name)
+
+    @property
+    def rest_letters(self) -> tuple:
+        return tuple(letter for letter in self.dims.letters if letter not in self.pair_letters)
+
+    @property
+    def n_links(self) -> int:
+        return len(self.links)
+
+    @property
+    def density(self) -> float:
+        """Share of the region pairs with trade."""
+        n_pairs = np.prod([self.dims[letter].len for letter in self.pair_letters])
+        return self.n_links / n_pairs
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.links.nbytes
+
+    def _sizes(self) -> dict:
+        return dict(zip(self.dims.letters, self.dims.shape))
+
+    def sum_values_to(self, result_dims: tuple = ()) -> np.ndarray:
+        out_subs = "".join(result_dims)
+        values, out_rest, pair = _links_einsum(self, self.dims.string, out_subs)
+        return _scatter(values, self.links, pair, out_subs, out_rest, self._sizes())
+
+    def sum_to(self, result_dims: tuple = ()) -> fd.FlodymArray:
+        """Dense FlodymArray summed to result_dims, as FlodymArray.sum_to."""
+        return fd.FlodymArray(dims=self.dims.get_subset(result_dims), values=self.sum_values_to(result_dims), name=self.name)
+
+    def to_flodym_array(self) -> fd.FlodymArray:
+        return self.sum_to(self.dims.letters)
+
+    def to_df(self, *args, **kwargs):
+        return self.to_flodym_array().to_df(*args, **kwargs)
+
+    def take_block(self, letter: str, block: slice, dims: fd.DimensionSet) -> "SparseTradeArray":
+        """
+        Slice of one dimension, with dims the correspondingly sliced dimensions: the links within
+        the slice for a region dimension, a view of the values of all links for any other dimension.
+        """
+        if letter not in self.pair_letters:
+            index = (slice(None),) + tuple(block if rest == letter else slice(None) for rest in self.rest_letters)
+            return SparseTradeArray(dims=dims, links=self.links, values=self.values[index], name=self.name)
+        ids = self.links[:, self.pair_letters.index(letter)]
+        start, stop, _ = block.indices(self.dims[letter].len)
+        in_block = (ids >= start) & (ids < stop)
+        links = self.links[in_block].copy()
+        links[:, self.pair_letters.index(letter)] -= start
+        return SparseTradeArray(dims=dims, links=links, values=self.values[in_block], name=self.name)
+
+    def __mul__(self, other) -> "SparseTradeArray":
+        if isinstance(other, Number):
+            return SparseTradeArray(dims=self.dims, links=self.links, values=self.values * other)
+        if not isinstance(other, fd.FlodymArray):
+            raise TypeError(f"Cannot multiply SparseTradeArray with {type(other).__name__}.")
+        dims_out = self.dims.union_with(other.dims)
+        values, _, _ = _links_einsum(self, self.dims.string, dims_out.string, other.dims.string, other.values)
+        return SparseTradeArray(dims=dims_out, links=self.links, values=values)
+
+    __rmul__ = __mul__
+
+    def __add__(self, other):
+        """Sum on the union of links of two trade arrays (dims intersected as FlodymArray.__add__); dense otherwise."""
+        if not isinstance(other, SparseTradeArray):
+            return self.to_flodym_array() + other
+        dims_out = self.dims.intersect_with(other.dims)
+        n_other = self.dims[self.pair_letters[1]].len
+        other_links = other.links[:, [other.pair_letters.index(letter) for letter in self.pair_letters]]
+        codes = [links[:, 0] * n_other + links[:, 1] for links in (self.links, other_links)]
+        union = np.union1d(*codes)
+        operands = [
+            _links_einsum(a, a.dims.string, "".join(l for l in dims_out.letters if l not in a.pair_letters) + "".join(a.pair_letters))[0]
+            for a in (self, other)
+        ]
+        values = np.zeros((len(union),) + operands[0].shape[1:], dtype=np.result_type(*operands))
+        for code, operand in zip(codes, operands):
+            values[np.searchsorted(union, code)] += operand
+        links = np.stack([union // n_other, union % n_other], axis=1)
+        return SparseTradeArray(dims=dims_out, links=links, values=values)
+
+    def __radd__(self, other):
+        return self + other
+
+
+def sparsify_trade_parameters(mfa: fd.MFASystem):
+    """Replace all parameters of the MFA system with both region dimensions by SparseTradeArrays."""
+    for name, parameter in mfa.parameters.items():
+        if isinstance(parameter, SparseTradeArray) or not is_trade_array(parameter):
+            continue
+        sparse = SparseTradeArray.from_flodym_array(parameter)
+        logging.info(
+            f"mfa_system - sparse trade parameter {name}: {sparse.n_links} links ({sparse.density:.0%} of region pairs), "
+            f"{parameter.values.nbytes / 1024**2:.1f} MB -> {sparse.nbytes / 1024**2:.1f} MB"
+        )
+        mfa.parameters[name] = sparse
@@ -0,0 +1,91 @@
+# src/common/stage_tracking.py
+
+"""
+Dependency tracking for the compute stages of an MFA system.
+
+Each stage declares the parameters, flows and config items it reads. The
+tracker keeps a fingerprint of these inputs from the last time the stage ran,
+so that a re-run after parameter edits only recomputes invalidated stages.
+"""
+
+import logging
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def fingerprint(value) -> str:
+    """
+    Checksum of an array (values, shape and dtype) or of the repr of any other object.
+    CRC32 and Adler-32 are combined: fast enough to check large parameters on every compute.
+    """
+    if isinstance(value, np.ndarray):
+        values = np.ascontiguousarray(value)
+        data = memoryview(values).cast("B")
+        return f"{values.shape}{values.dtype.str}{zlib.crc32(data):08x}{zlib.adler32(data):08x}"
+    return repr(value)
+
+
+@dataclass
+class ComputeStage:
+    """
+    One stage of a compute pipeline.
+
+    run is called with the list of inputs that changed since the last run of
+    the stage (all inputs on the first run).
+    """
+
+    name: str
+    run: Callable[[List[str]], None]
+    parameters: List[str] = field(default_factory=list)
+    flows: List[str] = field(default_factory=list)
+    config: Dict[str, object] = field(default_factory=dict)
+    upstream: List[str] = field(default_factory=list)  # stages whose re-run invalidates this stage
+
+
+class StageTracker:
+    """Fingerprints of the inputs read by each stage at its last run."""
+
+    def __init__(self):
+        self._fingerprints: Dict[str, Dict[str, str]] = {}
+
+    def _current(self, mfa, stage: ComputeStage) -> Dict[str, str]:
+        current = {f"parameter {p}": fingerprint(mfa.parameters[p].values) for p in stage.parameters if p in mfa.parameters}
+        current.update({f"flow {f}": fingerprint(mfa.flows[f].values) for f in stage.flows})
+        current.update({f"config {k}": fingerprint(v) for k, v in stage.config.items()})
+        return current
+
+    def changed_inputs(self, mfa, stage: ComputeStage) -> List[str]:
+        """Names of the stage inputs that differ from the last run (all of them if it never ran)."""
+        current = self._current(mfa, stage)
+        previous = self._fingerprints.get(stage.name)
+        if previous is None:
+            return list(current.keys())
+        return [k for k, v in current.items() if previous.get(k) != v]
+
+    def record(self, mfa, stage: ComputeStage):
+        self._fingerprints[stage.name] = self._current(mfa, stage)
+
+    def invalidate(self, stage_name: str = None):
+        """Forget the recorded inputs of one stage (or all stages) to force a re-run."""
+        if stage_name is None:
+            self._fingerprints.clear()
+        else:
+            self._fingerprints.pop(stage_name, None)
+
+    def run(self, mfa, stages: List[ComputeStage]) -> List[str]:
+        """Run the invalidated stages in order and return their names."""
+        rerun = []
+        for stage in stages:
+            changed = self.changed_inputs(mfa, stage)
+            changed += [f"stage {s}" for s in stage.upstream if s in rerun]
+            if not changed:
+                logging.info(f"mfa_system - {stage.name}: inputs unchanged, reusing previous results")
+                continue
+            logging.debug(f"mfa_system - {stage.name}: changed inputs {changed}")
+            stage.run(changed)
+            self.record(mfa, stage)
+            rerun.append(stage.name)
+        return rerun
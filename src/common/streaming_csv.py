@@ -0,0 +1,189 @@
+# src/common/streaming_csv.py
+
+"""
+Chunked reading of large parameter CSV files directly into the parameter values.
+
+This module provides:
+- read_parameter_csv_chunked, the values of a parameter from a long-format CSV file, read in
+  chunks of rows and scattered into a preallocated array
+- StreamingCSVParameterReader, the CSV parameter reader of the models: large files are read in
+  chunks, small files and files in other formats by flodym (Parameter.from_df)
+
+flodym reads a parameter file into one DataFrame, copies it, strips and converts every cell and
+maps the labels row by row before filling the array, so the peak memory of loading a file with
+millions of rows is several times the size of the parameter. Here each chunk is converted on its
+distinct labels only (pd.factorize), which are looked up in the label -> index map of each
+dimension (from the dimension registry), and the values are written into the parameter through their flat index. Peak memory
+is the chunk plus the parameter values and a boolean mask of the filled entries.
+The checks of flodym are kept: duplicate index combinations, labels which are not dimension items
+(dropped with allow_extra_values) and missing rows or NaN values (zero with allow_missing_values).
+Only the long format with a header and one value column is read in chunks; dimension columns are
+recognised by name or letter or, as in flodym, by their item sets (e.g. intermediary_product for
+the intermediate dimension of steel), and dimensions with a single item may be omitted.
+"""
+
+import itertools
+import logging
+import os
+from typing import Dict, List, Optional
+
+import flodym as fd
+import numpy as np
+import pandas as pd
+
+from src.common.dimension_registry import DIMENSIONS
+
+# Files smaller than this are read by flodym at once
+STREAMING_MIN_BYTES = 8 * 1024**2
+CHUNK_ROWS = 200_000
+
+
+def _dim_by_items(column: pd.Series, dims: fd.DimensionSet) -> Optional[fd.Dimension]:
+    """First dimension whose items are the distinct labels of column (as flodym's same_items)."""
+    labels = [label.strip() if isinstance(label, str) else label for label in pd.unique(column)]
+    for dim in dims:
+        try:
+            items = {dim.dtype(label) for label in labels} if dim.dtype is not None else set(labels)
+        except (ValueError, TypeError):
+            continue
+        if items == set(dim.items):
+            return dim
+    return None
+
+
+def _dim_columns(columns: List[str], dims: fd.DimensionSet, first_chunk: pd.DataFrame) -> Optional[tuple]:
+    """
+    Columns of the dimensions (by letter) and the value column (key None), and the letters of
+    the columns matched by their items; None if not long format.
+    As in flodym, columns are matched by dimension name or letter, then the other columns in
+    order by their item sets, up to the first column that matches no dimension. The item sets
+    are those of first_chunk, and are checked against the whole file while reading.
+    """
+    names = {dim.name: dim.letter for dim in dims}
+    letters = {dim.letter: dim.letter for dim in dims}
+    by_letter, other_columns = {}, []
+    for column in columns:
+        letter = names.get(column, letters.get(column))
+        if letter is None:
+            other_columns.append(column)
+        elif letter in by_letter:
+            return None
+        else:
+            by_letter[letter] = column
+    by_items = set()
+    while other_columns:
+        dim = _dim_by_items(first_chunk[other_columns[0]], dims)
+        if dim is None:
+            break
+        if dim.letter in by_letter:
+            return None
+        by_letter[dim.letter] = other_columns.pop(0)
+        by_items.add(dim.letter)
+    missing = [dim for dim in dims if dim.letter not in by_letter]
+    if len(other_columns) != 1 or any(len(dim.items) != 1 for dim in missing):
+        return None
+    by_letter[None] = other_columns[0]
+    return by_letter, by_items
+
+
+def _label_codes(column: pd.Series, dim: fd.Dimension, item_index: Dict[object, int]) -> tuple:
+    """Index of each label along dim (-1 if not an item) and the labels which are not items."""
+    codes, labels = pd.factorize(column)
+    positions = np.empty(len(labels) + 1, dtype=np.intp)
+    extra = []
+    for i, label in enumerate(labels):
+        item = label.strip() if isinstance(label, str) else label
+        if dim.dtype is not None:
+            item = dim.dtype(item)
+        positions[i] = item_index.get(item, -1)
+        if positions[i] < 0:
+            extra.append(item)
+    positions[-1] = -1  # empty cells (code -1)
+    if (codes < 0).any():
+        extra.append(np.nan)
+    return positions[codes], extra
+
+
+def read_parameter_csv_chunked(
+    path: str,
+    dims: fd.DimensionSet,
+    name: str = None,
+    allow_missing_values: bool = False,
+    allow_extra_values: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Optional[fd.Parameter]:
+    """
+    Parameter from a long-format CSV file, read in chunks of chunk_rows rows, with the checks of
+    Parameter.from_df. Returns None if the file is in another format.
+    """
+    with pd.read_csv(path, chunksize=chunk_rows) as chunks:
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return None
+        columns = [column.strip() for column in first_chunk.columns]
+        first_chunk.columns = columns
+        dim_columns = _dim_columns(columns, dims, first_chunk)
+        if dim_columns is None:
+            return None
+        by_letter, by_items = dim_columns
+        item_indices = {dim.letter: DIMENSIONS.item_index(dim) for dim in dims}
+        values = np.zeros(dims.shape)
+        filled = np.zeros(dims.shape, dtype=bool)
+        flat_values, flat_filled = values.reshape(-1), filled.reshape(-1)
+        n_rows = 0
+        for chunk in itertools.chain([first_chunk], chunks):
+            chunk.columns = columns
+            n_rows += len(chunk)
+            codes = []
+            valid = np.ones(len(chunk), dtype=bool)
+            for dim in dims:
+                if dim.letter not in by_letter:
+                    codes.append(np.zeros(len(chunk), dtype=np.intp))
+                    continue
+                dim_codes, extra = _label_codes(chunk[by_letter[dim.letter]], dim, item_indices[dim.letter])
+                if extra and dim.letter in by_items:
+                    # the items of the column are not those of the dimension, so flodym would not match them
+                    logging.debug(f"Parameter {name}: column '{by_letter[dim.letter]}' of {path} is not dimension {dim.name}")
+                    return None
+                if extra and not allow_extra_values:
+                    raise ValueError(f"Parameter {name} from {path}: dimension column '{dim.name}' contains items that are not in the dimension: {set(extra)}")
+                valid &= dim_codes >= 0
+                codes.append(dim_codes)
+            chunk_values = chunk[by_letter[None]].to_numpy(dtype=np.float64)
+            if not valid.all():
+                codes = [dim_codes[valid] for dim_codes in codes]
+                chunk_values = chunk_values[valid]
+            if np.isnan(chunk_values).any():
+                if not allow_missing_values:
+                    raise ValueError(f"Parameter {name} from {path}: empty cells/NaN values in value column!")
+                chunk_values = np.where(np.isnan(chunk_values), 0.0, chunk_values)
+            flat = np.ravel_multi_index(codes, dims.shape)
+            if flat_filled[flat].any() or len(np.unique(flat)) < len(flat):
+                raise ValueError(f"Parameter {name} from {path}: index combinations occur more than once in the data.")
+            flat_filled[flat] = True
+            flat_values[flat] = chunk_values
+    if not allow_missing_values and not filled.all():
+        missing = [tuple(dim.items[i] for dim, i in zip(dims, ids)) for ids in np.argwhere(~filled)[:10]]
+        raise ValueError(
+            f"Parameter {name} from {path}: missing values for {np.count_nonzero(~filled)} index combinations, "
+            f"but allow_missing_values is set to False, e.g. {missing}."
+        )
+    logging.debug(f"Parameter {name}: {n_rows} rows read in chunks of {chunk_rows} from {path}")
+    return fd.Parameter(dims=dims, values=values, name=name)
+
+
+class StreamingCSVParameterReader(fd.CSVParameterReader):
+    """CSVParameterReader reading files of at least STREAMING_MIN_BYTES in chunks (see read_parameter_csv_chunked)."""
+
+    def read_parameter_values(self, parameter_name: str, dims: fd.DimensionSet) -> fd.Parameter:
+        path = self.parameter_filenames[parameter_name] if self.parameter_filenames is not None else None
+        if path is not None and os.path.getsize(path) >= STREAMING_MIN_BYTES:
+            parameter = read_parameter_csv_chunked(
+                path, dims, name=parameter_name,
+                allow_missing_values=self.allow_missing_values,
+                allow_extra_values=self.allow_extra_values,
+            )
+            if parameter is not None:
+                return parameter
+            logging.debug(f"Parameter {parameter_name}: {path} is not in long format, read at once")
+        return super().read_parameter_values(parameter_name, dims)
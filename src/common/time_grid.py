@@ -0,0 +1,90 @@
+# src/common/time_grid.py
+
+"""
+Time grid of a time dimension with a constant time step.
+
+This module provides:
+- TimeGrid, the integer positions of the items of a (float or integer) time dimension: the time
+  step derived from the items, the position of a time item and of the previous and next time
+  step in O(1), and positional indices into the values of arrays with the time dimension
+
+Time loops step over positions and address the previous time step as position - 1, instead of
+looking up float time items such as t - 0.25, which is slow (FlodymArray slicing searches the
+items) and fails when an item carries a floating point error. Positions of time items are
+computed as round((t - start) / time_step) and checked against the items, so 2018.7499999
+maps to the position of 2018.75. Any constant sub-annual or multi-year step is supported.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+# Relative tolerance on the time step and on time items
+TIME_TOLERANCE = 1e-6
+
+
+class TimeGrid:
+    """
+    Positions of the items of a time dimension with constant time step.
+
+    Parameters
+    ----------
+    items : sequence of float or int
+        Items of the time dimension, in increasing order
+    time_step : float, optional
+        Expected time step (e.g. the time_step config item); must match the items if given
+    letter : str
+        Letter of the time dimension in the arrays indexed with the grid
+    """
+
+    def __init__(self, items: Sequence[float], time_step: Optional[float] = None, letter: str = "t"):
+        self.items = list(items)
+        self.letter = letter
+        values = np.asarray(self.items, dtype=float)
+        if len(values) > 1:
+            steps = np.diff(values)
+            derived_step = float((values[-1] - values[0]) / (len(values) - 1))
+            if not np.allclose(steps, derived_step, rtol=TIME_TOLERANCE, atol=0):
+                raise ValueError(f"Time dimension has no constant time step: steps between {steps.min()} and {steps.max()}.")
+        else:
+            derived_step = time_step or 1.0
+        if time_step is not None and not np.isclose(time_step, derived_step, rtol=TIME_TOLERANCE, atol=0):
+            raise ValueError(f"Config item time_step ({time_step}) does not match the time step of the time dimension ({derived_step}).")
+        if derived_step <= 0:
+            raise ValueError(f"Time items must increase, got a time step of {derived_step}.")
+        self.time_step = derived_step
+        self.start = float(values[0])
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def steps_per_year(self) -> float:
+        return 1.0 / self.time_step
+
+    def position(self, t: float) -> int:
+        """Position of time item t (within the tolerance of the time step)."""
+        i = int(round((t - self.start) / self.time_step))
+        if not 0 <= i < len(self.items) or not np.isclose(self.items[i], t, rtol=0, atol=TIME_TOLERANCE * self.time_step):
+            raise KeyError(f"{t} is not an item of the time dimension ({self.items[0]} to {self.items[-1]} in steps of {self.time_step}).")
+        return i
+
+    def previous(self, i: int) -> Optional[int]:
+        """Position of the time step before position i (None for the first one)."""
+        return i - 1 if i > 0 else None
+
+    def next(self, i: int) -> Optional[int]:
+        """Position of the time step after position i (None for the last one)."""
+        return i + 1 if i < len(self.items) - 1 else None
+
+    def positions(self, start: int = 0, stop: int = None) -> range:
+        return range(start, len(self.items) if stop is None else stop)
+
+    def index(self, array, i: int, keep_dim: bool = False) -> tuple:
+        """
+        Index of the values of array (with dims) at position i of the time dimension; with keep_dim
+        the time dimension is kept with length one. Assigning to values[index] writes into array.
+        """
+        at = slice(i, i + 1) if keep_dim else i
+        return tuple(at if letter == self.letter else slice(None) for letter in array.dims.letters)
@@ -0,0 +1,471 @@
+# src/plastics/circular_kernel.py
+
+"""
+Time loop of the circular plastics MFA on raw arrays.
+
+This module provides:
+- CircularLoop, the per-time-step recurrence of compute_circular_mfa (final demand by cycle,
+  market shares, polymer market, stock outflow, collection, reuse, sorting, recycling and the
+  shift of reused and recycled plastics into the next cycle), run on views of the values of the
+  flows, parameters and aux arrays, with NumPy step by step or with a Numba kernel
+- NUMBA_AVAILABLE, whether the compiled kernel can be used (numba is optional)
+
+The loop can write checkpoints of its state every few time steps and resume from one (see
+checkpoint.py); with resume, the time steps of the checkpoint are not computed again.
+
+Every quantity at a time step depends on the previous time steps only, so each step computes
+the values at its position on the time grid (see time_grid.py) alone. The stock outflow at time t is the sum over the cohorts of
+inflow x outflow pdf, from the lifetime tables computed once before the loop. A step thus
+costs about 1/n_t of an evaluation of the whole arrays, instead of one evaluation per step.
+The whole flows and stocks are computed once after the loop by the system.
+The NumPy steps use the operations of the FlodymArray arithmetic on the slices, with its dtype
+promotion (Python numbers as float64), and give the same values. The Numba kernel sums in a
+different order, so its results differ in the last digits; it needs a dense MarketShare.
+"""
+
+import logging
+
+import flodym as fd
+import numpy as np
+
+from src.common.checkpoint import read_checkpoint, write_checkpoint
+from src.common.contraction import contract
+from src.common.precision import compute_lifetime_tables
+from src.common.sparse_trade import SparseTradeArray, trade_einsum
+from src.common.time_grid import TIME_TOLERANCE, TimeGrid
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+
+# FlodymArray arithmetic converts Python numbers to float64 arrays
+_ONE = np.float64(1.0)
+GRANULATE = "Granulate"
+MARKET_SHARE_SUBSCRIPTS = "rtspexz,rRtsp->Rtspex"
+
+
+def _ordered(array: fd.FlodymArray, letters: str) -> np.ndarray:
+    """View of the values of array with the dimensions in the order of letters."""
+    return np.transpose(array.values, [array.dims.letters.index(letter) for letter in letters])
+
+
+# ===================================================================
+# Numba kernel
+# ===================================================================
+
+def _circular_steps(
+    start, stop, grow, banded, m_gran,
+    final_demand, growth_rate, recyclate_share, market_share,
+    to_stock, reuse_to_stock, to_reuse, recyclate_to_market, to_recyclate_market,
+    manufacturing, primary, secondary, recyclate_sysenv, primary_content, recycled_content,
+    stock_inflow, inflow, outflow_table, to_collection, collection_rate, utilisation_rate, reuse_rate,
+    collected, utilised, reused, to_sorting, sorting_rate, for_recycling, sorted_waste,
+    to_market, to_sysenv, to_recycling, conversion_rate, non_mech, losses,
+):
+    """
+    Time steps start to stop - 1 as explicit loops over the elements, compiled with numba.njit.
+    Arrays have the time dimension first, then r, (o), s, p and the remaining dims.
+    """
+    nr, ns, np_, ne, nx, nz = to_stock.shape[1:]
+    no = market_share.shape[2]
+    nw = sorting_rate.shape[4]
+    nm = conversion_rate.shape[5]
+    for i in range(start, stop):
+        # final demand by cycle and cycle shift
+        for r in range(nr):
+            for s in range(ns):
+                for p in range(np_):
+                    if grow and i > 0:
+                        for e in range(ne):
+                            final_demand[i, r, s, p, e] = final_demand[i - 1, r, s, p, e] * (1.0 + growth_rate[i, r, s, p, e])
+                    if i == 0:
+                        for e in range(ne):
+                            to_stock[0, r, s, p, e, 0, 0] = final_demand[0, r, s, p, e]
+                            for x in range(nx):
+                                for z in range(nz):
+                                    reuse_to_stock[0, r, s, p, e, x, z] = 0.0
+                        continue
+                    for e in range(ne):
+                        for x in range(nx):
+                            reuse_to_stock[i, r, s, p, e, x, 0] = 0.0
+                            for z in range(1, nz):
+                                reuse_to_stock[i, r, s, p, e, x, z] = to_reuse[i - 1, r, s, p, e, x, z - 1]
+                        recyclate_to_market[i, r, s, p, e, 0] = 0.0
+                        for x in range(1, nx):
+                            recyclate_to_market[i, r, s, p, e, x] = to_recyclate_market[i - 1, r, s, p, e, x - 1]
+                    for e in range(ne):
+                        total = 0.0
+                        for x in range(nx):
+                            total += recyclate_to_market[i, r, s, p, e, x]
+                        for x in range(nx):
+                            # final demand of all e, as in the FlodymArray computation
+                            demand = 0.0
+                            for d in range(ne):
+                                if x == 0:
+                                    demand += final_demand[i, r, s, p, d] * (1.0 - recyclate_share[i, r, s, p])
+                                elif total != 0:
+                                    demand += final_demand[i, r, s, p, d] * recyclate_share[i, r, s, p] * (recyclate_to_market[i, r, s, p, e, x] / total)
+                            reuse = 0.0
+                            for z in range(nz):
+                                reuse += reuse_to_stock[i, r, s, p, e, x, z]
+                            to_stock[i, r, s, p, e, x, 0] = demand - reuse if x == 0 or total != 0 else 0.0
+        # market shares
+        for o in range(no):
+            for s in range(ns):
+                for p in range(np_):
+                    for e in range(ne):
+                        for x in range(nx):
+                            value = 0.0
+                            for r in range(nr):
+                                new = 0.0
+                                for z in range(nz):
+                                    new += to_stock[i, r, s, p, e, x, z]
+                                value += new * market_share[i, r, o, s, p]
+                            manufacturing[i, o, s, p, e, x] = value
+        for r in range(nr):
+            for s in range(ns):
+                for p in range(np_):
+                    for e in range(ne):
+                        # polymer market
+                        put_to_market = 0.0
+                        for x in range(nx):
+                            put_to_market += manufacturing[i, r, s, p, e, x]
+                        if i == 0:
+                            primary[0, r, s, p, e, 0] = put_to_market
+                            for x in range(nx):
+                                secondary[0, r, s, p, e, x] = 0.0
+                        else:
+                            primary_content[i, r, s, p, e] = manufacturing[i, r, s, p, e, 0]
+                            recycled_content[i, r, s, p, e] = put_to_market - manufacturing[i, r, s, p, e, 0]
+                            primary[i, r, s, p, e, 0] = primary_content[i, r, s, p, e]
+                            total = 0.0
+                            for x in range(nx):
+                                total += recyclate_to_market[i, r, s, p, e, x]
+                            ratio = recycled_content[i, r, s, p, e] / total if total != 0 else 0.0
+                            for x in range(nx):
+                                secondary[i, r, s, p, e, x] = recyclate_to_market[i, r, s, p, e, x] * ratio
+                                recyclate_sysenv[i, r, s, p, e, x] = recyclate_to_market[i, r, s, p, e, x] * (1.0 - ratio)
+                        for x in range(nx):
+                            for z in range(nz):
+                                # end use stock
+                                stock_inflow[i, r, s, p, e, x, z] = to_stock[i, r, s, p, e, x, z] + reuse_to_stock[i, r, s, p, e, x, z]
+                                inflow[i, r, s, p, e, x, z] = stock_inflow[i, r, s, p, e, x, z]
+                                value = 0.0
+                                if banded:
+                                    for a in range(min(i + 1, outflow_table.shape[1])):
+                                        value += inflow[i - a, r, s, p, e, x, z] * outflow_table[i, a, r, s, p, e, x, z]
+                                else:
+                                    for c in range(i + 1):
+                                        value += inflow[c, r, s, p, e, x, z] * outflow_table[i, c, r, s, p, e, x, z]
+                                to_collection[i, r, s, p, e, x, z] = value
+                                # collection, utilisation and reuse
+                                collected[i, r, s, p, e, x, z] = to_collection[i, r, s, p, e, x, z] * collection_rate[i, r, s, p]
+                                utilised[i, r, s, p, e, x, z] = collected[i, r, s, p, e, x, z] * utilisation_rate[i, r, s, p]
+                                to_reuse[i, r, s, p, e, x, z] = utilised[i, r, s, p, e, x, z] * reuse_rate[i, r, s, p, z]
+                                reused[i, r, s, p, e, x, z] = to_reuse[i, r, s, p, e, x, z]
+                                to_sorting[i, r, s, p, e, x, z] = utilised[i, r, s, p, e, x, z] - reused[i, r, s, p, e, x, z]
+                                # sorting
+                                for w in range(nw):
+                                    sorted_waste[i, r, s, p, w, e, x, z] = to_sorting[i, r, s, p, e, x, z] * sorting_rate[i, r, s, p, w]
+                                    if for_recycling[w]:
+                                        to_market[i, r, s, p, w, e, x, z] = sorted_waste[i, r, s, p, w, e, x, z]
+                                        to_sysenv[i, r, s, p, w, e, x, z] = 0.0
+                                    else:
+                                        to_market[i, r, s, p, w, e, x, z] = 0.0
+                                        to_sysenv[i, r, s, p, w, e, x, z] = sorted_waste[i, r, s, p, w, e, x, z]
+                            # recycling
+                            sorted_total = 0.0
+                            for w in range(nw):
+                                value = 0.0
+                                for z in range(nz):
+                                    value += to_market[i, r, s, p, w, e, x, z]
+                                to_recycling[i, r, s, p, w, e, x] = value
+                                sorted_total += value
+                            recycled_total = 0.0
+                            for m in range(nm):
+                                value = 0.0
+                                for w in range(nw):
+                                    value += to_recycling[i, r, s, p, w, e, x] * conversion_rate[i, r, s, p, w, m, x]
+                                non_mech[i, r, s, p, m, e, x] = value
+                                recycled_total += value
+                            losses[i, r, s, p, e, x] = sorted_total - recycled_total
+                            to_recyclate_market[i, r, s, p, e, x] = non_mech[i, r, s, p, m_gran, e, x]
+                            non_mech[i, r, s, p, m_gran, e, x] = 0.0
+
+
+_compiled_steps = None
+
+
+def _get_compiled_steps():
+    global _compiled_steps
+    if _compiled_steps is None:
+        logging.info("mfa_system - compiling the time loop of the circular model with numba")
+        _compiled_steps = numba.njit(cache=True)(_circular_steps)
+    return _compiled_steps
+
+
+# ===================================================================
+# Time loop
+# ===================================================================
+
+class CircularLoop:
+    """
+    Per-time-step recurrence of compute_circular_mfa on views of the arrays of the system.
+    The lifetime parameters of the end use stock must be set before.
+
+    Parameters
+    ----------
+    mfa : CircularPlasticsMFASystem
+        System whose flows, parameters and stock are written
+    aux : dict
+        Aux arrays of compute_circular_mfa
+    time : TimeGrid
+        Grid of the time dimension of the system
+    for_recycling : np.ndarray
+        Boolean vector along w, the waste categories sent to the sorted waste market
+    grow : bool
+        Compute FinalDemand from its previous value and growth_rate
+    use_numba : bool
+        Run the compiled kernel, if numba is installed and MarketShare is dense
+    """
+
+    def __init__(self, mfa: fd.MFASystem, aux: dict, time: TimeGrid, for_recycling: np.ndarray, grow: bool = False, use_numba: bool = False):
+        prm, flw = mfa.parameters, mfa.flows
+        stock = mfa.stocks["End use stock"]
+        self.time = time
+        self.grow = grow
+        self.for_recycling = for_recycling
+        self.m_gran = mfa.dims["m"].items.index(GRANULATE)
+        self.market_share = prm["MarketShare"]
+        self.manufacturing_flow = flw["Plastics manufacturing => Plastics market"]
+        self.to_stock_flow = flw["Plastics market => End use stock"]
+        self.market_share_dims = None
+        if isinstance(self.market_share, SparseTradeArray):
+            dims = self.market_share.dims
+            self.market_share_dims = fd.DimensionSet(dim_list=[
+                fd.Dimension(name=d.name, letter=d.letter, items=d.items[:1], dtype=d.dtype) if d.letter == "t" else d
+                for d in dims
+            ])
+
+        self.banded = getattr(stock, "is_banded", False)
+        table = compute_lifetime_tables(stock)
+        stock_letters = [letter for letter in stock.dims.letters if letter != stock.time_letter]
+        self.outflow_table = np.transpose(table, [0, 1] + [2 + stock_letters.index(letter) for letter in "rspexz"])
+
+        self.views = {
+            "final_demand": _ordered(prm["FinalDemand"], "trspe"),
+            # the kernel needs an array even without growth
+            "growth_rate": _ordered(prm["growth_rate" if grow else "FinalDemand"], "trspe"),
+            "recyclate_share": _ordered(prm["RecyclateShare"], "trsp"),
+            "market_share": None if self.market_share_dims is not None else _ordered(self.market_share, "trosp"),
+            "to_stock": _ordered(self.to_stock_flow, "trspexz"),
+            "reuse_to_stock": _ordered(flw["Reuse => End use stock"], "trspexz"),
+            "to_reuse": _ordered(flw["Waste collection => Reuse"], "trspexz"),
+            "recyclate_to_market": _ordered(flw["Recyclate market => Polymer market"], "trspex"),
+            "to_recyclate_market": _ordered(flw["Recycling => Recyclate market"], "trspex"),
+            "manufacturing": _ordered(self.manufacturing_flow, "trspex"),
+            "primary": _ordered(flw["Polymer market => PRIMARY Plastics manufacturing"], "trspex"),
+            "secondary": _ordered(flw["Polymer market => SECONDARY Plastics manufacturing"], "trspex"),
+            "recyclate_sysenv": _ordered(flw["Polymer market => RECYCLATE sysenv"], "trspex"),
+            "primary_content": _ordered(aux["PrimaryContent"], "trspe"),
+            "recycled_content": _ordered(aux["RecycledContent"], "trspe"),
+            "stock_inflow": _ordered(aux["StockInflow"], "trspexz"),
+            "inflow": _ordered(stock.inflow, "trspexz"),
+            "outflow_table": self.outflow_table,
+            "to_collection": _ordered(flw["End use stock => Waste collection"], "trspexz"),
+            "collection_rate": _ordered(prm["EoLCollectionRate"], "trsp"),
+            "utilisation_rate": _ordered(prm["EoLUtilisationRate"], "trsp"),
+            "reuse_rate": _ordered(aux["ReuseRate"], "trspz"),
+            "collected": _ordered(aux["CollectedWaste"], "trspexz"),
+            "utilised": _ordered(aux["UtilisedWaste"], "trspexz"),
+            "reused": _ordered(aux["ReusedPlastics"], "trspexz"),
+            "to_sorting": _ordered(flw["Waste collection => Waste sorting"], "trspexz"),
+            "sorting_rate": _ordered(prm["SortingRate"], "trspw"),
+            "for_recycling": for_recycling,
+            "sorted_waste": _ordered(aux["SortedWaste"], "trspwexz"),
+            "to_market": _ordered(flw["Waste sorting => Sorted waste market"], "trspwexz"),
+            "to_sysenv": _ordered(flw["Waste sorting => sysenv"], "trspwexz"),
+            "to_recycling": _ordered(flw["Sorted waste market => Recycling"], "trspwex"),
+            "conversion_rate": _ordered(aux["RecyclingConversionRate"], "trspwmx"),
+            "non_mech": _ordered(flw["Recycling => NON-MECH sysenv"], "trspmex"),
+            "losses": _ordered(flw["Recycling => LOSSES sysenv"], "trspex"),
+        }
+
+        self.use_numba = use_numba and NUMBA_AVAILABLE and self.market_share_dims is None
+        if use_numba and not NUMBA_AVAILABLE:
+            logging.warning("mfa_system - numba is not installed, the time loop of the circular model runs with NumPy")
+        elif use_numba and not self.use_numba:
+            logging.info("mfa_system - the numba kernel needs a dense MarketShare, the time loop runs with NumPy")
+
+    @property
+    def state(self) -> dict:
+        """Arrays written by the time steps, i.e. the contents of a checkpoint."""
+        names = _STATE_ARRAYS + (("final_demand",) if self.grow else ())
+        return {name: self.views[name] for name in names}
+
+    def run(self, start: int = 0, stop: int = None, checkpoint_every: int = None, checkpoint_path: str = None):
+        """
+        Compute the time steps start to stop - 1 (all remaining ones by default). With
+        checkpoint_every, write a checkpoint to checkpoint_path after every that many time steps.
+        """
+        positions = self.time.positions(start, stop)
+        bounds = [positions.start]
+        if checkpoint_every:
+            bounds += list(range((positions.start // checkpoint_every + 1) * checkpoint_every, positions.stop, checkpoint_every))
+        bounds.append(positions.stop)
+        for chunk_start, chunk_stop in zip(bounds[:-1], bounds[1:]):
+            self._run_steps(chunk_start, chunk_stop)
+            if chunk_stop < positions.stop:
+                self.write_checkpoint(checkpoint_path, chunk_stop)
+
+    def _run_steps(self, start: int, stop: int):
+        if start >= stop:
+            return
+        if self.use_numba:
+            logging.info(f"Computing CE for years {self.time.items[start]} to {self.time.items[stop - 1]}.")
+            arrays = [self.views[name] for name in _KERNEL_ARRAYS]
+            _get_compiled_steps()(start, stop, self.grow, self.banded, self.m_gran, *arrays)
+            return
+        for i in range(start, stop):
+            logging.info(f"Computing CE for year {self.time.items[i]}.")
+            self.step(i)
+
+    def write_checkpoint(self, path: str, completed_steps: int):
+        info = {"time_items": self.time.items, "time_step": self.time.time_step, "grow": self.grow}
+        write_checkpoint(path, completed_steps, self.state, info)
+
+    def resume(self, path: str) -> int:
+        """
+        Copy the state of the time steps completed in the checkpoint at path (see find_checkpoint)
+        into the arrays of the system; returns the position to continue from. The checkpoint may
+        come from another scenario with the same dimensions and the same time steps up to there.
+        """
+        info, arrays = read_checkpoint(path)
+        completed_steps = info["completed_steps"]
+        checkpoint_items = info["time_items"][:completed_steps]
+        if completed_steps > len(self.time) or not np.allclose(checkpoint_items, self.time.items[:completed_steps], rtol=0, atol=TIME_TOLERANCE):
+            raise ValueError(f"Time steps of checkpoint {path} ({checkpoint_items[0]} to {checkpoint_items[-1]}) do not match the time dimension.")
+        for name, view in self.state.items():
+            if name not in arrays:
+                raise ValueError(f"Checkpoint {path} has no array {name} (written without growth rate?).")
+            if arrays[name].shape[1:] != view.shape[1:]:
+                raise ValueError(f"Array {name} of checkpoint {path} has shape {arrays[name].shape}, expected {view.shape} (except time).")
+            view[:completed_steps] = arrays[name][:completed_steps]
+        return completed_steps
+
+    def step(self, i: int):
+        """Time step at position i, with NumPy operations on the views at i (and the previous time step)."""
+        v = self.views
+        prev = self.time.previous(i)
+        final_demand, recyclate_share = v["final_demand"], v["recyclate_share"]
+        to_stock, reuse_to_stock, recyclate_to_market = v["to_stock"], v["reuse_to_stock"], v["recyclate_to_market"]
+
+        ### FINAL DEMAND
+        if prev is None:
+            # In the first year, final demand is met entirely with new/recycled plastics, and there are no reused plastics from previous cycles yet.
+            to_stock[0, ..., 0, 0] = final_demand[0]
+            reuse_to_stock[0] = 0
+        else:
+            if self.grow:
+                final_demand[i] = final_demand[prev] * (v["growth_rate"][i] + _ONE)
+            # Increment cycle counters for reused plastics (z) and mechanically recycled plastics (x)
+            reuse_to_stock[i, ..., 1:] = v["to_reuse"][prev, ..., :-1]
+            reuse_to_stock[i, ..., 0] = 0
+            recyclate_to_market[i, ..., 1:] = v["to_recyclate_market"][prev, ..., :-1]
+            recyclate_to_market[i, ..., 0] = 0
+            reuse = np.einsum("rspexz->rspex", reuse_to_stock[i])
+            total = np.einsum("rspex->rspe", recyclate_to_market[i])
+            # Assumption: final demand and imports have the same rate of recycled content and the same cycle distribution as "Recycling => Polymer market".
+            # Assumption: reused materials replace first use material in the same recycled cycle (i.e. same x).
+            # Note: the final demand is summed over e, as in the FlodymArray subtraction of the per-element computation.
+            new = final_demand[i] * (_ONE - recyclate_share[i])[..., None]
+            to_stock[i, ..., 0, 0] = np.einsum("rspe->rsp", new)[..., None] - reuse[..., 0]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                share_cycle = recyclate_to_market[i, ..., 1:] * (1.0 / total)[..., None]
+                new = final_demand[i] * recyclate_share[i][..., None]
+                recycled = np.einsum("rspdex->rspex", new[..., None, None] * share_cycle[:, :, :, None]) - reuse[..., 1:]
+            to_stock[i, ..., 1:, 0] = np.where(total[..., None] != 0, recycled, 0)
+
+        ### UPSTREAM FLOWS TO PRODUCTION
+        to_stock_i = self.to_stock_flow.values[self.time.index(self.to_stock_flow, i, keep_dim=True)]
+        if self.market_share_dims is None:
+            market_share = self.market_share.values[self.time.index(self.market_share, i, keep_dim=True)]
+            manufacturing = contract(MARKET_SHARE_SUBSCRIPTS, to_stock_i, market_share)
+        else:
+            market_share = self.market_share.take_block("t", slice(i, i + 1), self.market_share_dims)
+            manufacturing = trade_einsum(MARKET_SHARE_SUBSCRIPTS, to_stock_i, market_share)
+        self.manufacturing_flow.values[self.time.index(self.manufacturing_flow, i, keep_dim=True)] = manufacturing
+
+        ### POLYMER MARKET
+        manufacturing = v["manufacturing"][i]
+        if prev is None:
+            v["primary"][0, ..., 0] = np.einsum("rspex->rspe", manufacturing)
+            v["secondary"][0] = 0
+        else:
+            v["primary_content"][i] = manufacturing[..., 0]
+            v["recycled_content"][i] = np.einsum("rspex->rspe", manufacturing) - v["primary_content"][i]
+            v["primary"][i, ..., 0] = v["primary_content"][i]
+            # RatioRecycledToRecyclate > 1 means recycled content quotas exceed secondary production capacity, so the
+            # remaining demand for recycled content is imported ("Polymer market => RECYCLATE sysenv" < 0);
+            # < 1 means the excess mechanically recycled plastics are exported ("Polymer market => RECYCLATE sysenv" > 0).
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(total != 0, v["recycled_content"][i] * (1.0 / total), 0.0)
+            v["secondary"][i] = recyclate_to_market[i] * ratio[..., None]
+            v["recyclate_sysenv"][i] = recyclate_to_market[i] * (_ONE - ratio)[..., None]
+
+        ### END USE STOCK
+        v["stock_inflow"][i] = to_stock[i] + reuse_to_stock[i]
+        inflow = v["inflow"]
+        inflow[i] = v["stock_inflow"][i]
+        if self.banded:
+            ages = np.arange(min(i + 1, self.outflow_table.shape[1]))
+            by_cohort = inflow[i - ages] * self.outflow_table[i, ages]
+        else:
+            by_cohort = inflow * self.outflow_table[i]
+        v["to_collection"][i] = by_cohort.sum(axis=0, dtype=np.float64)
+
+        ### WASTE COLLECTION, UTILISATION & REUSE
+        v["collected"][i] = v["to_collection"][i] * v["collection_rate"][i][..., None, None, None]
+        v["utilised"][i] = v["collected"][i] * v["utilisation_rate"][i][..., None, None, None]
+        v["to_reuse"][i] = v["utilised"][i] * v["reuse_rate"][i][:, :, :, None, None, :]
+        v["reused"][i] = v["to_reuse"][i]
+        v["to_sorting"][i] = v["utilised"][i] - v["reused"][i]
+
+        ### WASTE SORTING
+        v["sorted_waste"][i] = v["to_sorting"][i][:, :, :, None] * v["sorting_rate"][i][..., None, None, None]
+        mask = self.for_recycling.reshape(-1, 1, 1, 1)
+        for flow, keep in ((v["to_market"][i], mask), (v["to_sysenv"][i], ~mask)):
+            flow[...] = 0
+            np.copyto(flow, v["sorted_waste"][i], where=keep)
+        to_recycling = v["to_recycling"][i]
+        to_recycling[...] = np.einsum("rspwexz->rspwex", v["to_market"][i])
+
+        ### RECYCLING
+        non_mech = v["non_mech"][i]
+        non_mech[...] = np.einsum("rspwexm->rspmex", np.einsum("rspwex,rspwmx->rspwexm", to_recycling, v["conversion_rate"][i]))
+        v["losses"][i] = np.einsum("rspwex->rspex", to_recycling) - np.einsum("rspmex->rspex", non_mech)
+        v["to_recyclate_market"][i] = non_mech[:, :, :, self.m_gran]
+        non_mech[:, :, :, self.m_gran] = 0
+
+
+# Arrays of CircularLoop.views in the order of the arguments of _circular_steps
+_KERNEL_ARRAYS = (
+    "final_demand", "growth_rate", "recyclate_share", "market_share",
+    "to_stock", "reuse_to_stock", "to_reuse", "recyclate_to_market", "to_recyclate_market",
+    "manufacturing", "primary", "secondary", "recyclate_sysenv", "primary_content", "recycled_content",
+    "stock_inflow", "inflow", "outflow_table", "to_collection", "collection_rate", "utilisation_rate", "reuse_rate",
+    "collected", "utilised", "reused", "to_sorting", "sorting_rate", "for_recycling", "sorted_waste",
+    "to_market", "to_sysenv", "to_recycling", "conversion_rate", "non_mech", "losses",
+)
+
+# Arrays of CircularLoop.views written by the time steps (and final_demand with growth rate)
+_STATE_ARRAYS = (
+    "to_stock", "reuse_to_stock", "to_reuse", "recyclate_to_market", "to_recyclate_market",
+    "manufacturing", "primary", "secondary", "recyclate_sysenv", "primary_content", "recycled_content",
+    "stock_inflow", "inflow", "to_collection", "collected", "utilised", "reused", "to_sorting", "sorted_waste",
+    "to_market", "to_sysenv", "to_recycling", "non_mech", "losses",
+)
@@ -2,6 +2,7 @@ import logging
 import flodym as fd
 
 from src.common.common_cfg import GeneralCfg
+from src.common.banded_stock import BandedInflowDrivenDSM
 
 
 def get_definition(cfg: GeneralCfg):
@@ -64,7 +65,7 @@ def get_definition(cfg: GeneralCfg):
                     name="End use stock",
                     process_name="End use stock",
                     dim_letters=("t", "r", "s", "p", "e"),
-                    subclass=fd.InflowDrivenDSM,
+                    subclass=BandedInflowDrivenDSM,
                     lifetime_model_class=cfg.customization.lifetime_model,
                     time_letter="t",
                 ),
@@ -141,7 +142,7 @@ def get_definition(cfg: GeneralCfg):
                     name="End use stock",
                     process_name="End use stock",
                     dim_letters=("t", "r", "s", "d", "p"),
-                    subclass=fd.InflowDrivenDSM,
+                    subclass=BandedInflowDrivenDSM,
                     lifetime_model_class=cfg.customization.lifetime_model,
                     time_letter="t",
                 ),
@@ -2,6 +2,7 @@ import logging
 import flodym as fd
 
 from src.common.common_cfg import GeneralCfg
+from src.common.banded_stock import BandedInflowDrivenDSM
 
 
 def get_definition_circular(cfg: GeneralCfg):
@@ -69,7 +70,7 @@ def get_definition_circular(cfg: GeneralCfg):
                 name="End use stock",
                 process_name="End use stock",
                 dim_letters=("t", "r", "s", "p", "e", "x", "z"),
-                subclass=fd.InflowDrivenDSM,
+                subclass=BandedInflowDrivenDSM,
                 lifetime_model_class=cfg.customization.lifetime_model,
                 time_letter="t",
             ),
@@ -1,9 +1,9 @@
-import plotly.express as px
 import pandas as pd
 import flodym as fd
 from typing import TYPE_CHECKING
 
 from src.common.custom_export import CustomDataExporter
+from src.common.profiling import profiled
 
 if TYPE_CHECKING:
     from src.plastics.plastics_model import PlasticsModel
@@ -16,6 +16,7 @@ class PlasticsDataExporter(CustomDataExporter):
 
     }
 
+    @profiled()
     def visualize_results(self, model: "PlasticsModel", flows_dfs: dict[str, pd.DataFrame], scenario: str = ""):
         figs = {}
         dfs = {}
@@ -52,6 +53,7 @@ class PlasticsDataExporter(CustomDataExporter):
                 fig.show()
 
     def visualize_inflow(self, flows_dfs: dict[str, pd.DataFrame], scenario: str = ""):
+        import plotly.express as px
         df = flows_dfs.get("Plastics market => End use stock")
         df.reset_index(inplace=True)
         fig = px.area(df.loc[df['region']=="EU27+3", ['time', 'sector', 'polymer', 'value']], 
@@ -62,6 +64,7 @@ class PlasticsDataExporter(CustomDataExporter):
         return fig, df
 
     def visualize_production(self, flows_dfs: dict[str, pd.DataFrame], scenario: str = ""):
+        import plotly.express as px
         df = flows_dfs.get("sysenv => Polymer market")
         df.reset_index(inplace=True)
         fig = px.area(df.loc[df['region']=="EU27+3", ['time', 'sector', 'polymer', 'value']], 
@@ -72,6 +75,7 @@ class PlasticsDataExporter(CustomDataExporter):
         return fig, df
     
     def visualize_outflow(self, flows_dfs: dict[str, pd.DataFrame], scenario: str = ""):
+        import plotly.express as px
         df = flows_dfs.get("Waste collection => Waste sorting")
         df.reset_index(inplace=True)
         fig = px.area(df.loc[df['region']=="Germany", ['time', 'sector', 'polymer', 'value']], 
@@ -90,6 +94,7 @@ class PlasticsDataExporter(CustomDataExporter):
         the grouping variable (sector or polymer) and for sorted waste the waste category. 
         The label_type variable is used to set the y-axis label and the title of the figure.
         """
+        import plotly.express as px
 
         # Grouping variables and dimensions to display in the figure depend on the type of flow we want to visualize.
         if not label_type.startswith("sorted_waste"):
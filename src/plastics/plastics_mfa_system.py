@@ -2,15 +2,66 @@ import flodym as fd
 import numpy as np
 import logging
 
-
-class PlasticsMFASystem(fd.MFASystem):
-
-    def compute(self):
+from src.common.stage_tracking import ComputeStage, StageTracker
+from src.common.profiling import profiled
+from src.common.aux_pool import AuxPoolMixin
+from src.common.parameter_cache import InterpolationCacheMixin
+from src.common.precision import PrecisionMixin, compute_inflow_driven_stock, get_dtype
+from src.common.sector_partition import SectorPartitionMixin
+from src.common.sparse_trade import SparseTradeArray, link_blocks, trade_einsum
+
+
+# Parameters filled in over time by interpolate_parameters
+INTERPOLATED_PARAMETERS = [
+    'ImportRateNew', 'ExportRateNew', 'MarketShare',
+    'RecyclateShare', 'EoLCollectionRate', 'EoLUtilisationRate', 'DeprivedRate',
+    'SortingRate', 'ImportRateSortedWaste', 'ExportRateSortedWaste', 'RecyclingConversionRate',
+]
+
+
+def split_sorted_waste(sorted_waste: fd.FlodymArray, to_market: fd.FlodymArray, to_sysenv: fd.FlodymArray, for_recycling: np.ndarray):
+    """
+    Write the sorted waste of the waste categories for recycling (boolean vector along w) into
+    to_market and of the other categories into to_sysenv; both have the dims of sorted_waste.
+    """
+    shape = [1] * len(sorted_waste.dims.letters)
+    shape[sorted_waste.dims.letters.index("w")] = -1
+    mask = for_recycling.reshape(shape)
+    for flow, keep in ((to_market, mask), (to_sysenv, ~mask)):
+        flow.values[...] = 0
+        np.copyto(flow.values, sorted_waste.values, where=keep)
+
+
+class PlasticsMFASystem(SectorPartitionMixin, AuxPoolMixin, PrecisionMixin, InterpolationCacheMixin, fd.MFASystem):
+
+    @profiled()
+    def compute(self, incremental: bool = False):
         """
         Perform all computations for the MFA system in sequence.
+        With incremental=True, only the stages whose inputs changed since the last
+        incremental compute are re-run (see _compute_stages).
         """
+        if incremental:
+            self._compute_incremental()
+            return
         if not self.cfg.customization.prodcom:
-            self.interpolate_parameters()
+            self.interpolate_parameters_cached(INTERPOLATED_PARAMETERS)
+        self.compute_by_sector_blocks("compute_flows")
+
+    @profiled()
+    def compute_flows(self):
+        """
+        Compute inflows, stock and outflows, which are independent between end use sectors.
+        """
+        self.compute_inflows()
+        self.compute_stock()
+        self.compute_outflows()
+
+    @profiled()
+    def compute_inflows(self):
+        """
+        Compute the inflows into the stock according to the model_driven config item.
+        """
         if self.cfg.customization.model_driven == 'production':
             self.compute_inflows_production_driven()
         elif self.cfg.customization.model_driven == 'final_demand':
@@ -19,7 +70,66 @@ class PlasticsMFASystem(fd.MFASystem):
             self.compute_inflows_final_demand_driven(with_start_value_and_growth_rate=True)
         else:
             raise ValueError(f"Config item model_driven has invalid value: {self.cfg.model_driven}. Choose 'production', 'final_demand', or 'final_demand_with_start_value_and_growth_rate'.")
+
+    def _compute_stages(self) -> list:
+        """
+        Compute stages in order, with the parameters, flows and config items each stage reads.
+        """
+        cst = self.cfg.customization
+        if cst.model_driven == 'production':
+            inflow_parameters = ["DomesticDemand", "RecyclateShare", "ImportNew", "ImportRateNew", "ExportNew", "ExportRateNew", "MarketShare"]
+        else:
+            inflow_parameters = ["FinalDemand", "start_value", "growth_rate", "MarketShare", "ImportNew", "ExportNew", "RecyclateShare"]
+
+        stages = []
+        if not cst.prodcom:
+            stages.append(ComputeStage(
+                name="interpolate",
+                run=lambda changed: self.interpolate_parameters(params=[c.split(" ", 1)[1] for c in changed]),
+                parameters=INTERPOLATED_PARAMETERS,
+            ))
+        stages += [
+            ComputeStage(
+                name="inflows",
+                run=lambda changed: self.compute_inflows(),
+                parameters=inflow_parameters,
+                config={"model_driven": cst.model_driven, "prodcom": cst.prodcom},
+            ),
+            ComputeStage(
+                name="stock",
+                run=self._run_stock_stage,
+                parameters=["Lifetime"],
+                flows=["Plastics market => End use stock"],
+                config={
+                    "lifetime_model_name": cst.lifetime_model_name,
+                    "survival_cutoff": cst.survival_cutoff,
+                    "dtype": get_dtype(self.cfg).__name__,
+                },
+            ),
+            ComputeStage(
+                name="outflows",
+                run=self._run_outflows_stage,
+                parameters=["DeprivedRate", "EoLCollectionRate", "EoLUtilisationRate", "SortingRate",
+                            "ImportRateSortedWaste", "ExportRateSortedWaste", "RecyclingConversionRate"],
+                config={"waste_not_for_recycling": cst.waste_not_for_recycling},
+                upstream=["stock"],
+            ),
+        ]
+        return stages
+
+    def _compute_incremental(self):
+        if getattr(self, "_stage_tracker", None) is None:
+            self._stage_tracker = StageTracker()
+        rerun = self._stage_tracker.run(self, self._compute_stages())
+        logging.info(f"mfa_system - incremental compute re-ran stages: {rerun}")
+
+    def _run_stock_stage(self, changed):
         self.compute_stock()
+        # compute_outflows adds the deprived volumes to the stock, keep the stock before that for re-runs
+        self._stock_without_deprived = self.stocks["End use stock"].stock.values.copy()
+
+    def _run_outflows_stage(self, changed):
+        self.stocks["End use stock"].stock.values[...] = self._stock_without_deprived
         self.compute_outflows()
 
 
@@ -32,9 +142,11 @@ class PlasticsMFASystem(fd.MFASystem):
         except ValueError:
             return None, None
 
-    def interpolate_parameters(self):
+    @profiled()
+    def interpolate_parameters(self, params: list = None):
         """
         Interpolate parameters to the model time step.
+        If params is given, only those parameters are interpolated.
         """
         
         logging.info("mfa_system - interpolate_parameters")
@@ -47,6 +159,9 @@ class PlasticsMFASystem(fd.MFASystem):
         Nw = len(self.dims["w"].items)
         Nm = len(self.dims["m"].items)
 
+        def selected(names):
+            return [n for n in names if params is None or n in params]
+
         # DOMESTIC DEMAND, IMPORT NEW (absolute), EXPORT NEW (absolute)
         # Index: rtspe
         # These data should already be provided for each year.
@@ -55,19 +170,19 @@ class PlasticsMFASystem(fd.MFASystem):
         # ImportRateNew, ExportRateNew, MarketShare
         # Index: rrtsp
 
-        for param in ['ImportRateNew', 'ExportRateNew', 'MarketShare']:
+        for param in selected(['ImportRateNew', 'ExportRateNew', 'MarketShare']):
             
             logging.info('Interpolating parameter ' + param)
-            for r in np.arange(0,Nr):
-                for rr in np.arange(0,Nr):
-                    for s in np.arange(0,Ns):
-                        for p in np.arange(0,Np):
+            # one block per region pair (only the pairs with trade if stored sparse)
+            for block in link_blocks(prm[param]):
+                for s in np.arange(0,Ns):
+                    for p in np.arange(0,Np):
 
-                            xp,x = self._prepare_interpolate(prm[param].values[r,rr,:,s,p])                    
-                            if xp is not None:
-                                fp = prm[param].values[r,rr,xp,s,p]
-                                yp = np.interp(x, xp, fp)
-                                prm[param].values[r,rr,x,s,p] = yp
+                        xp,x = self._prepare_interpolate(block[:,s,p])
+                        if xp is not None:
+                            fp = block[xp,s,p]
+                            yp = np.interp(x, xp, fp)
+                            block[x,s,p] = yp
 
         # ImportUsed, ExportUsed, ImportRateUsed, ExportRateUsed
         # Index: rrtcsp
@@ -77,7 +192,7 @@ class PlasticsMFASystem(fd.MFASystem):
         # RecyclateShare, EoLCollectionRate, EoLUtilisationRate, DeprivedRate
         # Index: rtsp
 
-        for param in ['RecyclateShare', 'EoLCollectionRate', 'EoLUtilisationRate', 'DeprivedRate']:
+        for param in selected(['RecyclateShare', 'EoLCollectionRate', 'EoLUtilisationRate', 'DeprivedRate']):
 
             logging.info('Interpolating parameter ' + param)
 
@@ -93,51 +208,56 @@ class PlasticsMFASystem(fd.MFASystem):
 
         # SortingRate
         # Index: rtspw
-        logging.info('Interpolating parameter SortingRate')
-        for r in np.arange(0,Nr):
-            for s in np.arange(0,Ns):
-                for p in np.arange(0,Np):
-                    for w in np.arange(0,Nw):
 
-                        xp,x = self._prepare_interpolate(prm['SortingRate'].values[r,:,s,p,w])
-                        if xp is not None:
-                            fp = prm['SortingRate'].values[r,xp,s,p,w]
-                            yp = np.interp(x, xp, fp)
-                            prm['SortingRate'].values[r,x,s,p,w] = yp
+        for param in selected(['SortingRate']):
+
+            logging.info('Interpolating parameter ' + param)
+            for r in np.arange(0,Nr):
+                for s in np.arange(0,Ns):
+                    for p in np.arange(0,Np):
+                        for w in np.arange(0,Nw):
+
+                            xp,x = self._prepare_interpolate(prm[param].values[r,:,s,p,w])
+                            if xp is not None:
+                                fp = prm[param].values[r,xp,s,p,w]
+                                yp = np.interp(x, xp, fp)
+                                prm[param].values[r,x,s,p,w] = yp
 
         # ImportRateSorted, ExportRateSorted
         # index: rrtspw
 
-        for param in ['ImportRateSortedWaste', 'ExportRateSortedWaste']:
+        for param in selected(['ImportRateSortedWaste', 'ExportRateSortedWaste']):
             
             logging.info('Interpolating parameter ' + param)
 
+            for block in link_blocks(prm[param]):
+                for s in np.arange(0,Ns):
+                    for p in np.arange(0,Np):
+                        for w in np.arange(0,Nw):
+
+                            xp,x = self._prepare_interpolate(block[:,s,p,w])
+                            if xp is not None:
+                                fp = block[xp,s,p,w]
+                                yp = np.interp(x, xp, fp)
+                                block[x,s,p,w] = yp
+                            
+        # RecyclingConversionRate
+        # Index: rtspwm
+
+        for param in selected(['RecyclingConversionRate']):
+
+            logging.info('Interpolating parameter ' + param)
             for r in np.arange(0,Nr):
-                for rr in np.arange(0,Nr):
-                    for s in np.arange(0,Ns):
-                        for p in np.arange(0,Np):
-                            for w in np.arange(0,Nw):
+                for s in np.arange(0,Ns):
+                    for p in np.arange(0,Np):
+                        for w in np.arange(0,Nw):
+                            for m in np.arange(0,Nm):
 
-                                xp,x = self._prepare_interpolate(prm[param].values[r,rr,:,s,p,w])                    
+                                xp,x = self._prepare_interpolate(prm[param].values[r,:,s,p,w,m])
                                 if xp is not None:
-                                    fp = prm[param].values[r,rr,xp,s,p,w]
+                                    fp = prm[param].values[r,xp,s,p,w,m]
                                     yp = np.interp(x, xp, fp)
-                                    prm[param].values[r,rr,x,s,p,w] = yp
-                            
-        # RecyclingLossRate
-        # Index: rtpw
-        logging.info('Interpolating parameter RecyclingLossRate')
-        for r in np.arange(0,Nr):
-            for s in np.arange(0,Ns):
-                for p in np.arange(0,Np):
-                    for w in np.arange(0,Nw):
-                        for m in np.arange(0,Nm):
-
-                            xp,x = self._prepare_interpolate(prm['RecyclingConversionRate'].values[r,:,s,p,w,m])
-                            if xp is not None:
-                                fp = prm['RecyclingConversionRate'].values[r,xp,s,p,w,m]
-                                yp = np.interp(x, xp, fp)
-                                prm['RecyclingConversionRate'].values[r,x,s,p,w,m] = yp
+                                    prm[param].values[r,x,s,p,w,m] = yp
 
         logging.info('Those parameters were not interpolated (i.e. must be provided in full):\n \
                         DomesticDemand, ImportNew, ExportNew, ImportUsed, ExportUsed, ImportRateUsed, ExportRateUsed')
@@ -191,6 +311,7 @@ class PlasticsMFASystem(fd.MFASystem):
 
         return parameter
 
+    @profiled()
     def compute_inflows_production_driven(self):
         """
         Compute flows from production (converter demand) downstream down to final consumption entering the stock.
@@ -206,17 +327,17 @@ class PlasticsMFASystem(fd.MFASystem):
         # Define auxiliary flows for the MFA system in addition to the main flows defined in plastics_definition.py
         if not self.cfg.customization.prodcom:
             aux = {
-                "DomesticInputManufacturing": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-                "ImportNew": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-                "ExportNew": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-                "NetImport": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
+                "DomesticInputManufacturing": self.get_aux_array(("r", "t", "s", "p", "e")),
+                "ImportNew": self.get_aux_array(("r", "t", "s", "p", "e")),
+                "ExportNew": self.get_aux_array(("r", "t", "s", "p", "e")),
+                "NetImport": self.get_aux_array(("r", "t", "s", "p", "e")),
             }
         else:
             aux = {
-                "DomesticInputManufacturing": self.get_new_array(dim_letters=("r", "t", "s", "d", "p")),
-                "ImportNew": self.get_new_array(dim_letters=("r", "t", "s", "d", "p")),
-                "ExportNew": self.get_new_array(dim_letters=("r", "t", "s", "d", "p")),
-                "NetImport": self.get_new_array(dim_letters=("r", "t", "s", "d", "p")),
+                "DomesticInputManufacturing": self.get_aux_array(("r", "t", "s", "d", "p")),
+                "ImportNew": self.get_aux_array(("r", "t", "s", "d", "p")),
+                "ExportNew": self.get_aux_array(("r", "t", "s", "d", "p")),
+                "NetImport": self.get_aux_array(("r", "t", "s", "d", "p")),
             }
 
 
@@ -241,21 +362,17 @@ class PlasticsMFASystem(fd.MFASystem):
         # Note: 1) or 2) can be zero if the user only wants to use rates or absolute values.
 
         # Domestic input to manufacturing (primary + secondary)
-        aux["DomesticInputManufacturing"] = flw["Polymer market => PRIMARY Plastics manufacturing"] + flw["Polymer market => SECONDARY Plastics manufacturing"] # InputManufacturing_1_2
+        aux["DomesticInputManufacturing"][...] = flw["Polymer market => PRIMARY Plastics manufacturing"] + flw["Polymer market => SECONDARY Plastics manufacturing"] # InputManufacturing_1_2
         # Imports: absolute and via rates
-        flw["sysenv => Plastics manufacturing"][...] = prm["ImportNew"] + aux["DomesticInputManufacturing"] * prm["ImportRateNew"] # F_0_2_ImportNew
+        flw["sysenv => Plastics manufacturing"][...] = (prm["ImportRateNew"] * aux["DomesticInputManufacturing"] + prm["ImportNew"]).sum_to(flw["sysenv => Plastics manufacturing"].dims.letters) # F_0_2_ImportNew
         # Exports: absolute and via rates
-        flw["Plastics manufacturing => sysenv"][...] = aux["DomesticInputManufacturing"] * prm["ExportRateNew"] + prm["ExportNew"] # F_2_0_ExportNew
+        flw["Plastics manufacturing => sysenv"][...] = (prm["ExportRateNew"] * aux["DomesticInputManufacturing"] + prm["ExportNew"]).sum_to(flw["Plastics manufacturing => sysenv"].dims.letters) # F_2_0_ExportNew
         # Sum over all import and export regions to calculate TOTAL imports and exports and NET imports
         # ImportNew_0_2 = np.einsum('Rrtspe->rtspe', Plastics_MFA_System.FlowDict['F_0_2_ImportNew'].Values)
         # ExportNew_2_0 = np.einsum('rRtspe->rtspe', Plastics_MFA_System.FlowDict['F_2_0_ExportNew'].Values)
-        if not self.cfg.customization.prodcom:
-            aux["ImportNew"] = flw["sysenv => Plastics manufacturing"].sum_to(("r","t","s","p","e"))
-            aux["ExportNew"] = flw["Plastics manufacturing => sysenv"].sum_to(("r","t","s","p","e"))
-        else:
-            aux["ImportNew"] = flw["sysenv => Plastics manufacturing"].sum_to(("r","t","s","d","p"))
-            aux["ExportNew"] = flw["Plastics manufacturing => sysenv"].sum_to(("r","t","s","d","p"))
-        aux["NetImport"] = aux["ImportNew"] - aux["ExportNew"]
+        aux["ImportNew"][...] = flw["sysenv => Plastics manufacturing"]
+        aux["ExportNew"][...] = flw["Plastics manufacturing => sysenv"]
+        np.subtract(aux["ImportNew"].values, aux["ExportNew"].values, out=aux["NetImport"].values)
         # Mass balance equation for plastics manufacturing
         flw["Plastics manufacturing => Plastics market"][...] = aux["DomesticInputManufacturing"] + aux["NetImport"] # F_2_3_NewPlastics
 
@@ -264,15 +381,17 @@ class PlasticsMFASystem(fd.MFASystem):
 
         # F_3_4_NewPlastics
         if not self.cfg.customization.prodcom:
-            flw["Plastics market => End use stock"].values = np.einsum('rtspe,rRtsp->Rtspe',
+            flw["Plastics market => End use stock"].values = trade_einsum('rtspe,rRtsp->Rtspe',
                                                                 flw["Plastics manufacturing => Plastics market"].values,
-                                                                prm["MarketShare"].values)
+                                                                prm["MarketShare"])
         else:
-            flw["Plastics market => End use stock"].values = np.einsum('rtsdp,rRtsdp->Rtsdp',
+            flw["Plastics market => End use stock"].values = trade_einsum('rtsdp,rRtsdp->Rtsdp',
                                                                 flw["Plastics manufacturing => Plastics market"].values,
-                                                                prm["MarketShare"].values)
+                                                                prm["MarketShare"])
 
+        self.release_aux_arrays(aux)
 
+    @profiled()
     def compute_inflows_final_demand_driven(self, with_start_value_and_growth_rate: bool = False):
         """
         Compute flows from final consumption entering the stock upstream up to production (converter demand).
@@ -287,10 +406,10 @@ class PlasticsMFASystem(fd.MFASystem):
 
         # Define auxiliary flows for the MFA system in addition to the main flows defined in plastics_definition.py
         aux = {
-            "DomesticInputManufacturing": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-            "ImportNew": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-            "ExportNew": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-            "NetImport": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
+            "DomesticInputManufacturing": self.get_aux_array(("r", "t", "s", "p", "e")),
+            "ImportNew": self.get_aux_array(("r", "t", "s", "p", "e")),
+            "ExportNew": self.get_aux_array(("r", "t", "s", "p", "e")),
+            "NetImport": self.get_aux_array(("r", "t", "s", "p", "e")),
         }
 
         ### PLASTICS MARKET
@@ -306,9 +425,9 @@ class PlasticsMFASystem(fd.MFASystem):
         flw["Plastics market => End use stock"][...] = prm["FinalDemand"]
     
         # F_2_3_NewPlastics
-        flw["Plastics manufacturing => Plastics market"].values = np.einsum('rtspe,rRtsp->Rtspe',
+        flw["Plastics manufacturing => Plastics market"].values = trade_einsum('rtspe,rRtsp->Rtspe',
                                                                         flw["Plastics market => End use stock"].values,
-                                                                        prm["MarketShare"].values)
+                                                                        prm["MarketShare"])
 
         ### PLASTICS MANUFACTURING
         logging.info("mfa_system - PLASTICS MANUFACTURING")
@@ -316,14 +435,14 @@ class PlasticsMFASystem(fd.MFASystem):
         # Remove absolute import and export provided exogenously.
         # Note: not implementing rate of import and export as in production_driven.
         # Imports: absolute
-        flw["sysenv => Plastics manufacturing"][...] = prm["ImportNew"] # F_0_2_ImportNew
+        flw["sysenv => Plastics manufacturing"][...] = prm["ImportNew"].sum_to(flw["sysenv => Plastics manufacturing"].dims.letters) # F_0_2_ImportNew
         # Exports: absolute
-        flw["Plastics manufacturing => sysenv"][...] = prm["ExportNew"] # F_2_0_ExportNew
+        flw["Plastics manufacturing => sysenv"][...] = prm["ExportNew"].sum_to(flw["Plastics manufacturing => sysenv"].dims.letters) # F_2_0_ExportNew
 
         # Sum over all import and export regions to calculate TOTAL imports and exports and NET imports
-        aux["ImportNew"] = flw["sysenv => Plastics manufacturing"].sum_to(("r","t","s","p","e"))
-        aux["ExportNew"] = flw["Plastics manufacturing => sysenv"].sum_to(("r","t","s","p","e"))
-        aux["NetImport"] = aux["ImportNew"] - aux["ExportNew"]
+        aux["ImportNew"][...] = flw["sysenv => Plastics manufacturing"]
+        aux["ExportNew"][...] = flw["Plastics manufacturing => sysenv"]
+        np.subtract(aux["ImportNew"].values, aux["ExportNew"].values, out=aux["NetImport"].values)
 
         # Mass balance equation for plastics manufacturing
         aux["DomesticInputManufacturing"][...] = flw["Plastics manufacturing => Plastics market"][...] - aux["NetImport"] # F_2_3_NewPlastics
@@ -336,8 +455,11 @@ class PlasticsMFASystem(fd.MFASystem):
         flw["Polymer market => SECONDARY Plastics manufacturing"][...] = aux["DomesticInputManufacturing"] - flw["Polymer market => PRIMARY Plastics manufacturing"] # F_1_2_Recyclate
 
         flw["sysenv => Polymer market"][...] = aux["DomesticInputManufacturing"] # F_0_1_Domestic
+
+        self.release_aux_arrays(aux)
         
 
+    @profiled()
     def compute_stock(self):
         """
         Compute inflow-driven stock dynamics.
@@ -358,50 +480,125 @@ class PlasticsMFASystem(fd.MFASystem):
         logging.info("mfa_system - END USE STOCK")
 
         stk["End use stock"].inflow[...] = flw["Plastics market => End use stock"]
+        stk["End use stock"].survival_cutoff = self.cfg.customization.survival_cutoff
         stk["End use stock"].lifetime_model.set_prms(
             mean=self.parameters["Lifetime"],
             std=self.parameters["Lifetime"] * 0.3,
         )
-        stk["End use stock"].compute()
+        compute_inflow_driven_stock(stk["End use stock"])
 
 
+    @profiled()
     def compute_outflows(self):
         """
         Compute flows after leaving the stock.
+        All outflow computations are separable along the region axis. With the memory_budget_mb
+        config item, they are run on blocks of regions so that the auxiliary arrays and
+        temporaries of one block fit the budget; results are written into the full flows.
         """
         
         logging.info("mfa_system - compute_outflows")
 
         # Abbreviation for better readability
-        prm = self.parameters
         flw = self.flows
         stk = self.stocks
 
-        # Define auxiliary flows for the MFA system in addition to the main flows defined in plastics_definition.py
-        if not self.cfg.customization.prodcom:
-            aux = {
-                "DeprivedEOL": self.get_new_array(dim_letters=("t", "c", "r", "s", "p", "e")),
-                "CollectedWaste": self.get_new_array(dim_letters=("r", "t", "c", "s", "p", "e")),
-                "UtilisedWaste": self.get_new_array(dim_letters=("r", "t", "c", "s", "p", "e")),
-                "SortedWaste": self.get_new_array(dim_letters=("r", "t", "c", "s", "p", "w", "e")),
-                "SortedEOL_agg": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-                "SortedEOL_inclImports": self.get_new_array(dim_letters=("r", "t", "s", "p", "w", "e")),
-            }
-        else:
-            aux = {
-                "DeprivedEOL": self.get_new_array(dim_letters=("t", "c", "r", "s", "d", "p")),
-                "CollectedWaste": self.get_new_array(dim_letters=("r", "t", "c", "s", "d", "p")),
-                "UtilisedWaste": self.get_new_array(dim_letters=("r", "t", "c", "s", "d", "p")),
-                "SortedWaste": self.get_new_array(dim_letters=("r", "t", "c", "s", "d", "p", "w")),
-                "SortedEOL_agg": self.get_new_array(dim_letters=("r", "t", "s", "d", "p")),
-                "SortedEOL_inclImports": self.get_new_array(dim_letters=("r", "t", "s", "d", "p", "w")),
-            }
-
         ### EOL PLASTICS
         logging.info("mfa_system - EOL PLASTICS")
 
         #flw["End use stock => Waste collection"].values = stk["End use stock"]._outflow_by_cohort
-        flw["End use stock => Waste collection"].set_values(stk["End use stock"]._outflow_by_cohort)
+        flw["End use stock => Waste collection"].set_values(stk["End use stock"].get_outflow_by_cohort())
+
+        #waste_categories = self.dims.get_subset("w").dim_list[0].items
+        waste_categories = self.dims["w"].items
+        if self.cfg.customization.waste_not_for_recycling:
+            try:
+                waste_not_for_recycling_ix = [waste_categories.index(k) for k in self.cfg.customization.waste_not_for_recycling]
+                logging.debug(f"Waste types NOT for recycling: {str(self.cfg.customization.waste_not_for_recycling)}")
+                waste_for_recycling = set(waste_categories) - set(self.cfg.customization.waste_not_for_recycling)
+                logging.debug(f"Waste types FOR recycling: {str(waste_for_recycling)}")
+            except ValueError:
+                print('\nERROR: config Waste_Types_Not_For_Recycling does not match defined Classification Plastic_waste\n')
+                raise
+        else:
+            waste_not_for_recycling_ix = []
+            logging.warning('config: waste_not_for_recycling is empty! We assume all waste types are for recycling.')
+        for_recycling = np.ones(len(waste_categories), dtype=bool)
+        for_recycling[waste_not_for_recycling_ix] = False
+
+        region_blocks = self._outflow_region_blocks()
+        for block in region_blocks:
+            if len(region_blocks) > 1:
+                logging.info(f"mfa_system - outflows for regions {self.dims['r'].items[block]}")
+            self._compute_outflows_block(block, for_recycling)
+
+    def _outflow_aux_dims(self) -> dict:
+        """Dimensions of the auxiliary arrays of compute_outflows."""
+        if not self.cfg.customization.prodcom:
+            return {
+                "DeprivedEOL": ("t", "c", "r", "s", "p", "e"),
+                "CollectedWaste": ("r", "t", "c", "s", "p", "e"),
+                "UtilisedWaste": ("r", "t", "c", "s", "p", "e"),
+                "SortedWaste": ("r", "t", "c", "s", "p", "w", "e"),
+                "SortedEOL_agg": ("r", "t", "s", "p", "e"),
+                "SortedEOL_inclImports": ("r", "t", "s", "p", "w", "e"),
+            }
+        return {
+            "DeprivedEOL": ("t", "c", "r", "s", "d", "p"),
+            "CollectedWaste": ("r", "t", "c", "s", "d", "p"),
+            "UtilisedWaste": ("r", "t", "c", "s", "d", "p"),
+            "SortedWaste": ("r", "t", "c", "s", "d", "p", "w"),
+            "SortedEOL_agg": ("r", "t", "s", "d", "p"),
+            "SortedEOL_inclImports": ("r", "t", "s", "d", "p", "w"),
+        }
+
+    def _outflow_region_blocks(self) -> list:
+        """
+        Slices of the region axis processed together by compute_outflows.
+        A single block unless memory_budget_mb is set. The memory of one region is estimated as
+        its share of the auxiliary arrays plus two temporaries of the size of the largest one.
+        """
+        budget_mb = self.cfg.customization.memory_budget_mb
+        n_regions = len(self.dims["r"].items)
+        if budget_mb is None:
+            return [slice(None)]
+        aux_sizes = [self.dims.get_subset(dim_letters).total_size for dim_letters in self._outflow_aux_dims().values()]
+        region_mb = (sum(aux_sizes) + 2 * max(aux_sizes)) * np.dtype(get_dtype(self.cfg)).itemsize / n_regions / 1024**2
+        block_size = int(budget_mb // region_mb)
+        if block_size < 1:
+            logging.warning(f"memory_budget_mb={budget_mb} is below the {region_mb:.0f} MB needed per region, computing one region at a time.")
+            block_size = 1
+        block_size = min(block_size, n_regions)
+        logging.info(f"mfa_system - compute_outflows in blocks of {block_size} region(s) (about {block_size * region_mb:.0f} MB each)")
+        return [slice(start, min(start + block_size, n_regions)) for start in range(0, n_regions, block_size)]
+
+    def _block_dims(self, dims: fd.DimensionSet, block: slice) -> fd.DimensionSet:
+        r = self.dims["r"]
+        block_dim = fd.Dimension(name=r.name, letter="r", items=r.items[block], dtype=r.dtype)
+        return fd.DimensionSet(dim_list=[block_dim if d.letter == "r" else d for d in dims])
+
+    def _region_block(self, array: fd.FlodymArray, block: slice) -> fd.FlodymArray:
+        """View of array on a block of regions; assigning to its values writes into array."""
+        if block == slice(None) or "r" not in array.dims.letters:
+            return array
+        if isinstance(array, SparseTradeArray):
+            return array.take_block("r", block, self._block_dims(array.dims, block))
+        index = tuple(block if d.letter == "r" else slice(None) for d in array.dims)
+        return fd.FlodymArray(dims=self._block_dims(array.dims, block), values=array.values[index], name=array.name)
+
+    def _compute_outflows_block(self, block: slice, for_recycling: np.ndarray):
+        """Outflow computations of compute_outflows on one block of regions."""
+
+        # Abbreviation for better readability, restricted to the block of regions
+        prm = {name: self._region_block(p, block) for name, p in self.parameters.items()}
+        flw = {name: self._region_block(f, block) for name, f in self.flows.items()}
+        stock = self._region_block(self.stocks["End use stock"].stock, block)
+
+        # Define auxiliary flows for the MFA system in addition to the main flows defined in plastics_definition.py
+        aux = {
+            name: self.get_aux_array(self._block_dims(self.dims.get_subset(dim_letters), block))
+            for name, dim_letters in self._outflow_aux_dims().items()
+        }
 
         ### DEPRIVED VOLUMES
         logging.info("mfa_system - DEPRIVED VOLUMES")
@@ -410,9 +607,9 @@ class PlasticsMFASystem(fd.MFASystem):
         aux["DeprivedEOL"][...] = flw["End use stock => Waste collection"] * prm["DeprivedRate"]
         flw["End use stock => Waste collection"][...] = flw["End use stock => Waste collection"] - aux["DeprivedEOL"]
         # The deprived volumes are inserted back into the stock
-        logging.debug(f"stk['End use stock']._stock_by_cohort.shape: {stk['End use stock']._stock_by_cohort.shape}")
+        logging.debug(f"stk['End use stock'].stock.shape: {stock.shape}")
         logging.debug(f"aux['DeprivedEOL'].shape: {aux['DeprivedEOL'].shape}")
-        stk["End use stock"].stock[...] = stk["End use stock"].stock + aux["DeprivedEOL"]
+        stock[...] = stock + aux["DeprivedEOL"]
         # The following lines are not syntactically correct in flodym:
         #stk["End use stock"].stock.set_values(stk["End use stock"].stock.values + aux["DeprivedEOL"])
         #stk["End use stock"].stock.values[...] = stk["End use stock"].stock.values + aux["DeprivedEOL"]
@@ -438,35 +635,7 @@ class PlasticsMFASystem(fd.MFASystem):
         aux["SortedWaste"][...] = flw["Waste collection => Waste sorting"] * prm["SortingRate"]
         logging.debug(f"aux['SortedWaste'].shape: {aux['SortedWaste'].shape}")
 
-        flw["Waste sorting => Sorted waste market"].set_values(aux["SortedWaste"].values.copy())
-        flw["Waste sorting => sysenv"].set_values(aux["SortedWaste"].values.copy())
-
-        #waste_categories = self.dims.get_subset("w").dim_list[0].items
-        waste_categories = self.dims["w"].items
-        if self.cfg.customization.waste_not_for_recycling:
-            try:
-                waste_not_for_recycling_ix = [waste_categories.index(k) for k in self.cfg.customization.waste_not_for_recycling]
-                logging.debug(f"Waste types NOT for recycling: {str(self.cfg.customization.waste_not_for_recycling)}")
-                waste_for_recycling = set(waste_categories) - set(self.cfg.customization.waste_not_for_recycling)
-                logging.debug(f"Waste types FOR recycling: {str(waste_for_recycling)}")
-            except ValueError:
-                print('\nERROR: config Waste_Types_Not_For_Recycling does not match defined Classification Plastic_waste\n')
-                raise
-        else:
-            waste_not_for_recycling_ix = []
-            logging.warning('config: waste_not_for_recycling is empty! We assume all waste types are for recycling.')
-        
-        for w in np.arange(0, len(waste_categories)):
-            if not self.cfg.customization.prodcom:
-                if w in waste_not_for_recycling_ix:
-                    flw["Waste sorting => Sorted waste market"].values[:,:,:,:,:,w,:] = 0
-                else:
-                    flw["Waste sorting => sysenv"].values[:,:,:,:,:,w,:] = 0
-            else:
-                if w in waste_not_for_recycling_ix:
-                    flw["Waste sorting => Sorted waste market"].values[:,:,:,:,:,:,w] = 0
-                else:
-                    flw["Waste sorting => sysenv"].values[:,:,:,:,:,:,w] = 0
+        split_sorted_waste(aux["SortedWaste"], flw["Waste sorting => Sorted waste market"], flw["Waste sorting => sysenv"], for_recycling)
 
         ### SORTED WASTE MARKET
         logging.info("mfa_system - SORTED WASTE MARKET")
@@ -481,13 +650,13 @@ class PlasticsMFASystem(fd.MFASystem):
             dim_letters_wo_waste = ("r","t","s","d","p")
             dim_letters_waste = ("r","t","s","d","p","w")
 
-        aux["SortedEOL_agg"] = flw["Waste sorting => Sorted waste market"].sum_to(dim_letters_wo_waste)
-        flw["sysenv => Sorted waste market"][...] = aux["SortedEOL_agg"] * prm["ImportRateSortedWaste"]
+        aux["SortedEOL_agg"][...] = flw["Waste sorting => Sorted waste market"]
+        flw["sysenv => Sorted waste market"][...] = (prm["ImportRateSortedWaste"] * aux["SortedEOL_agg"]).sum_to(flw["sysenv => Sorted waste market"].dims.letters)
         aux["SortedEOL_inclImports"][...] = (flw["Waste sorting => Sorted waste market"].sum_to(dim_letters_waste)
                                                 + flw["sysenv => Sorted waste market"].sum_to(dim_letters_waste))
         # Export of sorted waste as export RATE
         # ExportRateSortedWaste gives which waste categories are exported (as a % of total SortedEOL_inclImports)
-        flw["Sorted waste market => sysenv"][...] = aux["SortedEOL_inclImports"] * prm["ExportRateSortedWaste"]
+        flw["Sorted waste market => sysenv"][...] = (prm["ExportRateSortedWaste"] * aux["SortedEOL_inclImports"]).sum_to(flw["Sorted waste market => sysenv"].dims.letters)
 
         # Net domestic input of sorted waste into recycling
         flw["Sorted waste market => Recycling"][...] = aux["SortedEOL_inclImports"] - flw["Sorted waste market => sysenv"].sum_to(dim_letters_waste)
@@ -501,8 +670,11 @@ class PlasticsMFASystem(fd.MFASystem):
         # Losses
         flw["Recycling => LOSSES sysenv"][...] = (flw["Sorted waste market => Recycling"].sum_to(dim_letters_wo_waste) 
                                                     - flw["Recycling => RECYCLATE sysenv"].sum_to(dim_letters_wo_waste))
+
+        self.release_aux_arrays(aux)
         
 
+    @profiled()
     def get_flows_as_dataframes(self, flow_names=[]):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         if not flow_names:
@@ -511,6 +683,7 @@ class PlasticsMFASystem(fd.MFASystem):
         dfs_index_reset = {flow_name: df.reset_index() for flow_name, df in dfs.items()}
         return dfs_index_reset
 
+    @profiled()
     def aggregate_flows_by_age_cohort(self, flows_dfs, flow_names=[]):
         """Aggregate flow DataFrames by age-cohort."""
         if flow_names:
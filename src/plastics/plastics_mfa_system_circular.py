@@ -1,22 +1,42 @@
 import flodym as fd
 import numpy as np
 import logging
-
-
-class CircularPlasticsMFASystem(fd.MFASystem):
-
+import os
+from src.common.profiling import profiled
+from src.common.aux_pool import AuxPoolMixin
+from src.common.parameter_cache import InterpolationCacheMixin
+from src.common.precision import PrecisionMixin, compute_inflow_driven_stock
+from src.common.reduced_rank import expand_parameters
+from src.common.sparse_trade import link_blocks, trade_einsum
+from src.common.time_grid import TimeGrid
+from src.plastics.circular_kernel import GRANULATE, MARKET_SHARE_SUBSCRIPTS, CircularLoop
+from src.plastics.plastics_mfa_system import split_sorted_waste
+
+
+# Parameters filled in over time by interpolate_parameters
+INTERPOLATED_PARAMETERS = [
+    'MarketShare',
+    'RecyclateShare', 'EoLCollectionRate', 'EoLUtilisationRate', 'DeprivedRate',
+    'ReuseRate', 'MaxReuseCycles', 'MaxMechanicalRecyclingCycles',
+    'SortingRate', 'ImportRateSortedWaste', 'ExportRateSortedWaste', 'RecyclingConversionRate',
+]
+
+
+class CircularPlasticsMFASystem(AuxPoolMixin, PrecisionMixin, InterpolationCacheMixin, fd.MFASystem):
+
+    @profiled()
     def compute(self):
         """
         Perform all computations for the MFA system in sequence.
         """
         if not self.cfg.customization.prodcom:
-            self.interpolate_parameters()
+            self.interpolate_parameters_cached(INTERPOLATED_PARAMETERS)
         if self.cfg.customization.model_driven == 'production':
             self.compute_inflows_production_driven()
         elif self.cfg.customization.model_driven == 'final_demand':
-            self.compute_circular_mfa()
+            self.compute_circular_mfa(resume_from=self.cfg.customization.resume_from)
         elif self.cfg.customization.model_driven == 'final_demand_with_start_value_and_growth_rate':
-            self.compute_circular_mfa(with_start_value_and_growth_rate=True)
+            self.compute_circular_mfa(with_start_value_and_growth_rate=True, resume_from=self.cfg.customization.resume_from)
         else:
             raise ValueError(f"Config item model_driven has invalid value: {self.cfg.model_driven}. Choose 'production', 'final_demand', or 'final_demand_with_start_value_and_growth_rate'.")
         # self.compute_stock()
@@ -32,6 +52,7 @@ class CircularPlasticsMFASystem(fd.MFASystem):
         except ValueError:
             return None, None
 
+    @profiled()
     def interpolate_parameters(self):
         """
         Interpolate parameters to the model time step.
@@ -59,16 +80,16 @@ class CircularPlasticsMFASystem(fd.MFASystem):
         for param in ['MarketShare']:#['ImportRateNew', 'ExportRateNew', 'MarketShare']:
             
             logging.info('Interpolating parameter ' + param)
-            for r in np.arange(0,Nr):
-                for rr in np.arange(0,Nr):
-                    for s in np.arange(0,Ns):
-                        for p in np.arange(0,Np):
+            # one block per region pair (only the pairs with trade if stored sparse)
+            for block in link_blocks(prm[param]):
+                for s in np.arange(0,Ns):
+                    for p in np.arange(0,Np):
 
-                            xp,x = self._prepare_interpolate(prm[param].values[r,rr,:,s,p])                    
-                            if xp is not None:
-                                fp = prm[param].values[r,rr,xp,s,p]
-                                yp = np.interp(x, xp, fp)
-                                prm[param].values[r,rr,x,s,p] = yp
+                        xp,x = self._prepare_interpolate(block[:,s,p])
+                        if xp is not None:
+                            fp = block[xp,s,p]
+                            yp = np.interp(x, xp, fp)
+                            block[x,s,p] = yp
 
         # ImportUsed, ExportUsed, ImportRateUsed, ExportRateUsed
         # Index: rrtcsp
@@ -114,17 +135,16 @@ class CircularPlasticsMFASystem(fd.MFASystem):
             
             logging.info('Interpolating parameter ' + param)
 
-            for r in np.arange(0,Nr):
-                for rr in np.arange(0,Nr):
-                    for s in np.arange(0,Ns):
-                        for p in np.arange(0,Np):
-                            for w in np.arange(0,Nw):
-
-                                xp,x = self._prepare_interpolate(prm[param].values[r,rr,:,s,p,w])                    
-                                if xp is not None:
-                                    fp = prm[param].values[r,rr,xp,s,p,w]
-                                    yp = np.interp(x, xp, fp)
-                                    prm[param].values[r,rr,x,s,p,w] = yp
+            for block in link_blocks(prm[param]):
+                for s in np.arange(0,Ns):
+                    for p in np.arange(0,Np):
+                        for w in np.arange(0,Nw):
+
+                            xp,x = self._prepare_interpolate(block[:,s,p,w])
+                            if xp is not None:
+                                fp = block[xp,s,p,w]
+                                yp = np.interp(x, xp, fp)
+                                block[x,s,p,w] = yp
                             
         # RecyclingLossRate
         # Index: rtpw
@@ -186,9 +206,12 @@ class CircularPlasticsMFASystem(fd.MFASystem):
         return parameter
 
 
-    def compute_circular_mfa(self, with_start_value_and_growth_rate: bool = False):
+    @profiled()
+    def compute_circular_mfa(self, with_start_value_and_growth_rate: bool = False, resume_from: str = None):
         """
         Compute the circular MFA of plastics, i.e. explicitely accounting for recycling loops and reuse cycles.
+        With resume_from (a checkpoint, or a folder of checkpoints to take the latest one from), the
+        time loop continues after the time steps of the checkpoint.
         """
 
         logging.info("mfa_system - compute_circular_mfa")
@@ -201,31 +224,21 @@ class CircularPlasticsMFASystem(fd.MFASystem):
         # Define auxiliary flows for the MFA system in addition to the main flows defined in plastics_definition.py
         aux = {
             # Reuse
-            "ReuseRate": self.get_new_array(dim_letters=("r", "t", "s", "p", "z")),
-            # from final demand back to production
-            "DomesticInputManufacturing": self.get_new_array(dim_letters=("r", "t", "s", "p", "e", "x")),
-            "ImportNew": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-            "ExportNew": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-            "NetImport": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
+            "ReuseRate": self.get_aux_array(("r", "t", "s", "p", "z")),
             # Stock
-            "StockInflow": self.get_new_array(dim_letters=("r", "t", "s", "p", "e", "x", "z")),
+            "StockInflow": self.get_aux_array(("r", "t", "s", "p", "e", "x", "z")),
             # EOL plastics
-            "CollectedWaste": self.get_new_array(dim_letters=("r", "t", "s", "p", "e", "x", "z")),
-            "UtilisedWaste": self.get_new_array(dim_letters=("r", "t", "s", "p", "e", "x", "z")),
-            "SortedWaste": self.get_new_array(dim_letters=("r", "t", "s", "p", "w", "e", "x", "z")),
-            "SortedEOL_agg": self.get_new_array(dim_letters=("r", "t", "s", "p", "e", "x", "z")),
-            "SortedEOL_inclImports": self.get_new_array(dim_letters=("r", "t", "s", "p", "w", "e", "x", "z")),
+            "CollectedWaste": self.get_aux_array(("r", "t", "s", "p", "e", "x", "z")),
+            "UtilisedWaste": self.get_aux_array(("r", "t", "s", "p", "e", "x", "z")),
+            "SortedWaste": self.get_aux_array(("r", "t", "s", "p", "w", "e", "x", "z")),
             # Reuse
-            "ReusedPlastics": self.get_new_array(dim_letters=("r", "t", "s", "p", "e", "x", "z")),
+            "ReusedPlastics": self.get_aux_array(("r", "t", "s", "p", "e", "x", "z")),
             # Recycling
-            "RecyclingConversionRate": self.get_new_array(dim_letters=("r", "t", "s", "p", "w", "m", "x")),
-            "PrimaryContent": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
-            "RecycledContent": self.get_new_array(dim_letters=("r", "t", "s", "p", "e")),
+            "RecyclingConversionRate": self.get_aux_array(("r", "t", "s", "p", "w", "m", "x")),
+            "PrimaryContent": self.get_aux_array(("r", "t", "s", "p", "e")),
+            "RecycledContent": self.get_aux_array(("r", "t", "s", "p", "e")),
     }
 
-        # TMP!!!
-        time_step = 0.25
-
         Nr = len(self.dims["r"].items)
         Nt = len(self.dims["t"].items)
         Ns = len(self.dims["s"].items)
@@ -266,260 +279,127 @@ class CircularPlasticsMFASystem(fd.MFASystem):
                                     else:
                                         aux["RecyclingConversionRate"].values[r,t,s,p,w,m,x] = 0.0
 
+        #waste_categories = self.dims.get_subset("w").dim_list[0].items
+        waste_categories = self.dims["w"].items
+        if self.cfg.customization.waste_not_for_recycling:
+            try:
+                waste_not_for_recycling_ix = [waste_categories.index(k) for k in self.cfg.customization.waste_not_for_recycling]
+            except ValueError:
+                print('\nERROR: config Waste_Types_Not_For_Recycling does not match defined Classification Plastic_waste\n')
+                raise
+        else:
+            waste_not_for_recycling_ix = []
+            #logging.warning('config: waste_not_for_recycling is empty! We assume all waste types are for recycling.')
+        for_recycling = np.ones(len(waste_categories), dtype=bool)
+        for_recycling[waste_not_for_recycling_ix] = False
+
 ###############################################################################################
 
         ### REUSE & RECYCLING CYCLES
         logging.info("mfa_system - REUSE & RECYCLING CYCLES")
 
-        for t in self.dims["t"].items:
-            logging.info(f"Computing CE for year {t}.")
-
-        ### FINAL DEMAND
-
-            if t == min(self.dims["t"].items): # i.e. first year of the model
-                # Initial FinalDemand is assumed to be in first reuse cycle (i.e. not yet reused)
-                # F_3_4_NewPlastics
-                if with_start_value_and_growth_rate:
-                    # Total final demand
-                    if "FinalDemand" not in prm:
-                        self.parameters["FinalDemand"] = self.get_new_array(dim_letters=("r","t","s","p","e"))
-                        prm["FinalDemand"][{'t': t}] = prm["start_value"][{'t': t}]
-                else:
-                    #logging.info("Using FinalDemand provided as exogenous parameter.")
-                    pass
-
-                # In the first year, final demand is met entirely with new/recycled plastics, and there are no reused plastics from previous cycles yet.
-                flw["Plastics market => End use stock"][{'t': t, 'x': 0, 'z': 0}] = prm["FinalDemand"][{'t': t}]
-                flw["Reuse => End use stock"][{'t': t}] = 0
-
-            else: # t > min_t
-                # For subsequent years, the inflow to the stock is made of new plastics and reused plastics from previous cycles
-                if with_start_value_and_growth_rate:
-                    # Total final demand 
-                    prm["FinalDemand"][{'t': t}] = prm["FinalDemand"][{'t': t - time_step}] * (1 + prm["growth_rate"][{'t': t}])
-                else:
-                    #logging.info("Using FinalDemand provided as exogenous parameter.")
-                    pass
-
-                # Final demand
-                # Reused plastics, z>0
-                # Increment cycle counter for reused plastics
-                # Note: for x>MaxReuseCycles, the ReuseRate is set to 0, so "Waste collection => Reuse" is 0.
-                #for z in range(len(self.dims["z"].items) - 1):
-                for z in np.arange(0,Nz-1):
-                    flw["Reuse => End use stock"][{'t': t, 'z': z+1}] = flw["Waste collection => Reuse"][{'t': t - time_step, 'z': z}]
-                flw["Reuse => End use stock"][{'t': t, 'z': 0}] = 0
-
-
-                # Mechanically recycled plastics x>0
-                # Increment cycle counter for mechanically recycled plastics
-                # Note: for x>MaxMechanicalRecyclingCycles, the RecyclingConversionRate is set to 0, so "Recycling => Polymer market" is 0.
-                #for x in range(len(self.dims["x"].items) - 1):
-                for x in np.arange(0,Nx-1):
-                    flw["Recyclate market => Polymer market"][{'t': t, 'x': x+1}] = flw["Recycling => Recyclate market"][{'t': t - time_step, 'x': x}]
-                flw["Recyclate market => Polymer market"][{'t': t, 'x': 0}] = 0
-
-                # Final demand
-                # Assumption: final demand and imports have the same rate of recycled content and the same cycle distribution as "Recycling => Polymer market".
-                # Assumption: reused materials replace first use material in the same recycled cycle (i.e. same x).
-                for r in self.dims["r"].items:
-                    for s in self.dims["s"].items:
-                        for p in self.dims["p"].items:
-                            for e in self.dims["e"].items:
-
-                                flw["Plastics market => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': 0, 'z': 0}] = (
-                                    prm["FinalDemand"][{'r': r, 't': t, 's': s, 'p': p}] * (1 - prm["RecyclateShare"][{'r': r, 't': t, 's': s, 'p': p}]) 
-                                    - flw["Reuse => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': 0}].sum_over(('z'))
-                                )
-                                # if flw["Plastics market => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': 0, 'z': 0}].values < 0:
-                                #     flw["Plastics market => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': 0, 'z': 0}] = 0
-
-                                for x in np.arange(1,Nx):
-                                    if flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}].sum_over('x').values != 0:
-                                        ShareCycle = flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': x}] / flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}].sum_over('x')
-                                        flw["Plastics market => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': x, 'z': 0}] = (
-                                            prm["FinalDemand"][{'r': r, 't': t, 's': s, 'p': p}] 
-                                            * prm["RecyclateShare"][{'r': r, 't': t, 's': s, 'p': p}] 
-                                            * ShareCycle 
-                                            - flw["Reuse => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': x}].sum_over(('z'))
-                                        )
-                                    else:
-                                        flw["Plastics market => End use stock"][{'r': r, 't': t, 's': s, 'p': p, 'e': e, 'x': x, 'z': 0}] = 0
-
+        # Time steps are addressed by their position, e.g. the previous time step of position i is i - 1
+        time = TimeGrid(self.dims["t"].items, time_step=self.cfg.customization.time_step)
+
+        if with_start_value_and_growth_rate and "FinalDemand" not in prm:
+            # Total final demand, grown from the start value in the time loop
+            self.parameters["FinalDemand"] = self.get_new_array(dim_letters=("r","t","s","p","e"))
+            prm["FinalDemand"].values[time.index(prm["FinalDemand"], 0)] = prm["start_value"].values[time.index(prm["start_value"], 0)]
+        elif with_start_value_and_growth_rate:
+            # grown in place by the time loop
+            expand_parameters(self, ["FinalDemand"])
+
+        stk["End use stock"].survival_cutoff = self.cfg.customization.survival_cutoff
+        stk["End use stock"].lifetime_model.set_prms(
+            mean=self.parameters["Lifetime"],
+            #std=self.parameters["Lifetime"] * 0.3,
+        )
+
+        # Each time step only depends on the previous ones, so the time loop (see circular_kernel.py)
+        # computes the values at one time step at a time: final demand by reuse and recycling cycle,
+        # upstream flows to production, polymer market, stock outflow, waste collection and reuse,
+        # sorting and recycling, with the reused and recycled plastics entering the next cycles in
+        # the following time step.
+        # Note: for z>MaxReuseCycles, the ReuseRate is set to 0, so "Waste collection => Reuse" is 0.
+        # Note: for x>MaxMechanicalRecyclingCycles, the RecyclingConversionRate is set to 0, so "Recycling => Polymer market" is 0.
+        loop = CircularLoop(self, aux, time, for_recycling, grow=with_start_value_and_growth_rate,
+                            use_numba=self.cfg.customization.numba)
+        start = loop.resume(resume_from) if resume_from is not None else 0
+        customization = self.cfg.customization
+        checkpoint_path = customization.checkpoint_path or os.path.join(self.cfg.output_path, "checkpoints")
+        loop.run(start, checkpoint_every=customization.checkpoint_every, checkpoint_path=checkpoint_path)
 
 ###############################################################################################
-            ### UPSTREAM FLOWS TO PRODUCTION (CONVERTER DEMAND) 
-            # Compute flows from final consumption entering the stock upstream up to production (converter demand).
-
-            # F_2_3_NewPlastics
-            # Note: "Plastics market => End use stock" is indexed with "z" but only has z=0 for new plastics, so we eliminate this dimension here
-            flw["Plastics manufacturing => Plastics market"].values = np.einsum('rtspexz,rRtsp->Rtspex',
-                                                                            flw["Plastics market => End use stock"].values,
-                                                                            prm["MarketShare"].values)
-
-            ### PLASTICS MANUFACTURING
-            #logging.info("mfa_system - PLASTICS MANUFACTURING")
-
-            # Remove absolute import and export provided exogenously.
-            # Note: not implementing rate of import and export as in production_driven.
-            # Imports: absolute
-            # flw["sysenv => Plastics manufacturing"][...] = prm["ImportNew"] # F_0_2_ImportNew
-            # # Exports: absolute
-            # flw["Plastics manufacturing => sysenv"][...] = prm["ExportNew"] # F_2_0_ExportNew
-
-            # Sum over all import and export regions to calculate TOTAL imports and exports and NET imports
-            # aux["ImportNew"][...] = flw["sysenv => Plastics manufacturing"].sum_to(("r","t","s","p","e"))
-            # aux["ExportNew"][...] = flw["Plastics manufacturing => sysenv"].sum_to(("r","t","s","p","e"))
-            # aux["NetImport"][...] = aux["ImportNew"] - aux["ExportNew"]
-
-            ### POLYMER MARKET
-            #logging.info("mfa_system - POLYMER MARKET")
-
-            if t == min(self.dims["t"].items): # i.e. first year of the model
-
-                #flw["Polymer market => PRIMARY Plastics manufacturing"][{'t': t, 'x': 0}] = flw["Plastics manufacturing => Plastics market"][{'t': t}].sum_over('x') + aux["NetImport"][{'t': t}] # F_1_2_Primary
-                flw["Polymer market => PRIMARY Plastics manufacturing"][{'t': t, 'x': 0}] = flw["Plastics manufacturing => Plastics market"][{'t': t}].sum_over('x') # F_1_2_Primary
-                flw["Polymer market => SECONDARY Plastics manufacturing"][{'t': t}] = 0 # F_1_2_Recyclate
-
-            else: # t > min_t
-
-                # Primary vs. recycled content in plastics put to market
-                aux["PrimaryContent"][{'t': t}] = flw["Plastics manufacturing => Plastics market"][{'t': t, 'x': 0}]
-                aux["RecycledContent"][{'t': t}] = flw["Plastics manufacturing => Plastics market"][{'t': t}].sum_over('x') - aux["PrimaryContent"][{'t': t}]
-
-                # # Assumption: net imports have the same recycled content and cycle distribution as domestic plastics.
-                # ShareCycle = {}
-                # for x in np.arange(0,Nx):
-                #     ShareCycle['x'] = flw["Plastics manufacturing => Plastics market"][{'t': t, 'x': x}] / flw["Plastics manufacturing => Plastics market"][{'t': t}].sum_over('x')
-
-                # Primary polymers cover the converter demand not required to be met with recycled content
-                flw["Polymer market => PRIMARY Plastics manufacturing"][{'t': t, 'x': 0}] = aux["PrimaryContent"][{'t': t}]
-                #flw["Polymer market => PRIMARY Plastics manufacturing"][{'t': t, 'x': 0}] = aux["PrimaryContent"][{'t': t}] - aux["NetImport"][{'t': t}] * (1 - prm["RecyclateShare"][{'t': t}])
-
-                for r in self.dims["r"].items:
-                    for s in self.dims["s"].items:
-                        for p in self.dims["p"].items:
-                            for e in self.dims["e"].items:
-                                                                
-                                # RatioRecycledToRecyclate > 1
-                                # means recycled content quotas exceed secondary production capacity 
-                                # thus all mechanically recycled plastics are used domestically and the remaining demand for recycled content is imported ("Polymer market => RECYCLATE sysenv" < 0)
-                                
-                                # RatioRecycledToRecyclate < 1
-                                # means recycled content quotas can be met with domestic mechanically recycled plastics, 
-                                # and the excess mechanically recycled plastics are exported ("Polymer market => RECYCLATE sysenv" > 0)
-                                
-                                if flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}].sum_over('x').values != 0:
-                                    RatioRecycledToRecyclate = aux["RecycledContent"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}] / flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}].sum_over('x')
-                                else:
-                                    RatioRecycledToRecyclate = 0
-                                flw["Polymer market => SECONDARY Plastics manufacturing"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}] = flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}] * RatioRecycledToRecyclate
-                                flw["Polymer market => RECYCLATE sysenv"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}] = flw["Recyclate market => Polymer market"][{'r': r, 't': t, 's': s, 'p': p, 'e': e}] * (1 - RatioRecycledToRecyclate)
 
-###############################################################################################
+        ### WHOLE ARRAYS
+        # The stock, and the flows which the time loop only computed at each time step, for all time steps at once.
 
-            ### END USE STOCK
-            #logging.info("mfa_system - END USE STOCK")
+        # F_2_3_NewPlastics
+        # Note: "Plastics market => End use stock" is indexed with "z" but only has z=0 for new plastics, so we eliminate this dimension here
+        flw["Plastics manufacturing => Plastics market"].values = trade_einsum(MARKET_SHARE_SUBSCRIPTS,
+                                                                        flw["Plastics market => End use stock"].values,
+                                                                        prm["MarketShare"])
 
-            aux["StockInflow"][...] = flw["Plastics market => End use stock"][...] + flw["Reuse => End use stock"][...]
-            
-            stk["End use stock"].inflow[...] = aux["StockInflow"]
-            stk["End use stock"].lifetime_model.set_prms(
-                mean=self.parameters["Lifetime"],
-                #std=self.parameters["Lifetime"] * 0.3,
-            )
-            stk["End use stock"].compute()
+        ### END USE STOCK
+        aux["StockInflow"][...] = flw["Plastics market => End use stock"][...] + flw["Reuse => End use stock"][...]
+        stk["End use stock"].inflow[...] = aux["StockInflow"]
+        compute_inflow_driven_stock(stk["End use stock"])
 
-###############################################################################################
+        ### EOL PLASTICS
+        flw["End use stock => Waste collection"][...] = stk["End use stock"].outflow
 
-            ### EOL PLASTICS
-            #logging.info("mfa_system - EOL PLASTICS")
+        ### WASTE COLLECTION & UTILISATION
+        aux["CollectedWaste"][...] = flw["End use stock => Waste collection"] * prm["EoLCollectionRate"]
+        aux["UtilisedWaste"][...] = aux["CollectedWaste"] * prm["EoLUtilisationRate"]
 
-            #flw["End use stock => Waste collection"].set_values(stk["End use stock"]._outflow_by_cohort)
-            flw["End use stock => Waste collection"][...] = stk["End use stock"].outflow
-            
-            ### WASTE COLLECTION & UTILISATION
-            #logging.info("mfa_system - WASTE COLLECTION & UTILISATION")
+        #flw["Waste collection => LITTERING sysenv"][...] = (flw["End use stock => Waste collection"] - aux["CollectedWaste"])
+        #flw["Waste collection => DEFAULT TREATMENT sysenv"][...] = (aux["CollectedWaste"] - aux["UtilisedWaste"])
 
-            aux["CollectedWaste"][...] = flw["End use stock => Waste collection"] * prm["EoLCollectionRate"]
-            aux["UtilisedWaste"][...] = aux["CollectedWaste"] * prm["EoLUtilisationRate"]
+        ### WASTE SORTING
+        aux["SortedWaste"][...] = flw["Waste collection => Waste sorting"] * prm["SortingRate"]
 
-            #flw["Waste collection => LITTERING sysenv"][...] = (flw["End use stock => Waste collection"] - aux["CollectedWaste"])
-            #flw["Waste collection => DEFAULT TREATMENT sysenv"][...] = (aux["CollectedWaste"] - aux["UtilisedWaste"])
+        split_sorted_waste(aux["SortedWaste"], flw["Waste sorting => Sorted waste market"], flw["Waste sorting => sysenv"], for_recycling)
 
-            flw["Waste collection => Reuse"][{'t': t}] = aux["UtilisedWaste"][{'t': t}] * aux["ReuseRate"][{'t': t}]
-            aux["ReusedPlastics"][{'t': t}] = aux["UtilisedWaste"][{'t': t}] * aux["ReuseRate"][{'t': t}] # incl. "c" dimension for subtracting from collected waste
-            flw["Waste collection => Waste sorting"][{'t': t}] = aux["UtilisedWaste"][{'t': t}] - aux["ReusedPlastics"][{'t': t}]
+        ### SORTED WASTE MARKET
 
-            ### WASTE SORTING
-            #logging.info("mfa_system - WASTE SORTING")
+        # # Import of sorted waste as import RATE
+        # # ImportRateSortedWaste gives which waste categories are imported (as a % of total SortedEOL)
+        # # Sum all age-cohorts and waste categories
+        dim_letters_wo_waste = ("r","t","s","p","e","x")
+        dim_letters_waste = ("r","t","s","p","w","e","x")
 
-            aux["SortedWaste"][...] = flw["Waste collection => Waste sorting"] * prm["SortingRate"]
+        # aux["SortedEOL_agg"] = flw["Waste sorting => Sorted waste market"].sum_to(dim_letters_wo_waste)
+        # flw["sysenv => Sorted waste market"][...] = aux["SortedEOL_agg"] * prm["ImportRateSortedWaste"]
+        # aux["SortedEOL_inclImports"][...] = (flw["Waste sorting => Sorted waste market"].sum_to(dim_letters_waste)
+        #                                         + flw["sysenv => Sorted waste market"].sum_to(dim_letters_waste))
+        # # Export of sorted waste as export RATE
+        # # ExportRateSortedWaste gives which waste categories are exported (as a % of total SortedEOL_inclImports)
+        # flw["Sorted waste market => sysenv"][...] = aux["SortedEOL_inclImports"] * prm["ExportRateSortedWaste"]
 
-            flw["Waste sorting => Sorted waste market"].set_values(aux["SortedWaste"].values.copy())
-            flw["Waste sorting => sysenv"].set_values(aux["SortedWaste"].values.copy())
+        # Net domestic input of sorted waste into recycling
+        # flw["Sorted waste market => Recycling"][...] = aux["SortedEOL_inclImports"] - flw["Sorted waste market => sysenv"].sum_to(dim_letters_waste)
+        flw["Sorted waste market => Recycling"][...] = flw["Waste sorting => Sorted waste market"].sum_over("z")
 
-            #waste_categories = self.dims.get_subset("w").dim_list[0].items
-            waste_categories = self.dims["w"].items
-            if self.cfg.customization.waste_not_for_recycling:
-                try:
-                    waste_not_for_recycling_ix = [waste_categories.index(k) for k in self.cfg.customization.waste_not_for_recycling]
-                    waste_for_recycling = set(waste_categories) - set(self.cfg.customization.waste_not_for_recycling)
-                except ValueError:
-                    print('\nERROR: config Waste_Types_Not_For_Recycling does not match defined Classification Plastic_waste\n')
-                    raise
-            else:
-                waste_not_for_recycling_ix = []
-                #logging.warning('config: waste_not_for_recycling is empty! We assume all waste types are for recycling.')
-            
-            for w in np.arange(0, len(waste_categories)):
-                if w in waste_not_for_recycling_ix:
-                    flw["Waste sorting => Sorted waste market"].values[:,:,:,:,:,w,:,:] = 0
-                else:
-                    flw["Waste sorting => sysenv"].values[:,:,:,:,:,w,:,:] = 0
-
-
-            ### SORTED WASTE MARKET
-            #logging.info("mfa_system - SORTED WASTE MARKET")
-
-            # # Import of sorted waste as import RATE
-            # # ImportRateSortedWaste gives which waste categories are imported (as a % of total SortedEOL)
-            # # Sum all age-cohorts and waste categories
-            dim_letters_wo_waste = ("r","t","s","p","e","x")
-            dim_letters_waste = ("r","t","s","p","w","e","x")
-
-            # aux["SortedEOL_agg"] = flw["Waste sorting => Sorted waste market"].sum_to(dim_letters_wo_waste)
-            # flw["sysenv => Sorted waste market"][...] = aux["SortedEOL_agg"] * prm["ImportRateSortedWaste"]
-            # aux["SortedEOL_inclImports"][...] = (flw["Waste sorting => Sorted waste market"].sum_to(dim_letters_waste)
-            #                                         + flw["sysenv => Sorted waste market"].sum_to(dim_letters_waste))
-            # # Export of sorted waste as export RATE
-            # # ExportRateSortedWaste gives which waste categories are exported (as a % of total SortedEOL_inclImports)
-            # flw["Sorted waste market => sysenv"][...] = aux["SortedEOL_inclImports"] * prm["ExportRateSortedWaste"]
-
-            # Net domestic input of sorted waste into recycling
-            # flw["Sorted waste market => Recycling"][...] = aux["SortedEOL_inclImports"] - flw["Sorted waste market => sysenv"].sum_to(dim_letters_waste)
-            flw["Sorted waste market => Recycling"][...] = flw["Waste sorting => Sorted waste market"].sum_over("z")
-
-###############################################################################################
+        ### RECYCLING
 
-            ### RECYCLING
-            #logging.info("mfa_system - RECYCLING")
+        # Recycled plastics
+        flw["Recycling => NON-MECH sysenv"][...] = flw["Sorted waste market => Recycling"] * aux["RecyclingConversionRate"]
+        # Losses
+        flw["Recycling => LOSSES sysenv"][...] = (flw["Sorted waste market => Recycling"].sum_to(dim_letters_wo_waste)
+                                                    - flw["Recycling => NON-MECH sysenv"].sum_to(dim_letters_wo_waste))
+        # Mechanical recycling
+        w_type = "Mechanical recycling"
+        m_type = GRANULATE
+        flw["Recycling => Recyclate market"][...] = flw["Recycling => NON-MECH sysenv"][{'m': m_type}]
+        flw["Recycling => NON-MECH sysenv"][{'m': m_type}] = 0 # To respect mass balance, as mech. recycled polymers are sent back to "Polymer market"
 
-            # Recycled plastics
-            flw["Recycling => NON-MECH sysenv"][...] = flw["Sorted waste market => Recycling"] * aux["RecyclingConversionRate"]
-            # Losses
-            flw["Recycling => LOSSES sysenv"][...] = (flw["Sorted waste market => Recycling"].sum_to(dim_letters_wo_waste) 
-                                                        - flw["Recycling => NON-MECH sysenv"].sum_to(dim_letters_wo_waste))
-            # Mechanical recycling
-            w_type = "Mechanical recycling"
-            m_type = "Granulate"
-            flw["Recycling => Recyclate market"][...] = flw["Recycling => NON-MECH sysenv"][{'m': m_type}]
-            flw["Recycling => NON-MECH sysenv"][{'m': m_type}] = 0 # To respect mass balance, as mech. recycled polymers are sent back to "Polymer market"
+        self.release_aux_arrays(aux)
 
 
 ###############################################################################################
 ###############################################################################################
 
+    @profiled()
     def get_flows_as_dataframes(self, flow_names=[]):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         if not flow_names:
@@ -528,6 +408,7 @@ class CircularPlasticsMFASystem(fd.MFASystem):
         dfs_index_reset = {flow_name: df.reset_index() for flow_name, df in dfs.items()}
         return dfs_index_reset
 
+    @profiled()
     def aggregate_flows_by_age_cohort(self, flows_dfs, flow_names=[]):
         """Aggregate flow DataFrames by age-cohort."""
         if flow_names:
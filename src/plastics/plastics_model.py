@@ -2,6 +2,12 @@ import os
 import logging
 
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.precision import cast_mfa_arrays, get_dtype
+from src.common.sparse_trade import sparsify_trade_parameters
+from src.common.reduced_rank import reduce_parameters
+from src.common.input_cache import load_mfa_from_csv
+from src.common.parameter_cache import export_parameter_csv
 from .plastics_mfa_system import PlasticsMFASystem
 from .plastics_mfa_system_circular import CircularPlasticsMFASystem
 from .plastics_export import PlasticsDataExporter
@@ -30,6 +36,7 @@ class PlasticsModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
 
         dimension_map = {
@@ -73,7 +80,8 @@ class PlasticsModel:
 
         if not self.cfg.customization.circular:
             logging.info(f"model - Initializing PlasticsMFASystem.from_csv")
-            self.mfa = PlasticsMFASystem.from_csv(
+            self.mfa = load_mfa_from_csv(
+                PlasticsMFASystem,
                 definition=self.definition,
                 dimension_files=dimension_files,
                 parameter_files=parameter_files,
@@ -83,7 +91,8 @@ class PlasticsModel:
             self.mfa.cfg = self.cfg
         else:
             logging.info(f"model - Initializing CircularPlasticsMFASystem.from_csv")
-            self.mfa = CircularPlasticsMFASystem.from_csv(
+            self.mfa = load_mfa_from_csv(
+                CircularPlasticsMFASystem,
                 definition=self.definition,
                 dimension_files=dimension_files,
                 parameter_files=parameter_files,
@@ -91,7 +100,13 @@ class PlasticsModel:
                 allow_extra_parameter_values=True,
             )
             self.mfa.cfg = self.cfg
+        cast_mfa_arrays(self.mfa, get_dtype(self.cfg))
+        if self.cfg.customization.sparse_trade:
+            sparsify_trade_parameters(self.mfa)
+        if self.cfg.reduced_parameters:
+            reduce_parameters(self.mfa)
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         logging.info("Model computations completed.")
@@ -99,9 +114,8 @@ class PlasticsModel:
         if self.cfg.do_export["params"]:
             logging.info("Exporting parameters to csv.")
             os.makedirs(os.path.join(self.data_writer.output_path, "parameters"), exist_ok=True)
-            for prm_name, prm_fd in self.mfa.parameters.items():
-                prm_df = prm_fd.to_df(index=False, sparse=True)
-                prm_df.to_csv(os.path.join(self.data_writer.output_path, "parameters", f"{prm_name}.csv"), index=False)
+            for prm_name in self.mfa.parameters:
+                export_parameter_csv(self.mfa, prm_name, os.path.join(self.data_writer.output_path, "parameters", f"{prm_name}.csv"))
 
         if self.cfg.do_export["csv"]:
             logging.info("Exporting the MFA (all flows and stocks) to csv.")
@@ -1,10 +1,9 @@
-from flask import logging
-import plotly.express as px
 import pandas as pd
 import flodym as fd
 from typing import TYPE_CHECKING
 
 from src.common.custom_export import CustomDataExporter
+from src.common.profiling import profiled
 
 if TYPE_CHECKING:
     from src.steel.steel_model import SteelModel
@@ -17,6 +16,7 @@ class SteelDataExporter(CustomDataExporter):
 
     }
 
+    @profiled()
     def visualize_results(self, model: "SteelModel", flows_dfs: dict[str, pd.DataFrame], scenario: str = ""):
         if self.cfg.inflow["do_visualize"]:
             print("Inflow visualization not implemented yet.")
@@ -34,6 +34,7 @@ class SteelDataExporter(CustomDataExporter):
     ## Build a dashboard with Dash
 
     def visualize_flow(self, df: pd.DataFrame, scenario: str = "", region: str = "EU27+1", select_col: str = "sector", label_type: str = "production"):
+        import plotly.express as px
         #df.reset_index(inplace=True, drop=True)
         if label_type != "scrap":
             line_group = "sector" if select_col == "product" else "product"
@@ -1,15 +1,32 @@
 import flodym as fd
 import numpy as np
 import logging
+from src.common.profiling import profiled
+from src.common.aux_pool import AuxPoolMixin
+from src.common.parameter_cache import InterpolationCacheMixin
+from src.common.precision import PrecisionMixin, compute_inflow_driven_stock
+from src.common.sector_partition import SectorPartitionMixin
 
 
-class SteelMFASystem(fd.MFASystem):
+# Parameters filled in over time by interpolate_parameters
+INTERPOLATED_PARAMETERS = ['NewScrapRate', 'EoLRecoveryRate', 'Contamination', 'ScrapSortingRate']
 
+
+class SteelMFASystem(SectorPartitionMixin, AuxPoolMixin, PrecisionMixin, InterpolationCacheMixin, fd.MFASystem):
+
+    @profiled()
     def compute(self):
         """
         Perform all computations for the MFA system in sequence.
         """
-        self.interpolate_parameters()
+        self.interpolate_parameters_cached(INTERPOLATED_PARAMETERS)
+        self.compute_by_sector_blocks("compute_flows")
+
+    @profiled()
+    def compute_flows(self):
+        """
+        Compute inflows, stock and outflows, which are independent between end use sectors.
+        """
         if self.cfg.customization.model_driven == 'production':
             self.compute_inflows_production_driven()
         elif self.cfg.customization.model_driven == 'final_demand':
@@ -31,6 +48,7 @@ class SteelMFASystem(fd.MFASystem):
         except ValueError:
             return None, None
 
+    @profiled()
     def interpolate_parameters(self):
         """
         Interpolate parameters to the model time step.
@@ -108,6 +126,7 @@ class SteelMFASystem(fd.MFASystem):
                         DomesticProduction, ImportNew, ExportNew, InitialStock')
 
 
+    @profiled()
     def compute_inflows_production_driven(self):
         """
         Compute flows from production downstream down to to final consumption entering the stock.
@@ -207,6 +226,7 @@ class SteelMFASystem(fd.MFASystem):
             return parameter
 
 
+    @profiled()
     def compute_inflows_final_demand_driven(self, with_start_value_and_growth_rate: bool =False):
         """
         Compute flows from final consumption entering the stock upstream to production.
@@ -280,6 +300,7 @@ class SteelMFASystem(fd.MFASystem):
         ) # F_0_1_DomesticProduction
 
 
+    @profiled()
     def compute_stock(self):
         """
         Compute inflow-driven stock dynamics.
@@ -304,9 +325,10 @@ class SteelMFASystem(fd.MFASystem):
             mean=self.parameters["Lifetime"],
             std=self.parameters["Lifetime"] * 0.3,
         )
-        stk["End use stock"].compute()
+        compute_inflow_driven_stock(stk["End use stock"])
 
 
+    @profiled()
     def compute_outflows(self):
         """
         Compute flows after leaving the stock.
@@ -319,14 +341,6 @@ class SteelMFASystem(fd.MFASystem):
         flw = self.flows
         stk = self.stocks
 
-        # Define auxiliary flows for the MFA system in addition to the main flows defined in steel_definition.py
-        aux = {
-            "EOLFlow": self.get_new_array(dim_letters=("t","c","r","s","i","p","e")),
-            "ContaminatedScrap": self.get_new_array(dim_letters=("r", "t", "s", "i", "p", "e")),
-            "AvailableScrap": self.get_new_array(dim_letters=("r", "t", "s", "i", "p", "w", "e")),
-            "LostScrap": self.get_new_array(dim_letters=("r", "t", "s", "i", "p", "e")),
-        }
-
         ### EOL STEEL
         logging.info("mfa_system - EOL STEEL")
 
@@ -336,6 +350,30 @@ class SteelMFASystem(fd.MFASystem):
         flw["End use stock => Waste management"][...] = stk["End use stock"].outflow * prm["EoLRecoveryRate"] # F_4_5: Collected end-of-life steel products
         flw["End use stock => sysenv"][...] = stk["End use stock"].outflow * (1 - prm["EoLRecoveryRate"]) # F_4_0: Lost end-of-life steel products
 
+        self.compute_scrap(
+            flw["End use stock => Waste management"],
+            flw["Waste management => AVAILABLE SCRAP sysenv"],
+            flw["Waste management => LOST SCRAP sysenv"],
+        )
+
+
+    def compute_scrap(self, eol: fd.FlodymArray, available_scrap: fd.FlodymArray, lost_scrap: fd.FlodymArray):
+        """
+        Compute the available and lost scrap (Waste management => AVAILABLE / LOST SCRAP sysenv)
+        of the collected end-of-life steel eol (End use stock => Waste management), e.g. of the
+        cohorts built before a base year only.
+        """
+
+        # Abbreviation for better readability
+        prm = self.parameters
+
+        # Define auxiliary flows for the MFA system in addition to the main flows defined in steel_definition.py
+        aux = {
+            "ContaminatedScrap": self.get_aux_array(("r", "t", "s", "i", "p", "e")),
+            "AvailableScrap": self.get_aux_array(("r", "t", "s", "i", "p", "w", "e")),
+            "LostScrap": self.get_aux_array(("r", "t", "s", "i", "p", "e")),
+        }
+
         ### WASTE MANAGEMENT
         logging.info("mfa_system - WASTE MANAGEMENT")
 
@@ -347,20 +385,22 @@ class SteelMFASystem(fd.MFASystem):
         # Element Cu has index 1 in Element classification [All, Cu]        
 
         #aux["ContaminatedScrap"]["All"] += prm["Contamination"]["Cu"] * aux["ContaminatedScrap"]["All"]
-        aux["ContaminatedScrap"]["All"] = (flw["End use stock => Waste management"] 
-                                           + flw["End use stock => Waste management"] * prm["Contamination"]["Cu"])
+        aux["ContaminatedScrap"]["All"] = eol + eol * prm["Contamination"]["Cu"]
 
         #aux["ContaminatedScrap"]["Cu"] += prm["Contamination"]["Cu"] * aux["ContaminatedScrap"]["All"]
-        aux["ContaminatedScrap"]["Cu"] = flw["End use stock => Waste management"] * prm["Contamination"]["Cu"]
+        aux["ContaminatedScrap"]["Cu"] = eol * prm["Contamination"]["Cu"]
 
         # Sorting scrap
         aux["AvailableScrap"][...] = aux["ContaminatedScrap"] * prm["ScrapSortingRate"] # F_5_0_AvailableScrap        
         aux["LostScrap"][...] = aux["ContaminatedScrap"] - aux["AvailableScrap"].sum_over('w')
 
-        flw["Waste management => AVAILABLE SCRAP sysenv"][...] = aux["AvailableScrap"].sum_to(('r','t','w','e')) # F_5_0_AvailableScrap
-        flw["Waste management => LOST SCRAP sysenv"][...] = aux["LostScrap"].sum_to(('r','t','s','e')) # F_5_0_LostScrap
+        available_scrap[...] = aux["AvailableScrap"].sum_to(('r','t','w','e')) # F_5_0_AvailableScrap
+        lost_scrap[...] = aux["LostScrap"].sum_to(('r','t','s','e')) # F_5_0_LostScrap
+
+        self.release_aux_arrays(aux)
 
 
+    @profiled()
     def get_flows_as_dataframes(self):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return {flow_name: flow.to_df() for flow_name, flow in self.flows.items()}
\ No newline at end of file
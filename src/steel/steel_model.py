@@ -2,6 +2,10 @@ import os
 import logging
 
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.precision import cast_mfa_arrays, get_dtype
+from src.common.input_cache import load_mfa_from_csv
+from src.common.reduced_rank import reduce_parameters
 from .steel_mfa_system import SteelMFASystem
 from .steel_export import SteelDataExporter
 from .steel_definition import get_definition
@@ -19,6 +23,7 @@ class SteelModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
 
         dimension_map = {
@@ -47,7 +52,8 @@ class SteelModel:
             )
         
         logging.info(f"model - Initializing SteelMFASystem.from_csv")
-        self.mfa = SteelMFASystem.from_csv(
+        self.mfa = load_mfa_from_csv(
+            SteelMFASystem,
             definition=self.definition,
             dimension_files=dimension_files,
             parameter_files=parameter_files,
@@ -55,7 +61,11 @@ class SteelModel:
             allow_extra_parameter_values=True,
         )
         self.mfa.cfg = self.cfg
+        cast_mfa_arrays(self.mfa, get_dtype(self.cfg))
+        if self.cfg.reduced_parameters:
+            reduce_parameters(self.mfa)
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         logging.info("Model computations completed.")
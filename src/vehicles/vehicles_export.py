@@ -2,6 +2,7 @@ import flodym as fd
 from typing import TYPE_CHECKING
 
 from src.common.custom_export import CustomDataExporter
+from src.common.profiling import profiled
 
 if TYPE_CHECKING:
     from src.vehicles.vehicles_model import VehiclesModel
@@ -18,6 +19,7 @@ class VehiclesDataExporter(CustomDataExporter):
         "Glass stock in vehicles",
     }
 
+    @profiled()
     def visualize_results(self, model: "VehiclesModel"):
         if self.cfg.inflow["do_visualize"]:
             self.visualize_inflow(mfa=model.mfa)
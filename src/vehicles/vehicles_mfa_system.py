@@ -1,14 +1,18 @@
 import flodym as fd
+from src.common.profiling import profiled
 
 
 class VehiclesMFASystem(fd.MFASystem):
+    @profiled()
     def get_flows_as_dataframes(self):
         """Retrieve flows as pandas DataFrames from the MFA system."""
         return {flow_name: flow.to_df() for flow_name, flow in self.flows.items()}
 
+    @profiled()
     def compute(self):
         self.compute_flows()
 
+    @profiled()
     def compute_flows(self):
         prm = self.parameters
         flw = self.flows
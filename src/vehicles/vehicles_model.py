@@ -1,6 +1,8 @@
 import os
 
 from src.common.common_cfg import GeneralCfg
+from src.common.profiling import profiled
+from src.common.input_cache import load_mfa_from_csv
 from .vehicles_mfa_system import VehiclesMFASystem
 from .vehicles_export import VehiclesDataExporter
 from .vehicles_definition import get_definition
@@ -19,6 +21,7 @@ class VehiclesModel:
         )
         self.init_mfa()
 
+    @profiled()
     def init_mfa(self):
         dimension_map = {
             "Time": "time_in_years",
@@ -43,7 +46,8 @@ class VehiclesModel:
                 self.cfg.input_data_path, "datasets", f"{parameter.name}.csv"
             )
 
-        self.mfa = VehiclesMFASystem.from_csv(
+        self.mfa = load_mfa_from_csv(
+            VehiclesMFASystem,
             definition=self.definition,
             dimension_files=dimension_files,
             parameter_files=parameter_files,
@@ -52,6 +56,7 @@ class VehiclesModel:
         )
         self.mfa.cfg = self.cfg
 
+    @profiled()
     def run(self):
         self.mfa.compute()
         flows_as_dataframes = self.mfa.get_flows_as_dataframes()